@@ -0,0 +1,57 @@
+# Raw page archive
+#
+# Every page the spiders download (week pages, game pages, player gamelogs) can be kept on disk so games can be
+# re-parsed offline (see PFRscraper.replay). Page bodies are stored gzip compressed and content addressed (file
+# named by the sha1 of the body, so identical pages are stored once); a sqlite index maps each request url to its
+# body, status and encoding.
+
+import gzip
+import hashlib
+import os
+import sqlite3
+from datetime import datetime
+
+
+class PageArchive:
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(path, 'index.sqlite'))
+        self.db.execute('CREATE TABLE IF NOT EXISTS pages '
+                        '(url TEXT PRIMARY KEY, digest TEXT, status INTEGER, encoding TEXT, fetched TEXT)')
+        self.db.commit()
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.get('ARCHIVE_DIR', 'archive'))
+
+    def body_path(self, digest):
+        return os.path.join(self.path, digest[:2], digest + '.gz')
+
+    def store(self, url, status, encoding, body):
+    # archive a downloaded page (body: bytes) under its request url
+        digest = hashlib.sha1(body).hexdigest()
+        path = self.body_path(digest)
+        if(not os.path.exists(path)):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with gzip.open(path + '.tmp', 'wb') as f:
+                f.write(body)
+            os.replace(path + '.tmp', path)
+        self.db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)',
+                        (url, digest, status, encoding, datetime.now().isoformat(timespec='seconds')))
+        self.db.commit()
+
+    def load(self, url):
+    # return the (status, encoding, body) of the archived page of a request url, None if it was never fetched
+        row = self.db.execute('SELECT digest, status, encoding FROM pages WHERE url = ?', (url,)).fetchone()
+        if(row is None):
+            return None
+        with gzip.open(self.body_path(row[0]), 'rb') as f:
+            return row[1], row[2], f.read()
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+    def close(self):
+        self.db.close()
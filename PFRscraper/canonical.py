@@ -0,0 +1,110 @@
+# Canonical names
+#
+# Mapping tables of the names found in the scraped data to their canonical form: the current code of relocated teams,
+# the current name of renamed stadiums, and the right spelling of misspelled referee and coach names. They are applied
+# once, where the data comes in: to every item by CanonicalPipeline (PFRscraper.pipelines) before it's stored, and to
+# the frames read from older data files (PFRtransform.features.read_data, the model notebook) by canonicalize, so the
+# transform step and the model agree on teams, stadiums and officials.
+#
+# canonicalize remaps the categories of a column (categorical columns, see PFRtransform.schema) rather than its
+# values: the cost of a table depends on the number of distinct names, not of games. VERSION is a hash of the tables,
+# part of the versions of the data built from canonical names (typed data cache, feature store), so a new or changed
+# entry rebuilds them.
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+
+# former team codes and their current code
+teams = {'STL': 'LAR',
+         'OAK': 'LVR',
+         'SDG': 'LAC'}
+
+# former stadium names and their current name
+stadiums = {'Giants Stadium': 'MetLife Stadium',
+            'Alltel Stadium': 'TIAA Bank Stadium',
+            'University of Phoenix Stadium': 'State Farm Stadium',
+            'Cleveland Browns Stadium': 'FirstEnergy Stadium',
+            'LP Field': 'Nissan Stadium',
+            'Reliant Stadium': 'NRG Stadium',
+            'McAfee Coliseum': 'Ring Central Coliseum',
+            'Monster Park': 'Candlestick Park',
+            'Texas Stadium': 'AT&T Stadium',
+            'Invesco Field at Mile High': 'Empower Field at Mile High',
+            'Qwest Field': 'Lumen Field',
+            'Dolphin Stadium': 'Hard Rock Stadium',
+            'Ralph Wilson Stadium': 'Highmark Stadium',
+            'Louisiana Superdome': 'Caesars Superdome',
+            'Jacksonville Municipal Stadium': 'TIAA Bank Stadium',
+            'Oakland-Alameda County Coliseum': 'Ring Central Coliseum',
+            'Cowboys Stadium': 'AT&T Stadium',
+            'New Meadowlands Stadium': 'MetLife Stadium',
+            'EverBank Field': 'TIAA Bank Stadium',
+            'Mall of America Field': 'Hubert H. Humphrey Metrodome',
+            'Sun Life Stadium': 'Hard Rock Stadium',
+            'Sports Authority Field at Mile High': 'Empower Field at Mile High',
+            'Mercedes-Benz Superdome': 'Caesars Superdome',
+            'CenturyLink Field': 'Lumen Field',
+            'O.co Coliseum': 'Ring Central Coliseum',
+            'New Era Field': 'Highmark Stadium',
+            'Bills Stadium': 'Highmark Stadium',
+            'GEHA Field at Arrowhead Stadium': 'Arrowhead Stadium'}
+
+# misspelled (or shortened) referee names and their name
+referees = {'Bill Vinocich': 'Bill Vinovich',
+            'Gene Stetatore': 'Gene Steratore',
+            'Al Riveron': 'Alberto Riveron',
+            'Michael Carey': 'Mike Carey',
+            'John Perry': 'John Parry',
+            'Bradley Rogers': 'Brad Rogers',
+            'Ronald Torbert': 'Ron Torbert'}
+
+# misspelled coach names and their name
+coaches = {}
+
+# dict of field (item field, game data or feature column) and the table of its canonical names
+fields = {'home_team_code': teams,
+          'away_team_code': teams,
+          'stadium': stadiums,
+          'referee': referees,
+          'home_coach': coaches,
+          'away_coach': coaches}
+
+# version (str) of the tables
+VERSION = hashlib.sha1(json.dumps([teams, stadiums, referees, coaches],
+                                  sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def canonicalize_item(item):
+# canonicalize the fields of an item (in place) and return it
+    for name, table in fields.items():
+        if(name in item and item[name] in table):
+            item[name] = table[item[name]]
+    return item
+
+
+def remap(column, table):
+# return a categorical column (Series) with the categories of its table replaced, categories mapped to the same name
+# merged
+    codes, names = pd.Index([table.get(name, name) for name in column.cat.categories]).factorize()
+    # code of each category's canonical name, -1 (missing) kept
+    codes = np.append(codes, -1)[column.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, names), index=column.index, name=column.name)
+
+
+def canonicalize(frame):
+# return a frame (DataFrame) with the canonical names of its fields; columns that aren't categorical are remapped as
+# categories and keep their dtype
+    frame = frame.copy()
+    for name, table in fields.items():
+        if(name not in frame or not table):
+            continue
+        column = frame[name]
+        if(isinstance(column.dtype, pd.CategoricalDtype)):
+            frame[name] = remap(column, table)
+        else:
+            frame[name] = remap(column.astype('category'), table).astype(column.dtype)
+    return frame
@@ -0,0 +1,118 @@
+# Columnar datasets of scraped items
+#
+# Items (see PFRscraper.items) are stored as compressed parquet files with one typed column per item field, in one
+# directory per dataset partitioned by season (<path>/games/season=2021/part-....parquet), so readers only load the
+# columns and seasons they need, already typed. Files are only ever added: a game scraped again is written again
+# and read_dataset keeps its latest copy.
+#
+# The plays dataset keeps every classified play-by-play row (see PFRscraper.items.PlayItem), so per-game stats can
+# be rebuilt from it with grouped sums (read_play_counts) instead of re-crawling the game pages.
+#
+# usage: python -m PFRscraper.columnar nfl-game-data.csv games [--path data]   (import a scraped data csv)
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from PFRscraper.items import GameItem, MatchupItem, PlayItem
+from PFRscraper.plays import get_game_counts
+
+
+item_classes = {GameItem.dataset: GameItem, MatchupItem.dataset: MatchupItem, PlayItem.dataset: PlayItem}
+
+# formats of the game dates in the scraped data csvs, tried in order (spider feeds, older notebook csvs)
+DATE_FORMATS = ['ISO8601', '%m/%d/%Y']
+
+
+def get_column(values, dtype):
+# return a column (Series) of raw item values converted to a field's dtype (values that can't be converted: missing)
+    values = pd.Series(values, dtype=object)
+    if(dtype.startswith('datetime')):
+        return pd.to_datetime(values, errors='coerce').astype(dtype)
+    if(dtype == 'string'):
+        return values.astype(dtype)
+    return pd.to_numeric(values, errors='coerce').astype(dtype)
+
+
+def get_dates(values):
+# return the dates (Series) of date strings all in one of DATE_FORMATS
+    for date_format in DATE_FORMATS[:-1]:
+        try:
+            return pd.to_datetime(values, format=date_format)
+        except ValueError:
+            pass
+    return pd.to_datetime(values, format=DATE_FORMATS[-1])
+
+
+def get_frame(rows, item_class):
+# return the typed DataFrame of item rows (list of dicts) with one column per field of the item class
+    fields = item_class.fields
+    return pd.DataFrame({name: get_column([row.get(name) for row in rows], fields[name]['dtype']) for name in fields})
+
+
+def get_seasons(game_dates):
+# return the season (int array) of each game date (Jan/Feb playoff games count toward the previous season)
+    return (game_dates.dt.year - (game_dates.dt.month < 3)).to_numpy()
+
+
+def write_partitions(path, dataset, frame, compression='zstd'):
+# write a typed frame to one new file per season of its games in a dataset directory
+    name = 'part-' + datetime.now().strftime('%Y%m%d%H%M%S%f') + '.parquet'
+    for season, rows in frame.groupby(get_seasons(frame['game_date'])):
+        directory = os.path.join(path, dataset, 'season=%d' % season)
+        os.makedirs(directory, exist_ok=True)
+        rows.to_parquet(os.path.join(directory, name), compression=compression, index=False)
+
+
+def read_dataset(path, dataset, columns=None, seasons=None):
+# return the records (DataFrame, with a season column) of a dataset, only the given columns and seasons if any
+    key = item_classes[dataset].key
+    read_columns = None if columns is None else list(dict.fromkeys(list(columns) + key))
+    filters = None if seasons is None else [('season', 'in', [int(s) for s in seasons])]
+    frame = pd.read_parquet(os.path.join(path, dataset), columns=read_columns, filters=filters)
+    if('season' in frame):
+        frame['season'] = frame['season'].astype(int)
+    frame = frame.drop_duplicates(key, keep='last').sort_values(key, kind='stable').reset_index(drop=True)
+    if(columns is not None):
+        frame = frame[list(columns)]
+    return frame
+
+
+def read_play_counts(path, seasons=None):
+# return the per-game play counts (DataFrame indexed by game id, 'home_<stat>' / 'away_<stat>' columns as in the
+# games dataset, see PFRscraper.plays.get_team_counts) rebuilt from the plays dataset, only the given seasons if any
+    plays = read_dataset(path, PlayItem.dataset, seasons=seasons)
+    types = {}
+    for name, field in PlayItem.fields.items():
+        if(field['dtype'] == 'boolean'):
+            types[name] = bool
+        elif(field['dtype'] == 'Int16'):
+            types[name] = int
+    plays = plays.fillna({name: (False if t is bool else 0) for name, t in types.items()}).astype(types)
+    plays['down'] = plays['down'].fillna('').astype(object)
+    return get_game_counts(plays, plays['game_id'].to_numpy())
+
+
+def import_csv(csv_path, path, dataset, compression='zstd'):
+# add the games of a scraped data csv to a dataset; return the number of games
+    rows = pd.read_csv(csv_path, encoding='unicode_escape', dtype=str, keep_default_na=False).to_dict('records')
+    frame = get_frame(rows, item_classes[dataset])
+    write_partitions(path, dataset, frame, compression)
+    return len(frame)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import a scraped data csv into a columnar dataset.')
+    parser.add_argument('csv')
+    parser.add_argument('dataset', choices=[GameItem.dataset, MatchupItem.dataset])
+    parser.add_argument('--path', default='data')
+    options = parser.parse_args(argv)
+    n = import_csv(options.csv, options.path, options.dataset)
+    print('%d games written to %s' % (n, os.path.join(options.path, options.dataset)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# Game database
+#
+# An embedded sqlite database with one table per item dataset (games, matchups, plays; see PFRscraper.items) written
+# by both spiders (DatabasePipeline) and read by the transform step (PFRtransform.features.read_data). Games and
+# matchups are keyed by boxscore id and plays by (boxscore id, play-by-play row), and every write is an upsert, so
+# re-running a crawl never duplicates a game. Games and matchups are indexed by (team, date) for both the home and
+# the away team and by (home team, away team, date), so the previous games of a team or of a pair of teams are read
+# with index seeks (previous_games, previous_matchups), and by date: the transform step reads the columns and date
+# range it needs in one query (read_table) and looks up the previous games of every game at once in memory
+# (PFRtransform.index), much faster than one query per game.
+#
+# usage: python -m PFRscraper.database nfl-game-data.csv games [--path nfl.sqlite]   (import a scraped data csv)
+
+import argparse
+import sqlite3
+import sys
+
+import pandas as pd
+
+from PFRscraper.columnar import get_frame, item_classes
+from PFRscraper.items import GameItem, MatchupItem, PlayItem
+from PFRscraper.state import make_game_id
+
+
+# dict of field dtype -> sqlite column type
+column_types = {'datetime64[ns]': 'TEXT', 'string': 'TEXT', 'Int16': 'INTEGER', 'float64': 'REAL', 'boolean': 'INTEGER'}
+
+
+def get_columns(item_class):
+# return the column names (list of str) of a dataset table: the game id, then one column per item field
+    return ['game_id'] + [name for name in item_class.fields if name != 'game_id']
+
+
+def get_rows(frame, item_class):
+# return the table rows (list of tuples) of a typed item frame (dates as YYYY-MM-DD, missing values as None)
+    frame = frame.copy()
+    if('game_id' not in frame):
+        frame['game_id'] = [make_game_id(d, c) for d, c in zip(frame['game_date'], frame['home_team_code'])]
+    frame['game_date'] = frame['game_date'].dt.strftime('%Y-%m-%d')
+    frame = frame[get_columns(item_class)].astype(object)
+    return list(frame.where(frame.notna(), None).itertuples(index=False, name=None))
+
+
+def quote(names):
+    return ', '.join('"%s"' % name for name in names)
+
+
+class GameDatabase:
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        for item_class in item_classes.values():
+            key = ['game_id', 'row'] if item_class is PlayItem else ['game_id']
+            columns = ['"game_id" TEXT'] + ['"%s" %s' % (name, column_types[field['dtype']])
+                                             for name, field in item_class.fields.items() if name != 'game_id']
+            self.db.execute('CREATE TABLE IF NOT EXISTS %s (%s, PRIMARY KEY (%s)) WITHOUT ROWID'
+                            % (item_class.dataset, ', '.join(columns), quote(key)))
+        for item_class in (GameItem, MatchupItem):
+            table = item_class.dataset
+            self.db.execute('CREATE INDEX IF NOT EXISTS %s_home ON %s (home_team_code, game_date)' % (table, table))
+            self.db.execute('CREATE INDEX IF NOT EXISTS %s_away ON %s (away_team_code, game_date)' % (table, table))
+            self.db.execute('CREATE INDEX IF NOT EXISTS %s_pair ON %s (home_team_code, away_team_code, game_date)'
+                            % (table, table))
+            self.db.execute('CREATE INDEX IF NOT EXISTS %s_date ON %s (game_date)' % (table, table))
+        self.db.commit()
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.get('DATABASE_PATH', 'nfl.sqlite'))
+
+    def upsert(self, item_class, frame):
+    # insert or replace the records of a typed item frame (see PFRscraper.columnar.get_frame) in their table; the
+    # plays of a game replace all its previous plays
+        rows = get_rows(frame, item_class)
+        columns = get_columns(item_class)
+        if(item_class is PlayItem):
+            self.db.executemany('DELETE FROM plays WHERE game_id = ?', [(i,) for i in set(r[0] for r in rows)])
+        self.db.executemany('INSERT OR REPLACE INTO %s (%s) VALUES (%s)'
+                            % (item_class.dataset, quote(columns), ', '.join('?' * len(columns))), rows)
+        self.db.commit()
+
+    def query(self, sql, params=()):
+    # return the result (DataFrame) of a query
+        return pd.read_sql_query(sql, self.db, params=params)
+
+    def read_table(self, dataset, columns=None, start_date=None, end_date=None):
+    # return the records (DataFrame, ordered by date) of a table, only the given columns and dates if any
+    # (start_date <= game_date < end_date, YYYY-MM-DD)
+        where, params = [], []
+        if(start_date is not None):
+            where.append('game_date >= ?')
+            params.append(start_date)
+        if(end_date is not None):
+            where.append('game_date < ?')
+            params.append(end_date)
+        key = 'game_id, "row"' if dataset == PlayItem.dataset else 'game_date, game_id'
+        sql = 'SELECT %s FROM %s' % ('*' if columns is None else quote(columns), dataset)
+        if(where):
+            sql += ' WHERE ' + ' AND '.join(where)
+        return self.query(sql + ' ORDER BY ' + key, params)
+
+    def previous_games(self, team, date, n, dataset=GameItem.dataset):
+    # return the last n games (DataFrame, most recent first) a team played before a date (YYYY-MM-DD)
+        sql = ('SELECT * FROM (SELECT * FROM {0} WHERE home_team_code = ? AND game_date < ? '
+               'ORDER BY game_date DESC LIMIT ?) '
+               'UNION ALL SELECT * FROM (SELECT * FROM {0} WHERE away_team_code = ? AND game_date < ? '
+               'ORDER BY game_date DESC LIMIT ?) '
+               'ORDER BY game_date DESC LIMIT ?').format(dataset)
+        return self.query(sql, (team, date, n, team, date, n, n))
+
+    def previous_matchups(self, team_1, team_2, date, n, start_date=None, dataset=MatchupItem.dataset):
+    # return the last n games (DataFrame, most recent first) between two teams before a date, only those played
+    # since start_date if given (YYYY-MM-DD)
+        start_date = '' if start_date is None else start_date
+        sql = ('SELECT * FROM (SELECT * FROM {0} WHERE home_team_code = ? AND away_team_code = ? '
+               'AND game_date >= ? AND game_date < ? ORDER BY game_date DESC LIMIT ?) '
+               'UNION ALL SELECT * FROM (SELECT * FROM {0} WHERE home_team_code = ? AND away_team_code = ? '
+               'AND game_date >= ? AND game_date < ? ORDER BY game_date DESC LIMIT ?) '
+               'ORDER BY game_date DESC LIMIT ?').format(dataset)
+        return self.query(sql, (team_1, team_2, start_date, date, n, team_2, team_1, start_date, date, n, n))
+
+    def close(self):
+        self.db.close()
+
+
+def import_csv(csv_path, path, dataset):
+# upsert the games of a scraped data csv into a database; return the number of games
+    rows = pd.read_csv(csv_path, encoding='unicode_escape', dtype=str, keep_default_na=False).to_dict('records')
+    item_class = item_classes[dataset]
+    db = GameDatabase(path)
+    db.upsert(item_class, get_frame(rows, item_class))
+    db.close()
+    return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import a scraped data csv into the game database.')
+    parser.add_argument('csv')
+    parser.add_argument('dataset', choices=[GameItem.dataset, MatchupItem.dataset])
+    parser.add_argument('--path', default='nfl.sqlite')
+    options = parser.parse_args(argv)
+    n = import_csv(options.csv, options.path, options.dataset)
+    print('%d games written to %s' % (n, options.path))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
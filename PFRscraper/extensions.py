@@ -0,0 +1,60 @@
+# Define here your extensions
+#
+# Don't forget to add your extension to the EXTENSIONS setting
+# See: https://docs.scrapy.org/en/latest/topics/extensions.html
+
+import json
+import os
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from PFRscraper.metrics import get_histograms, get_prometheus_text, get_quantile
+
+
+class MetricsReport:
+    # Writes the crawl and parse metrics collected in the stats (see
+    # PFRscraper.metrics) when the spider closes: a JSON report of every
+    # histogram (with p50 / p90 / p99 bucket bounds), the slowest games and
+    # the other stats (METRICS_REPORT), and a Prometheus text file
+    # (METRICS_PROMETHEUS_FILE) for node_exporter's textfile collector.
+    # Either file is skipped if its setting is empty.
+
+    def __init__(self, stats, report_path, prometheus_path):
+        self.stats = stats
+        self.report_path = report_path
+        self.prometheus_path = prometheus_path
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('METRICS_ENABLED'):
+            raise NotConfigured
+        s = cls(crawler.stats, settings.get('METRICS_REPORT'), settings.get('METRICS_PROMETHEUS_FILE'))
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def get_report(self, spider, stats):
+        histograms = get_histograms(stats)
+        for histogram in histograms.values():
+            for q in (0.5, 0.9, 0.99):
+                histogram['p%d' % (q * 100)] = get_quantile(histogram, q)
+            histogram['buckets'] = dict(histogram['buckets'])
+        return {
+            'spider': spider.name,
+            'histograms': histograms,
+            'slowest_games': stats.get('metrics/slowest_games', []),
+            'stats': {k: v for k, v in stats.items() if not k.startswith('metrics/')}
+        }
+
+    def spider_closed(self, spider):
+        stats = self.stats.get_stats()
+        if self.report_path:
+            with open(self.report_path, 'w') as f:
+                json.dump(self.get_report(spider, stats), f, indent=1, default=str)
+        if self.prometheus_path:
+            # written next to the target then renamed, so a collector never reads a partial file
+            path = self.prometheus_path + '.tmp'
+            with open(path, 'w') as f:
+                f.write(get_prometheus_text(stats))
+            os.replace(path, self.prometheus_path)
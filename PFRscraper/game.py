@@ -0,0 +1,474 @@
+# Game page parsing
+#
+# Reading a game page and building its game item are plain functions of the page (no spider state), so they can run
+# in parse worker processes (see PFRscraper.parsepool). A page is read into a dict of picklable raw data; the teams
+# of the players it needs looked up are resolved by the spider before the item is built.
+
+import numpy as np
+from datetime import datetime
+from PFRscraper.items import GameItem, MatchupItem, PlayItem
+from PFRscraper.metrics import timed
+from PFRscraper.plays import get_play_clocks, get_play_drives, get_play_frame, get_red_zone_drives, get_team_counts
+from PFRscraper.resolver import get_season
+from PFRscraper.scoring import get_conversion_counts, get_scoring_events
+from PFRscraper.state import get_game_id
+from PFRscraper.stats import PUNTING_STATS, RETURN_STATS, get_player_table_stats, get_team_stats
+from PFRscraper.tables import get_column_links, get_commented_tables, get_table_array
+from scrapy.http import HtmlResponse
+
+# dict of team names and their corresponding code
+codes = {'Arizona Cardinals': 'ARI',
+         'Atlanta Falcons': 'ATL',
+         'Baltimore Ravens': 'BAL',
+         'Buffalo Bills': 'BUF',
+         'Carolina Panthers': 'CAR',
+         'Chicago Bears': 'CHI',
+         'Cincinnati Bengals': 'CIN',
+         'Cleveland Browns': 'CLE',
+         'Dallas Cowboys': 'DAL',
+         'Denver Broncos': 'DEN',
+         'Detroit Lions': 'DET',
+         'Green Bay Packers': 'GNB',
+         'Houston Texans': 'HOU',
+         'Indianapolis Colts': 'IND',
+         'Jacksonville Jaguars': 'JAX',
+         'Kansas City Chiefs': 'KAN',
+         'Las Vegas Raiders': 'LVR',
+         'Los Angeles Chargers': 'LAC',
+         'Los Angeles Rams': 'LAR',
+         'Miami Dolphins': 'MIA',
+         'Minnesota Vikings': 'MIN',
+         'New England Patriots': 'NWE',
+         'New Orleans Saints': 'NOR',
+         'New York Giants': 'NYG',
+         'New York Jets': 'NYJ',
+         'Oakland Raiders': 'OAK',
+         'Philadelphia Eagles': 'PHI',
+         'Pittsburgh Steelers': 'PIT',
+         'San Diego Chargers': 'SDG',
+         'San Francisco 49ers': 'SFO',
+         'Seattle Seahawks': 'SEA',
+         'St. Louis Rams': 'STL',
+         'Tampa Bay Buccaneers': 'TAM',
+         'Tennessee Titans': 'TEN',
+         'Washington Football Team': 'WAS',
+         'Washington Redskins': 'WAS'
+}
+
+
+def read_game_page(response, timings=None):
+# return a dict of the raw data parsed from a game page (seconds spent reading the page tables into arrays added to
+# timings['read_html'] if given)
+    timings = {} if timings is None else timings
+
+    # extract data from page tables (commented out on the page) into arrays
+    tables = get_commented_tables(response.selector.root)
+    with timed(timings, 'read_html'):
+        game_info = get_table_array(tables['game_info'])
+        officials = get_table_array(tables['officials'])
+        team_stats = get_table_array(tables['team_stats'])
+        kick_punt_returns = get_table_array(tables['returns'])
+        kicking_punting = get_table_array(tables['kicking'])
+        home_drives = get_table_array(tables['home_drives'])
+        away_drives = get_table_array(tables['vis_drives'])
+        play_by_play = get_table_array(tables['pbp'])
+        pbp_links = get_column_links(tables['pbp'], 5)
+    
+    box_path = '//div[@class="scorebox_meta"]/'
+    ls_path = '//table[@class="linescore nohover stats_table no_freeze"]/tbody[1]/'
+    
+    # general game information
+    game_date = datetime.strptime(response.xpath(box_path + 'div[1]/text()').extract_first(), '%A %b %d, %Y')
+    start_time = response.xpath(box_path + 'div[2]/text()').extract_first()[2:]
+    stadium = response.xpath(box_path + 'div[3]/a/text()').extract_first()
+    referee = officials[np.where(officials[:,0] == 'Referee')[0][0]][1]
+    vegas_o_u = game_info[np.where(game_info[:,0] == 'Over/Under')[0][0]][1].split(' ')[0]
+    vegas_spread = game_info[np.where(game_info[:,0] == 'Vegas Line')[0][0]][1]
+    try:
+        weather = game_info[np.where(game_info[:,0] == 'Weather')[0][0]][1]
+    except:
+        weather = '70 degrees, relative humidity 45%, no wind'
+    
+    home_team = response.xpath('//div[@class="scorebox"]/div[1]/div[1]/strong/a[@itemprop="name"]/text()').extract_first()
+    home_coach = response.xpath('//div[@class="scorebox"]/div[1]/div[@class="datapoint"]/a/text()').extract_first()
+    home_pts = response.xpath('//div[@class="scorebox"]/div[1]/div[@class="scores"]/div[@class="score"]/text()').extract_first()
+    home_q1_pts, home_q2_pts, home_q3_pts, home_q4_pts = response.xpath(ls_path + 'tr[2]/td[3]/text()').extract_first(),\
+                                                         response.xpath(ls_path + 'tr[2]/td[4]/text()').extract_first(),\
+                                                         response.xpath(ls_path + 'tr[2]/td[5]/text()').extract_first(),\
+                                                         response.xpath(ls_path + 'tr[2]/td[6]/text()').extract_first()
+    
+    away_team = response.xpath('//div[@class="scorebox"]/div[2]/div[1]/strong/a[@itemprop="name"]/text()').extract_first()
+    away_coach = response.xpath('//div[@class="scorebox"]/div[2]/div[@class="datapoint"]/a/text()').extract_first()
+    away_pts = response.xpath('//div[@class="scorebox"]/div[2]/div[@class="scores"]/div[@class="score"]/text()').extract_first()
+    away_q1_pts, away_q2_pts, away_q3_pts, away_q4_pts = response.xpath(ls_path + 'tr[1]/td[3]/text()').extract_first(),\
+                                                         response.xpath(ls_path + 'tr[1]/td[4]/text()').extract_first(),\
+                                                         response.xpath(ls_path + 'tr[1]/td[5]/text()').extract_first(),\
+                                                         response.xpath(ls_path + 'tr[1]/td[6]/text()').extract_first()
+    
+    team_codes = codes[home_team], codes[away_team]
+    
+    return {
+        'url': response.url,
+        'pbp_links': pbp_links,
+        'game_info': game_info,
+        'officials': officials,
+        'team_stats': team_stats,
+        'kick_punt_returns': kick_punt_returns,
+        'kicking_punting': kicking_punting,
+        'home_drives': home_drives,
+        'away_drives': away_drives,
+        'play_by_play': play_by_play,
+        'game_date': game_date,
+        'start_time': start_time,
+        'stadium': stadium,
+        'referee': referee,
+        'vegas_o_u': vegas_o_u,
+        'vegas_spread': vegas_spread,
+        'weather': weather,
+        'home_team': home_team,
+        'home_coach': home_coach,
+        'home_pts': home_pts,
+        'home_q_pts': (home_q1_pts, home_q2_pts, home_q3_pts, home_q4_pts),
+        'away_team': away_team,
+        'away_coach': away_coach,
+        'away_pts': away_pts,
+        'away_q_pts': (away_q1_pts, away_q2_pts, away_q3_pts, away_q4_pts),
+        'team_codes': team_codes,
+        'scoring_events': get_scoring_events(response)
+    }
+
+
+def read_matchup_item(response):
+# return the matchup item of a game page, only reading the tables it needs (game info)
+    tables = get_commented_tables(response.selector.root, ('game_info',))
+    game_info = get_table_array(tables['game_info'])
+    
+    box_path = '//div[@class="scorebox_meta"]/'
+    
+    game_date = datetime.strptime(response.xpath(box_path + 'div[1]/text()').extract_first(), '%A %b %d, %Y').strftime("%Y-%m-%d")
+    vegas_o_u = game_info[np.where(game_info[:,0] == 'Over/Under')[0][0]][1].split(' ')[0]
+    vegas_spread = game_info[np.where(game_info[:,0] == 'Vegas Line')[0][0]][1]
+    home_team = response.xpath('//div[@class="scorebox"]/div[1]/div[1]/strong/a[@itemprop="name"]/text()').extract_first()
+    away_team = response.xpath('//div[@class="scorebox"]/div[2]/div[1]/strong/a[@itemprop="name"]/text()').extract_first()
+    team_codes = codes[home_team], codes[away_team]
+    home_pts = response.xpath('//div[@class="scorebox"]/div[1]/div[@class="scores"]/div[@class="score"]/text()').extract_first()
+    away_pts = response.xpath('//div[@class="scorebox"]/div[2]/div[@class="scores"]/div[@class="score"]/text()').extract_first()
+    
+    return MatchupItem({
+        'game_date': game_date,
+        'home_team': home_team,
+        'away_team': away_team,
+        'home_team_code': team_codes[0],
+        'away_team_code': team_codes[1],
+        'home_pts': home_pts,
+        'away_pts': away_pts,
+        'vegas_o_u': vegas_o_u,
+        'vegas_spread': vegas_spread
+    })
+
+
+def build_matchup_item(page):
+# return the matchup item of a game from its parsed game page
+    return MatchupItem({
+        'game_date': page['game_date'].strftime("%Y-%m-%d"),
+        'home_team': page['home_team'],
+        'away_team': page['away_team'],
+        'home_team_code': page['team_codes'][0],
+        'away_team_code': page['team_codes'][1],
+        'home_pts': page['home_pts'],
+        'away_pts': page['away_pts'],
+        'vegas_o_u': page['vegas_o_u'],
+        'vegas_spread': page['vegas_spread']
+    })
+
+
+def get_player_path(pbp_links, i, link):
+# return the player page path (str) of a link (index) in the description of play-by-play row i, None if missing
+    try:
+        return pbp_links[i][link].split('.htm')[0]
+    except IndexError:
+        return None
+
+
+def get_player_lookups(page):
+# return a dict of (play-by-play row, 'penalty' or 'kickoff') -> (player path, season) key for every player whose
+# team must be looked up: the penalized player of an enforced penalty and the kicker of a kickoff
+    play_by_play = page['play_by_play']
+    team_codes = page['team_codes']
+    season = get_season(page['game_date'])
+    lookups = {}
+    for i in range(1, len(play_by_play)):
+        try:
+            description = str(play_by_play[i,5])
+        except:
+            description = ''
+        
+        play = '(no play)' not in description
+        kickoff = ' kicks off ' in description
+        penalty_detail = description.split('Penalty on ')[-1]
+        penalty_enforced = ('Penalty on ' in description)*((('(Declined)' not in penalty_detail)*('(declined)' not in penalty_detail)\
+                            *('(Offsetting)' not in penalty_detail)*('(offsetting)' not in penalty_detail))\
+                            |(('(Accepted)' in description)|('(accepted)' in description)))
+        
+        if(penalty_enforced and (team_codes[0] not in penalty_detail.split(' ')[0])\
+           and (team_codes[1] not in penalty_detail.split(' ')[0])):
+            path = get_player_path(page['pbp_links'], i, -1)
+            lookups[(i, 'penalty')] = None if path is None else (path, season)
+        if(play*kickoff):
+            path = get_player_path(page['pbp_links'], i, 0)
+            lookups[(i, 'kickoff')] = None if path is None else (path, season)
+    return lookups
+
+
+def get_game_plays(page, player_teams):
+# return the play frame (see get_play_frame) of a parsed game page, with the remaining game time of each play
+    play_by_play = page['play_by_play']
+    clocks = get_play_clocks(play_by_play)
+    
+    # drive_n: number of drives started by each team at each play (0 before a team's first drive)
+    # off: team on offense at each play. 0 represents home team on offense, 1 represents away team on offense
+    drive_n, off = get_play_drives(page['home_drives'], page['away_drives'], clocks)
+    plays = get_play_frame(play_by_play, page['team_codes'], drive_n, off, player_teams)
+    plays['clock'] = clocks[1:]
+    return plays
+
+
+def build_play_items(page, plays):
+# return the play items (list) of a game from its play frame
+    game_id = get_game_id(page['url'])
+    game_date = page['game_date'].strftime("%Y-%m-%d")
+    fields = [c for c in plays.columns if c in PlayItem.fields]
+    return [PlayItem(game_id=game_id, game_date=game_date, row=row, **dict(zip(fields, values)))
+            for row, values in zip(plays.index.tolist(), plays[fields].itertuples(index=False, name=None))]
+
+
+def build_game_item(page, plays):
+# return the game item built from a parsed game page and its play frame
+    game_info, officials, team_stats = page['game_info'], page['officials'], page['team_stats']
+    kick_punt_returns, kicking_punting = page['kick_punt_returns'], page['kicking_punting']
+    home_drives, away_drives, play_by_play = page['home_drives'], page['away_drives'], page['play_by_play']
+    game_date, start_time, stadium, referee = page['game_date'], page['start_time'], page['stadium'], page['referee']
+    vegas_o_u, vegas_spread, weather = page['vegas_o_u'], page['vegas_spread'], page['weather']
+    home_team, home_coach, home_pts = page['home_team'], page['home_coach'], page['home_pts']
+    home_q1_pts, home_q2_pts, home_q3_pts, home_q4_pts = page['home_q_pts']
+    away_team, away_coach, away_pts = page['away_team'], page['away_coach'], page['away_pts']
+    away_q1_pts, away_q2_pts, away_q3_pts, away_q4_pts = page['away_q_pts']
+    team_codes = page['team_codes']
+    
+    # sum the team stats over the classified plays (stored in lists: list such that list[0] corresponds to home
+    # team and list[1] corresponds to away team)
+    counts = get_team_counts(plays)
+    home_rz_arr, away_rz_arr = get_red_zone_drives(plays, len(home_drives), len(away_drives))
+    
+    date = game_date.strftime("%Y-%m-%d")
+    
+    # team stats read from the team stats, kicking/punting and returns tables
+    stats = get_team_stats(team_stats)
+    stats.update(get_player_table_stats(kicking_punting, team_codes, PUNTING_STATS, 10))
+    stats.update(get_player_table_stats(kick_punt_returns, team_codes, RETURN_STATS, 12))
+    
+    # kneels are not counted as rushes, spikes are not counted as pass attempts
+    for t, side in enumerate(['home', 'away']):
+        stats[side + '_rush_yds'] -= counts['qb_kneel_yds'][t]
+        stats[side + '_rush_plays'] -= counts['qb_kneels'][t]
+        stats[side + '_pass_att'] -= counts['qb_spikes'][t]
+    
+    home_rz_trips = int(sum(home_rz_arr))
+    away_rz_trips = int(sum(away_rz_arr))
+    
+    rz_tds = [0, 0]
+    rz_arr = [home_rz_arr, away_rz_arr]
+    drives = [home_drives, away_drives]
+    poss_time = ['', '']
+    avg_sfp = [0.0, 0.0]
+    
+    for i in range(2):
+        sec = 0
+        sfp = []
+        for j in range(len(drives[i])):
+            if(int(drives[i][j,1]) < 5):
+                t = drives[i][j,5].split(':')
+                sec += 60*int(t[0]) + int(t[1])
+            try:
+                p = drives[i][j,3].split(' ')
+                if(p[0] == team_codes[i]):
+                    sfp.append(int(p[1]))
+                else:
+                    sfp.append(100-int(p[1]))
+            except:
+                pass
+            
+        # poss_time: team possession time not including OT     
+        poss_time[i] = sec / 60
+        avg_sfp[i] = sum(sfp) / len(sfp)
+        
+        for j in range(len(rz_arr[i])):
+            if((rz_arr[i][j] == 1)*(drives[i][j,7] == 'Touchdown')):
+                rz_tds[i] += 1
+    
+    pat_a, pat_m, two_pt_conv_att, two_pt_conv_suc = get_conversion_counts(page['scoring_events'], home_team, away_team)
+    
+    
+    return GameItem({
+        'game_date': date,
+        'game_time': start_time,
+        'stadium': stadium,
+        'weather': weather,
+        'referee': referee,
+        'vegas_o_u': vegas_o_u,
+        'vegas_spread': vegas_spread,
+        'home_team': home_team,
+        'away_team': away_team,
+        'home_team_code': team_codes[0],
+        'away_team_code': team_codes[1],
+        'home_coach': home_coach,
+        'away_coach': away_coach,
+        'home_pts': home_pts,
+        'away_pts': away_pts,
+        'home_q1_pts': home_q1_pts,
+        'away_q1_pts': away_q1_pts,
+        'home_q2_pts': home_q2_pts,
+        'away_q2_pts': away_q2_pts,
+        'home_q3_pts': home_q3_pts,
+        'away_q3_pts': away_q3_pts,
+        'home_q4_pts': home_q4_pts,
+        'away_q4_pts': away_q4_pts,
+        'home_rush_yds': stats['home_rush_yds'],
+        'away_rush_yds': stats['away_rush_yds'],
+        'home_rush_plays': stats['home_rush_plays'],
+        'away_rush_plays': stats['away_rush_plays'],
+        'home_rush_tds': stats['home_rush_tds'],
+        'away_rush_tds': stats['away_rush_tds'],
+        'home_rush_first_downs': counts['rush_first_downs'][0],
+        'away_rush_first_downs': counts['rush_first_downs'][1],
+        'home_early_down_rush_att': counts['early_down_rush_att'][0],
+        'away_early_down_rush_att': counts['early_down_rush_att'][1],
+        'home_early_down_rush_successes': counts['early_down_rush_successes'][0],
+        'away_early_down_rush_successes': counts['early_down_rush_successes'][1],
+        'home_rushes_ends': counts['rushes_ends'][0],
+        'away_rushes_ends': counts['rushes_ends'][1],
+        'home_gross_pass_yds': stats['home_gross_pass_yds'],
+        'away_gross_pass_yds': stats['away_gross_pass_yds'],
+        'home_pass_att': stats['home_pass_att'],
+        'away_pass_att': stats['away_pass_att'],
+        'home_pass_compl': stats['home_pass_compl'],
+        'away_pass_compl': stats['away_pass_compl'],
+        'home_pass_tds': stats['home_pass_tds'],
+        'away_pass_tds': stats['away_pass_tds'],
+        'home_ints_thrown': stats['home_ints_thrown'],
+        'away_ints_thrown': stats['away_ints_thrown'],
+        'home_pass_first_downs': counts['pass_first_downs'][0],
+        'away_pass_first_downs': counts['pass_first_downs'][1],
+        'home_sacks_taken': stats['home_sacks_taken'],
+        'away_sacks_taken': stats['away_sacks_taken'],
+        'home_sack_yds_taken': stats['home_sack_yds_taken'],
+        'away_sack_yds_taken': stats['away_sack_yds_taken'],
+        'home_early_down_pass_att': counts['early_down_pass_att'][0],
+        'away_early_down_pass_att': counts['early_down_pass_att'][1],
+        'home_early_down_pass_successes': counts['early_down_pass_successes'][0],
+        'away_early_down_pass_successes': counts['early_down_pass_successes'][1],
+        'home_pass_att_middle': counts['pass_att_middle'][0],
+        'away_pass_att_middle': counts['pass_att_middle'][1],
+        'home_completions_middle': counts['completions_middle'][0],
+        'away_completions_middle': counts['completions_middle'][1],
+        'home_short_pass_att': counts['short_pass_att'][0],
+        'away_short_pass_att': counts['short_pass_att'][1],
+        'home_short_completions': counts['short_completions'][0],
+        'away_short_completions': counts['short_completions'][1],
+        'home_deep_pass_att': counts['deep_pass_att'][0],
+        'away_deep_pass_att': counts['deep_pass_att'][1],
+        'home_deep_completions': counts['deep_completions'][0],
+        'away_deep_completions': counts['deep_completions'][1],
+        'home_explosive_plays': counts['explosive_plays'][0],
+        'away_explosive_plays': counts['explosive_plays'][1],
+        'home_third_down_att': stats['home_third_down_att'],
+        'away_third_down_att': stats['away_third_down_att'],
+        'home_third_down_suc': stats['home_third_down_suc'],
+        'away_third_down_suc': stats['away_third_down_suc'],
+        'home_fourth_downs': counts['fourth_downs'][0],
+        'away_fourth_downs': counts['fourth_downs'][1],
+        'home_fourth_down_att': stats['home_fourth_down_att'],
+        'away_fourth_down_att': stats['away_fourth_down_att'],
+        'home_fourth_down_suc': stats['home_fourth_down_suc'],
+        'away_fourth_down_suc': stats['away_fourth_down_suc'],
+        'home_2pt_att': two_pt_conv_att[0],
+        'away_2pt_att': two_pt_conv_att[1],
+        'home_2pt_conv_suc': two_pt_conv_suc[0],
+        'away_2pt_conv_suc': two_pt_conv_suc[1],
+        'home_rz_trips': home_rz_trips,
+        'away_rz_trips': away_rz_trips,
+        'home_rz_tds': rz_tds[0],
+        'away_rz_tds': rz_tds[1],
+        'home_fumbles_lost': stats['home_fumbles_lost'],
+        'away_fumbles_lost': stats['away_fumbles_lost'],
+        'home_turnovers': stats['home_turnovers'],
+        'away_turnovers': stats['away_turnovers'],
+        'home_punts': stats['home_punts'],
+        'away_punts': stats['away_punts'],
+        'home_punt_yds': stats['home_punt_yds'],
+        'away_punt_yds': stats['away_punt_yds'],
+        'home_punts_inside_20': counts['punts_inside_20'][0],
+        'away_punts_inside_20': counts['punts_inside_20'][1],
+        'home_punt_returns': stats['home_punt_returns'],
+        'away_punt_returns': stats['away_punt_returns'],
+        'home_punt_return_yds': stats['home_punt_return_yds'],
+        'away_punt_return_yds': stats['away_punt_return_yds'],
+        'home_kickoffs_received': counts['kickoffs_received'][0],
+        'away_kickoffs_received': counts['kickoffs_received'][1],
+        'home_kickoff_returns': stats['home_kickoff_returns'],
+        'away_kickoff_returns': stats['away_kickoff_returns'],
+        'home_kickoff_return_yds': stats['home_kickoff_return_yds'],
+        'away_kickoff_return_yds': stats['away_kickoff_return_yds'],
+        'home_pos_time': poss_time[0],
+        'home_total_pos_time': stats['home_total_pos_time'],
+        'away_pos_time': poss_time[1],
+        'away_total_pos_time': stats['away_total_pos_time'],
+        'home_avg_sfp': avg_sfp[0],
+        'away_avg_sfp': avg_sfp[1],
+        'home_pat_a': pat_a[0],
+        'away_pat_a': pat_a[1],
+        'home_pat_m': pat_m[0],
+        'away_pat_m': pat_m[1],
+        'home_fga_39': counts['fga_39'][0],
+        'away_fga_39': counts['fga_39'][1],
+        'home_fgm_39': counts['fgm_39'][0],
+        'away_fgm_39': counts['fgm_39'][1],
+        'home_fga_40_49': counts['fga_40_49'][0],
+        'away_fga_40_49': counts['fga_40_49'][1],
+        'home_fgm_40_49': counts['fgm_40_49'][0],
+        'away_fgm_40_49': counts['fgm_40_49'][1],
+        'home_fga_50': counts['fga_50'][0],
+        'away_fga_50': counts['fga_50'][1],
+        'home_fgm_50': counts['fgm_50'][0],
+        'away_fgm_50': counts['fgm_50'][1],
+        'home_off_pen_yds': counts['off_pen_yds'][0],
+        'away_off_pen_yds': counts['off_pen_yds'][1],
+        'home_def_pen_yds': counts['def_pen_yds'][0],
+        'away_def_pen_yds': counts['def_pen_yds'][1]
+    })
+
+
+def build_game_items(page, player_teams):
+# return the game item followed by the play items (list) of a parsed game page given the teams of the players looked
+# up for it, and the stage timings of the game (dict of stage -> seconds, see PFRscraper.metrics) (run in parse
+# workers)
+    timings = dict(page['timings'])
+    with timed(timings, 'plays'):
+        plays = get_game_plays(page, player_teams)
+    with timed(timings, 'stats'):
+        items = [build_game_item(page, plays)] + build_play_items(page, plays)
+    return items, timings
+
+
+def read_game(url, body, encoding):
+# return the raw data (dict, with the stage timings of the page so far in 'timings') and player lookups of a game
+# page from its downloaded body (run in parse workers)
+    timings = {}
+    with timed(timings, 'html'):
+        page = read_game_page(HtmlResponse(url=url, body=body, encoding=encoding), timings)
+    # html: parsing the page and its commented tables, everything but reading the tables
+    timings['html'] -= timings['read_html']
+    with timed(timings, 'lookups'):
+        lookups = get_player_lookups(page)
+    page['timings'] = timings
+    return page, lookups
@@ -2,11 +2,249 @@
 #
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/items.html
+#
+# Each field declares the type (pandas dtype) its values are stored with in
+# the columnar dataset of the item (see PFRscraper.columnar); scraped values
+# may still be strings ('35') and are converted when exported. key: the
+# fields identifying a record (the latest copy is kept when reading).
 
 import scrapy
 
 
+DATE = 'datetime64[ns]'
+STR = 'string'
+INT = 'Int16'
+FLOAT = 'float64'
+BOOL = 'boolean'
+
+
 class PfrscraperItem(scrapy.Item):
     # define the fields for your item here like:
     # name = scrapy.Field()
     pass
+
+
+class GameItem(scrapy.Item):
+    # one game with its team stats (spider)
+    dataset = 'games'
+    key = ['game_date', 'home_team_code']
+
+    # game info
+    game_date = scrapy.Field(dtype=DATE)
+    game_time = scrapy.Field(dtype=STR)
+    stadium = scrapy.Field(dtype=STR)
+    weather = scrapy.Field(dtype=STR)
+    referee = scrapy.Field(dtype=STR)
+    vegas_o_u = scrapy.Field(dtype=FLOAT)
+    vegas_spread = scrapy.Field(dtype=STR)
+    home_team = scrapy.Field(dtype=STR)
+    away_team = scrapy.Field(dtype=STR)
+    home_team_code = scrapy.Field(dtype=STR)
+    away_team_code = scrapy.Field(dtype=STR)
+    home_coach = scrapy.Field(dtype=STR)
+    away_coach = scrapy.Field(dtype=STR)
+
+    # score (quarter points exclude OT)
+    home_pts = scrapy.Field(dtype=INT)
+    away_pts = scrapy.Field(dtype=INT)
+    home_q1_pts = scrapy.Field(dtype=INT)
+    away_q1_pts = scrapy.Field(dtype=INT)
+    home_q2_pts = scrapy.Field(dtype=INT)
+    away_q2_pts = scrapy.Field(dtype=INT)
+    home_q3_pts = scrapy.Field(dtype=INT)
+    away_q3_pts = scrapy.Field(dtype=INT)
+    home_q4_pts = scrapy.Field(dtype=INT)
+    away_q4_pts = scrapy.Field(dtype=INT)
+
+    # rushing (kneels excluded)
+    home_rush_yds = scrapy.Field(dtype=INT)
+    away_rush_yds = scrapy.Field(dtype=INT)
+    home_rush_plays = scrapy.Field(dtype=INT)
+    away_rush_plays = scrapy.Field(dtype=INT)
+    home_rush_tds = scrapy.Field(dtype=INT)
+    away_rush_tds = scrapy.Field(dtype=INT)
+    home_rush_first_downs = scrapy.Field(dtype=INT)
+    away_rush_first_downs = scrapy.Field(dtype=INT)
+    home_early_down_rush_att = scrapy.Field(dtype=INT)
+    away_early_down_rush_att = scrapy.Field(dtype=INT)
+    home_early_down_rush_successes = scrapy.Field(dtype=INT)
+    away_early_down_rush_successes = scrapy.Field(dtype=INT)
+    home_rushes_ends = scrapy.Field(dtype=INT)
+    away_rushes_ends = scrapy.Field(dtype=INT)
+
+    # passing (spikes excluded)
+    home_gross_pass_yds = scrapy.Field(dtype=INT)
+    away_gross_pass_yds = scrapy.Field(dtype=INT)
+    home_pass_att = scrapy.Field(dtype=INT)
+    away_pass_att = scrapy.Field(dtype=INT)
+    home_pass_compl = scrapy.Field(dtype=INT)
+    away_pass_compl = scrapy.Field(dtype=INT)
+    home_pass_tds = scrapy.Field(dtype=INT)
+    away_pass_tds = scrapy.Field(dtype=INT)
+    home_ints_thrown = scrapy.Field(dtype=INT)
+    away_ints_thrown = scrapy.Field(dtype=INT)
+    home_pass_first_downs = scrapy.Field(dtype=INT)
+    away_pass_first_downs = scrapy.Field(dtype=INT)
+    home_sacks_taken = scrapy.Field(dtype=INT)
+    away_sacks_taken = scrapy.Field(dtype=INT)
+    home_sack_yds_taken = scrapy.Field(dtype=INT)
+    away_sack_yds_taken = scrapy.Field(dtype=INT)
+    home_early_down_pass_att = scrapy.Field(dtype=INT)
+    away_early_down_pass_att = scrapy.Field(dtype=INT)
+    home_early_down_pass_successes = scrapy.Field(dtype=INT)
+    away_early_down_pass_successes = scrapy.Field(dtype=INT)
+    home_pass_att_middle = scrapy.Field(dtype=INT)
+    away_pass_att_middle = scrapy.Field(dtype=INT)
+    home_completions_middle = scrapy.Field(dtype=INT)
+    away_completions_middle = scrapy.Field(dtype=INT)
+    home_short_pass_att = scrapy.Field(dtype=INT)
+    away_short_pass_att = scrapy.Field(dtype=INT)
+    home_short_completions = scrapy.Field(dtype=INT)
+    away_short_completions = scrapy.Field(dtype=INT)
+    home_deep_pass_att = scrapy.Field(dtype=INT)
+    away_deep_pass_att = scrapy.Field(dtype=INT)
+    home_deep_completions = scrapy.Field(dtype=INT)
+    away_deep_completions = scrapy.Field(dtype=INT)
+    home_explosive_plays = scrapy.Field(dtype=INT)
+    away_explosive_plays = scrapy.Field(dtype=INT)
+
+    # downs
+    home_third_down_att = scrapy.Field(dtype=INT)
+    away_third_down_att = scrapy.Field(dtype=INT)
+    home_third_down_suc = scrapy.Field(dtype=INT)
+    away_third_down_suc = scrapy.Field(dtype=INT)
+    home_fourth_downs = scrapy.Field(dtype=INT)
+    away_fourth_downs = scrapy.Field(dtype=INT)
+    home_fourth_down_att = scrapy.Field(dtype=INT)
+    away_fourth_down_att = scrapy.Field(dtype=INT)
+    home_fourth_down_suc = scrapy.Field(dtype=INT)
+    away_fourth_down_suc = scrapy.Field(dtype=INT)
+
+    # scoring chances
+    home_2pt_att = scrapy.Field(dtype=INT)
+    away_2pt_att = scrapy.Field(dtype=INT)
+    home_2pt_conv_suc = scrapy.Field(dtype=INT)
+    away_2pt_conv_suc = scrapy.Field(dtype=INT)
+    home_rz_trips = scrapy.Field(dtype=INT)
+    away_rz_trips = scrapy.Field(dtype=INT)
+    home_rz_tds = scrapy.Field(dtype=INT)
+    away_rz_tds = scrapy.Field(dtype=INT)
+
+    # turnovers
+    home_fumbles_lost = scrapy.Field(dtype=INT)
+    away_fumbles_lost = scrapy.Field(dtype=INT)
+    home_turnovers = scrapy.Field(dtype=INT)
+    away_turnovers = scrapy.Field(dtype=INT)
+
+    # kicking game
+    home_punts = scrapy.Field(dtype=INT)
+    away_punts = scrapy.Field(dtype=INT)
+    home_punt_yds = scrapy.Field(dtype=INT)
+    away_punt_yds = scrapy.Field(dtype=INT)
+    home_punts_inside_20 = scrapy.Field(dtype=INT)
+    away_punts_inside_20 = scrapy.Field(dtype=INT)
+    home_punt_returns = scrapy.Field(dtype=INT)
+    away_punt_returns = scrapy.Field(dtype=INT)
+    home_punt_return_yds = scrapy.Field(dtype=INT)
+    away_punt_return_yds = scrapy.Field(dtype=INT)
+    home_kickoffs_received = scrapy.Field(dtype=INT)
+    away_kickoffs_received = scrapy.Field(dtype=INT)
+    home_kickoff_returns = scrapy.Field(dtype=INT)
+    away_kickoff_returns = scrapy.Field(dtype=INT)
+    home_kickoff_return_yds = scrapy.Field(dtype=INT)
+    away_kickoff_return_yds = scrapy.Field(dtype=INT)
+
+    # possession (minutes; pos_time excludes OT) and average starting field position
+    home_pos_time = scrapy.Field(dtype=FLOAT)
+    home_total_pos_time = scrapy.Field(dtype=FLOAT)
+    away_pos_time = scrapy.Field(dtype=FLOAT)
+    away_total_pos_time = scrapy.Field(dtype=FLOAT)
+    home_avg_sfp = scrapy.Field(dtype=FLOAT)
+    away_avg_sfp = scrapy.Field(dtype=FLOAT)
+
+    # kicks
+    home_pat_a = scrapy.Field(dtype=INT)
+    away_pat_a = scrapy.Field(dtype=INT)
+    home_pat_m = scrapy.Field(dtype=INT)
+    away_pat_m = scrapy.Field(dtype=INT)
+    home_fga_39 = scrapy.Field(dtype=INT)
+    away_fga_39 = scrapy.Field(dtype=INT)
+    home_fgm_39 = scrapy.Field(dtype=INT)
+    away_fgm_39 = scrapy.Field(dtype=INT)
+    home_fga_40_49 = scrapy.Field(dtype=INT)
+    away_fga_40_49 = scrapy.Field(dtype=INT)
+    home_fgm_40_49 = scrapy.Field(dtype=INT)
+    away_fgm_40_49 = scrapy.Field(dtype=INT)
+    home_fga_50 = scrapy.Field(dtype=INT)
+    away_fga_50 = scrapy.Field(dtype=INT)
+    home_fgm_50 = scrapy.Field(dtype=INT)
+    away_fgm_50 = scrapy.Field(dtype=INT)
+
+    # penalties
+    home_off_pen_yds = scrapy.Field(dtype=INT)
+    away_off_pen_yds = scrapy.Field(dtype=INT)
+    home_def_pen_yds = scrapy.Field(dtype=INT)
+    away_def_pen_yds = scrapy.Field(dtype=INT)
+
+
+class MatchupItem(scrapy.Item):
+    # final score and vegas line of one game (spider2)
+    dataset = 'matchups'
+    key = ['game_date', 'home_team_code']
+
+    game_date = scrapy.Field(dtype=DATE)
+    home_team = scrapy.Field(dtype=STR)
+    away_team = scrapy.Field(dtype=STR)
+    home_team_code = scrapy.Field(dtype=STR)
+    away_team_code = scrapy.Field(dtype=STR)
+    home_pts = scrapy.Field(dtype=INT)
+    away_pts = scrapy.Field(dtype=INT)
+    vegas_o_u = scrapy.Field(dtype=FLOAT)
+    vegas_spread = scrapy.Field(dtype=STR)
+
+
+class PlayItem(scrapy.Item):
+    # one play-by-play row of a game (spider), as classified in its play frame
+    # (see PFRscraper.plays.get_play_frame); team fields are 0 home, 1 away,
+    # -1 unknown.
+    dataset = 'plays'
+    key = ['game_id', 'row']
+
+    game_id = scrapy.Field(dtype=STR)
+    game_date = scrapy.Field(dtype=DATE)
+    row = scrapy.Field(dtype=INT)
+    clock = scrapy.Field(dtype=INT)  # remaining (potential) game time in seconds
+    home_drive = scrapy.Field(dtype=INT)
+    away_drive = scrapy.Field(dtype=INT)
+    off = scrapy.Field(dtype=INT)
+    down = scrapy.Field(dtype=STR)
+    to_go = scrapy.Field(dtype=INT)
+    yd_line = scrapy.Field(dtype=INT)
+    yds = scrapy.Field(dtype=INT)
+    description = scrapy.Field(dtype=STR)
+
+    # play types
+    play = scrapy.Field(dtype=BOOL)
+    extra_pt = scrapy.Field(dtype=BOOL)
+    two_pt_att = scrapy.Field(dtype=BOOL)
+    field_goal = scrapy.Field(dtype=BOOL)
+    fg_good = scrapy.Field(dtype=BOOL)
+    kickoff = scrapy.Field(dtype=BOOL)
+    kicking_team = scrapy.Field(dtype=INT)
+    punt = scrapy.Field(dtype=BOOL)
+    touchback = scrapy.Field(dtype=BOOL)
+    sack = scrapy.Field(dtype=BOOL)
+    kneel = scrapy.Field(dtype=BOOL)
+    spike = scrapy.Field(dtype=BOOL)
+    pass_play = scrapy.Field(dtype=BOOL)
+    complete = scrapy.Field(dtype=BOOL)
+    rush = scrapy.Field(dtype=BOOL)
+    short = scrapy.Field(dtype=BOOL)
+    deep = scrapy.Field(dtype=BOOL)
+    middle = scrapy.Field(dtype=BOOL)
+    ends = scrapy.Field(dtype=BOOL)
+
+    # penalties
+    penalty = scrapy.Field(dtype=BOOL)
+    pen_yards = scrapy.Field(dtype=INT)
+    pen_team = scrapy.Field(dtype=INT)
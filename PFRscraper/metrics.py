@@ -0,0 +1,116 @@
+# Crawl and parse instrumentation
+#
+# Stage timings of each game parse (recorded in the parse workers and returned with their results), download
+# latencies, rate limiter waits and queue depths are aggregated into histograms kept in the scrapy stats
+# ('metrics/<name>/count', '/sum', '/max' and one '/le_<bound>' count per bucket), so they show in the stats dump of
+# every crawl with no other state to share between components. MetricsReport (see PFRscraper.extensions) writes
+# them to a JSON report and a Prometheus text file when the spider closes.
+
+import bisect
+import re
+import time
+from contextlib import contextmanager
+
+
+# histogram bucket upper bounds (seconds, or counts for queue depths)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, float('inf'))
+
+# number of slowest games kept in the stats
+SLOWEST_GAMES = 10
+
+# game parse stages (in order): lxml tree and commented tables, table arrays (read_html equivalent), play
+# classification (play loop), waiting on player gamelogs, team stats and items
+GAME_STAGES = ('html', 'read_html', 'plays', 'lookups', 'stats')
+
+
+@contextmanager
+def timed(timings, stage):
+# add the time (seconds) spent in a with block to timings[stage]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def get_bound_name(bound):
+    return 'inf' if bound == float('inf') else '%g' % bound
+
+
+def observe(stats, name, value):
+# add a value to a histogram kept in the stats
+    prefix = 'metrics/' + name
+    stats.inc_value(prefix + '/count')
+    stats.inc_value(prefix + '/sum', value, start=0.0)
+    stats.max_value(prefix + '/max', value)
+    stats.inc_value(prefix + '/le_' + get_bound_name(BUCKETS[bisect.bisect_left(BUCKETS, value)]))
+
+
+def record_game(stats, game_id, timings):
+# add the stage timings (dict of stage -> seconds) of a game parse to the stage histograms and the slowest games
+    for stage, seconds in timings.items():
+        observe(stats, 'parse_' + stage + '_seconds', seconds)
+    total = sum(timings.values())
+    observe(stats, 'parse_game_seconds', total)
+    slowest = stats.get_value('metrics/slowest_games', [])
+    if(len(slowest) < SLOWEST_GAMES or total > slowest[-1][1]):
+        slowest = sorted(slowest + [(game_id, round(total, 6), {s: round(t, 6) for s, t in timings.items()})],
+                         key=lambda game: -game[1])[:SLOWEST_GAMES]
+        stats.set_value('metrics/slowest_games', slowest)
+
+
+def get_histograms(stats):
+# return a dict of histogram name -> {'count', 'sum', 'max', 'mean', 'buckets': [(bound, cumulative count), ...]}
+# read from a stats dict
+    histograms = {}
+    for key, value in stats.items():
+        m = re.match(r'metrics/(.+)/(count|sum|max|le_.+)$', key)
+        if(m is None):
+            continue
+        histogram = histograms.setdefault(m.group(1), {'count': 0, 'sum': 0.0, 'max': 0.0, 'counts': {}})
+        if(m.group(2).startswith('le_')):
+            histogram['counts'][m.group(2)[3:]] = value
+        else:
+            histogram[m.group(2)] = value
+    for histogram in histograms.values():
+        counts = histogram.pop('counts')
+        histogram['mean'] = histogram['sum'] / histogram['count'] if histogram['count'] else 0.0
+        histogram['buckets'] = []
+        total = 0
+        for bound in BUCKETS:
+            total += counts.get(get_bound_name(bound), 0)
+            histogram['buckets'].append((get_bound_name(bound), total))
+    return histograms
+
+
+def get_quantile(histogram, q):
+# return the upper bucket bound (float) below which a fraction q of a histogram's values fall
+    for bound, count in histogram['buckets']:
+        if(count >= q * histogram['count']):
+            return float(bound)
+    return float('inf')
+
+
+def get_metric_name(name):
+    return 'pfr_' + re.sub(r'[^a-zA-Z0-9_]', '_', name).strip('_')
+
+
+def get_prometheus_text(stats):
+# return the Prometheus text format exposition (str) of a stats dict: histograms, then every other numeric stat as
+# a gauge
+    lines = []
+    histograms = get_histograms(stats)
+    for name, histogram in sorted(histograms.items()):
+        metric = get_metric_name(name)
+        lines.append('# TYPE %s histogram' % metric)
+        for bound, count in histogram['buckets']:
+            lines.append('%s_bucket{le="%s"} %d' % (metric, '+Inf' if bound == 'inf' else bound, count))
+        lines.append('%s_sum %r' % (metric, float(histogram['sum'])))
+        lines.append('%s_count %d' % (metric, histogram['count']))
+    for key, value in sorted(stats.items()):
+        if(key.startswith('metrics/') or isinstance(value, bool) or not isinstance(value, (int, float))):
+            continue
+        metric = get_metric_name(key)
+        lines.append('# TYPE %s gauge' % metric)
+        lines.append('%s %r' % (metric, value))
+    return '\n'.join(lines) + '\n'
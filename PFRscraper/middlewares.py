@@ -3,11 +3,22 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import math
+import time
+from email.utils import parsedate_to_datetime
+
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.utils.defer import maybe_deferred_to_future
+from scrapy.utils.httpobj import urlparse_cached
+from twisted.internet.task import deferLater
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
 
+from PFRscraper.archive import PageArchive
+from PFRscraper.metrics import observe
+
 
 class PfrscraperSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -101,3 +112,190 @@ class PfrscraperDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info('Spider opened: %s' % spider.name)
+
+
+class PageArchiveMiddleware:
+    # Stores every downloaded page (after redirects and decompression) in the
+    # page archive, keyed by request url, so games can be re-parsed offline.
+
+    def __init__(self, archive):
+        self.archive = archive
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('ARCHIVE_ENABLED'):
+            raise NotConfigured
+        s = cls(PageArchive.from_settings(crawler.settings))
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def process_response(self, request, response, spider):
+        self.archive.store(request.url, response.status, getattr(response, 'encoding', None), response.body)
+        return response
+
+    def spider_closed(self, spider):
+        self.archive.close()
+
+
+class HostLimiter:
+    # Request rate limit of one host: a token bucket (rate tokens per second,
+    # at most burst saved up) whose rate adapts to the host's responses,
+    # creeping up while latency stays under target and halving when the host
+    # throttles us (which also pauses the host until it lets us back in).
+
+    def __init__(self, rate, min_rate, max_rate, burst, target_latency):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.target_latency = target_latency
+        self.latency = None
+        self.next_token = 0.0
+        self.paused_until = 0.0
+
+    def reserve(self, now):
+    # take the next token and return the seconds (float) to wait before using it
+        start = max(self.next_token, now - (self.burst - 1) / self.rate, self.paused_until)
+        self.next_token = start + 1 / self.rate
+        return max(0.0, start - now)
+
+    def observe(self, latency):
+    # adapt the rate to the latency (seconds) of a successful download
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency = 0.8 * self.latency + 0.2 * latency
+        if self.latency <= self.target_latency:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+        else:
+            self.rate = max(self.min_rate, self.rate * 0.9)
+
+    def throttled(self, now, delay):
+    # back off after the host throttled (or failed) a request: halve the rate and pause for delay seconds
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.paused_until = max(self.paused_until, now + delay)
+        self.next_token = max(self.next_token, self.paused_until)
+
+    def concurrency(self, limit):
+    # return the number of requests (int) to keep in flight to sustain the rate at the observed latency
+        if self.latency is None:
+            return 1
+        return max(1, min(limit, math.ceil(self.rate * self.latency)))
+
+
+class ThrottleMiddleware:
+    # Rate limits requests per host (see HostLimiter) and re-queues requests
+    # the host throttled or failed (429, 5xx, timeouts, ...) after an
+    # exponential backoff, or the host's Retry-After, so error pages never
+    # reach the spiders. Requests still failing after THROTTLE_MAX_RETRIES
+    # are dropped (IgnoreRequest, handled by the request's errback). The
+    # downloader slot of each host keeps just enough requests in flight for
+    # the current rate. Replaces scrapy's RetryMiddleware and DOWNLOAD_DELAY.
+    # Rate limiter waits, queue depths (requests waiting on the rate limiter,
+    # requests downloading), download latencies and retries per request go
+    # to histograms in the stats (see PFRscraper.metrics).
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('THROTTLE_ENABLED'):
+            raise NotConfigured
+        self.crawler = crawler
+        self.rate = settings.getfloat('THROTTLE_START_RATE')
+        self.min_rate = settings.getfloat('THROTTLE_MIN_RATE')
+        self.max_rate = settings.getfloat('THROTTLE_MAX_RATE')
+        self.burst = settings.getint('THROTTLE_BURST', 1)
+        self.target_latency = settings.getfloat('THROTTLE_TARGET_LATENCY')
+        self.max_retries = settings.getint('THROTTLE_MAX_RETRIES')
+        self.backoff_base = settings.getfloat('THROTTLE_BACKOFF_BASE')
+        self.backoff_max = settings.getfloat('THROTTLE_BACKOFF_MAX')
+        self.retry_codes = set(int(c) for c in settings.getlist('THROTTLE_RETRY_CODES'))
+        self.throttle_codes = set(int(c) for c in settings.getlist('THROTTLE_CODES'))
+        self.max_concurrency = settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN')
+        self.hosts = {}
+        # requests waiting on the rate limiter
+        self.waiting = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def get_host(self, request):
+        host = urlparse_cached(request).hostname
+        if host not in self.hosts:
+            self.hosts[host] = HostLimiter(self.rate, self.min_rate, self.max_rate, self.burst,
+                                           self.target_latency)
+        return self.hosts[host]
+
+    async def process_request(self, request, spider):
+        wait = self.get_host(request).reserve(time.monotonic())
+        stats = self.crawler.stats
+        observe(stats, 'throttle_wait_seconds', wait)
+        observe(stats, 'throttle_queue_depth', self.waiting)
+        observe(stats, 'downloads_active', len(self.crawler.engine.downloader.active))
+        if wait > 0:
+            from twisted.internet import reactor
+            self.waiting += 1
+            try:
+                await maybe_deferred_to_future(deferLater(reactor, wait, lambda: None))
+            finally:
+                self.waiting -= 1
+        return None
+
+    def process_response(self, request, response, spider):
+        host = self.get_host(request)
+        if response.status in self.retry_codes:
+            if response.status in self.throttle_codes:
+                delay = self.get_retry_after(response)
+            else:
+                delay = None
+            return self.retry(request, host, 'status %d' % response.status, delay, spider)
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            observe(self.crawler.stats, 'request_latency_seconds', latency)
+            if response.status == 200:
+                host.observe(latency)
+                self.set_concurrency(request, host)
+        observe(self.crawler.stats, 'request_retries', request.meta.get('throttle_retries', 0))
+        return response
+
+    def process_exception(self, request, exception, spider):
+        if isinstance(exception, IgnoreRequest):
+            return None
+        return self.retry(request, self.get_host(request), exception.__class__.__name__, None, spider)
+
+    def get_retry_after(self, response):
+    # return the seconds (float) to wait given by a response's Retry-After header, None if it has none
+        value = response.headers.get('Retry-After')
+        if value is None:
+            return None
+        value = value.decode('latin-1').strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def retry(self, request, host, reason, delay, spider):
+    # return a copy of a failed request to download again once the host's backoff is over
+        retries = request.meta.get('throttle_retries', 0) + 1
+        stats = self.crawler.stats
+        if retries > self.max_retries:
+            stats.inc_value('throttle/max_reached')
+            spider.logger.error('Gave up on %s after %d retries (%s)' % (request.url, self.max_retries, reason))
+            raise IgnoreRequest('%s after %d retries' % (reason, self.max_retries))
+        if delay is None:
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (retries - 1))
+        host.throttled(time.monotonic(), delay)
+        self.set_concurrency(request, host)
+        stats.inc_value('throttle/retry_count')
+        stats.inc_value('throttle/retry/%s' % reason)
+        spider.logger.info('Retrying %s in %.0fs (%s, retry %d)' % (request.url, delay, reason, retries))
+        r = request.replace(dont_filter=True)
+        r.meta['throttle_retries'] = retries
+        return r
+
+    def set_concurrency(self, request, host):
+        slot = self.crawler.engine.downloader.slots.get(request.meta.get('download_slot'))
+        if slot is not None:
+            slot.concurrency = host.concurrency(self.max_concurrency)
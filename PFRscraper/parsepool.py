@@ -0,0 +1,53 @@
+# Parse worker pool
+#
+# CPU heavy parsing (reading game pages, building game items) can be run in a pool of worker processes so the
+# crawl process keeps downloading while games are parsed. Callbacks await ParsePool.run(); at most max_in_flight
+# parses are submitted at once, the others wait (holding their responses, which makes scrapy slow down downloads
+# once too many responses are being processed). With 0 workers functions run directly in the crawl process.
+
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet.defer import Deferred, DeferredSemaphore
+from twisted.python.failure import Failure
+
+
+class ParsePool:
+
+    def __init__(self, workers=0, max_in_flight=16):
+        self.executor = ProcessPoolExecutor(workers) if workers > 0 else None
+        self.slots = DeferredSemaphore(max_in_flight)
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.getint('PARSE_WORKERS', 0), settings.getint('PARSE_MAX_IN_FLIGHT', 16))
+
+    def submit(self, fn, *args):
+    # return a Deferred fired in the reactor thread with the result of fn(*args) run in a worker process
+        from twisted.internet import reactor
+        d = Deferred()
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(lambda f: reactor.callFromThread(self.done, d, f))
+        return d
+
+    def done(self, d, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            d.errback(Failure(e))
+        else:
+            d.callback(result)
+
+    async def run(self, fn, *args):
+    # return fn(*args), run in a worker process if the pool has workers
+        if(self.executor is None):
+            return fn(*args)
+        await maybe_deferred_to_future(self.slots.acquire())
+        try:
+            return await maybe_deferred_to_future(self.submit(fn, *args))
+        finally:
+            self.slots.release()
+
+    def close(self):
+        if(self.executor is not None):
+            self.executor.shutdown(wait=False)
@@ -6,8 +6,117 @@
 
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
+from scrapy.exceptions import DropItem, NotConfigured
+
+from PFRscraper.canonical import canonicalize_item
+from PFRscraper.columnar import get_frame, write_partitions
+from PFRscraper.database import GameDatabase
 
 
 class PfrscraperPipeline:
     def process_item(self, item, spider):
         return item
+
+
+class CanonicalPipeline:
+    # Replaces the former team codes and stadium names and the misspelled
+    # referee and coach names of the items by their canonical form (see
+    # PFRscraper.canonical) before they're stored.
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('CANONICAL_ENABLED'):
+            raise NotConfigured
+        return cls()
+
+    def process_item(self, item, spider):
+        return canonicalize_item(item)
+
+
+class ColumnarExportPipeline:
+    # Buffers the items of each dataset (GameItem, MatchupItem, PlayItem) and
+    # writes them in batches (COLUMNAR_BATCH_SIZES items per dataset) to the
+    # season partitioned columnar datasets in COLUMNAR_DIR (see
+    # PFRscraper.columnar).
+
+    def __init__(self, path, batch_sizes, compression):
+        self.path = path
+        self.batch_sizes = batch_sizes
+        self.compression = compression
+        # item class -> buffered items (list of dicts)
+        self.batches = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('COLUMNAR_ENABLED'):
+            raise NotConfigured
+        return cls(settings.get('COLUMNAR_DIR', 'data'), settings.getdict('COLUMNAR_BATCH_SIZES'),
+                   settings.get('COLUMNAR_COMPRESSION', 'zstd'))
+
+    def process_item(self, item, spider):
+        if not hasattr(item, 'dataset'):
+            return item
+        batch = self.batches.setdefault(item.__class__, [])
+        batch.append(ItemAdapter(item).asdict())
+        if len(batch) >= self.batch_sizes.get(item.dataset, 256):
+            self.flush(item.__class__)
+        return item
+
+    def flush(self, item_class):
+        batch = self.batches.pop(item_class, [])
+        if batch:
+            write_partitions(self.path, item_class.dataset, get_frame(batch, item_class), self.compression)
+
+    def close_spider(self, spider):
+        for item_class in list(self.batches):
+            self.flush(item_class)
+
+
+class DatabasePipeline:
+    # Upserts the items of each dataset (GameItem, MatchupItem, PlayItem)
+    # into the game database (see PFRscraper.database), DATABASE_BATCH_SIZE
+    # items per table at a time.
+
+    def __init__(self, db, batch_size):
+        self.db = db
+        self.batch_size = batch_size
+        # item class -> buffered items (list of dicts)
+        self.batches = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('DATABASE_ENABLED'):
+            raise NotConfigured
+        return cls(GameDatabase.from_settings(settings), settings.getint('DATABASE_BATCH_SIZE', 1000))
+
+    def process_item(self, item, spider):
+        if not hasattr(item, 'dataset'):
+            return item
+        batch = self.batches.setdefault(item.__class__, [])
+        batch.append(ItemAdapter(item).asdict())
+        if len(batch) >= self.batch_size:
+            self.flush(item.__class__)
+        return item
+
+    def flush(self, item_class):
+        batch = self.batches.pop(item_class, [])
+        if batch:
+            self.db.upsert(item_class, get_frame(batch, item_class))
+
+    def close_spider(self, spider):
+        for item_class in list(self.batches):
+            self.flush(item_class)
+        self.db.close()
+
+
+class FeedFilterPipeline:
+    # Stops the items of datasets other than the spider's feed_dataset (e.g.
+    # the matchup and play items of the game spider) before they reach the
+    # feed exports, so a feed only holds one kind of item.
+
+    def process_item(self, item, spider):
+        if getattr(item, 'dataset', spider.feed_dataset) != spider.feed_dataset:
+            raise DropItem('stored in the %s dataset' % item.dataset, log_level='DEBUG')
+        return item
@@ -0,0 +1,270 @@
+# Play-by-play helpers shared by the game spiders
+#
+# Play and drive times are handled as remaining (potential) game time in seconds, which decreases monotonically
+# through a game. Drive start times are converted once per game so each play's drive can be found with a binary
+# search instead of re-parsing the drive tables for every play.
+#
+# Plays are classified from their descriptions column-wise (pandas string ops over the whole play-by-play table)
+# into a play frame, and the per-team counters of a game are grouped sums over that frame.
+
+import numpy as np
+import pandas as pd
+
+
+def get_seconds(clock, quarter):
+# return (potential) remaining game time in seconds (int) based on given game clock (str) and quarter (str)
+    t = clock.split(':')
+    return (900 * (5 - int(quarter)) + 60 * int(t[0]) + int(t[1]))
+
+
+def get_play_clocks(play_by_play):
+# return the remaining game time (int array) at each play-by-play row; rows without a readable clock (quarter
+# headers, timeouts, ...) keep the time of the row before them (row 0 is the 1st quarter header)
+    clocks = np.full(len(play_by_play), 5*900, dtype=int)
+    clock = 5*900
+    for i in range(1, len(play_by_play)):
+        quarter = play_by_play[i,0]
+        if(quarter == 'OT'):
+            quarter = '5'
+        try:
+            clock = get_seconds(play_by_play[i,1], quarter)
+        except:
+            pass
+        clocks[i] = clock
+    return clocks
+
+
+def get_drive_starts(drives):
+# return the start time (int array, remaining game seconds) of each drive in a drives table; a drive without a
+# readable quarter is given the quarter of the drive before it (set in the table)
+    starts = np.zeros(len(drives), dtype=int)
+    for d in range(len(drives)):
+        try:
+            starts[d] = get_seconds(drives[d, 2], drives[d, 1])
+        except:
+            drives[d, 1] = drives[d - 1, 1]
+            starts[d] = get_seconds(drives[d, 2], drives[d, 1])
+    return starts
+
+
+def get_drive_numbers(starts, clocks):
+# return the number of drives (int array) a team has started at each play clock: drives are counted in order until
+# the first one starting after the play, i.e. a play at time t belongs to drive n where n counts the leading drives
+# whose running minimum start time is still >= t
+    if(len(starts) == 0):
+        return np.zeros(len(clocks), dtype=int)
+    return np.searchsorted(-np.minimum.accumulate(starts), -np.asarray(clocks), side='right')
+
+
+def get_play_drives(home_drives, away_drives, clocks):
+# return the play-to-drive mapping of a game: the drive number (int array, 0 before a team's first drive) of each
+# play for both teams (shape (plays, 2)), and the team on offense at each play (int array, 0 home, 1 away)
+    home_starts, away_starts = get_drive_starts(home_drives), get_drive_starts(away_drives)
+    drive_n = np.stack([get_drive_numbers(home_starts, clocks), get_drive_numbers(away_starts, clocks)], axis=1)
+
+    # the team whose current drive started last is on offense
+    off = np.ones(len(clocks), dtype=int)
+    both = (drive_n[:,0] > 0) & (drive_n[:,1] > 0)
+    off[both] = (home_starts[drive_n[both,0] - 1] >= away_starts[drive_n[both,1] - 1]).astype(int)
+    off[(drive_n[:,0] > 0) & (drive_n[:,1] == 0)] = 0
+    return drive_n, off
+
+
+def contains(text, *patterns, regex=False):
+# return a bool array: text (str series) contains any of the patterns
+    found = np.zeros(len(text), dtype=bool)
+    for pattern in patterns:
+        found |= text.str.contains(pattern, regex=regex).to_numpy()
+    return found
+
+
+def get_int_tokens(tokens, default):
+# return the values (float array) of tokens (series) that are plain integers, default for all other tokens
+    tokens = pd.Series(tokens, dtype=object)
+    ints = tokens.where(tokens.str.fullmatch(r'[+-]?\d+').fillna(False).astype(bool))
+    return pd.to_numeric(ints).fillna(default).to_numpy(dtype=float)
+
+
+def get_play_frame(play_by_play, team_codes, drive_n, off, player_teams):
+# return the play frame of a game: one row per play-by-play row (indexed by row, header row 0 excluded) with the
+# type flags, yardage, field position and penalty of each play
+# (drive_n, off: play-to-drive mapping from get_play_drives; player_teams: dict of (row, 'penalty' or 'kickoff') ->
+# team code of the penalized player / kicker, None if unknown)
+    rows = np.arange(1, len(play_by_play))
+    frame = pd.DataFrame(index=rows)
+    frame['home_drive'] = drive_n[1:,0]
+    frame['away_drive'] = drive_n[1:,1]
+    frame['off'] = off[1:]
+    frame['down'] = pd.Series(play_by_play[1:,2], index=rows, dtype=object)
+    frame['to_go'] = np.trunc(pd.to_numeric(pd.Series(play_by_play[1:,3]), errors='coerce').fillna(100)).astype(int).to_numpy()
+    
+    if(play_by_play.shape[1] > 5):
+        description = pd.Series(play_by_play[1:,5], index=rows, dtype=object).astype(str)
+    else:
+        description = pd.Series('', index=rows)
+    frame['description'] = description
+    
+    # play types
+    frame['play'] = play = ~contains(description, '(no play)')
+    frame['extra_pt'] = contains(description, ' extra point ')
+    frame['two_pt_att'] = contains(description, 'Two Point Attempt')
+    frame['field_goal'] = contains(description, ' field goal ')
+    frame['fg_good'] = contains(description, 'field goal good')
+    frame['kickoff'] = contains(description, ' kicks off ')
+    frame['punt'] = contains(description, ' punts ')
+    frame['touchback'] = contains(description, 'touchback')
+    frame['sack'] = contains(description, ' sacked ')
+    frame['kneel'] = contains(description, ' kneels for ')
+    frame['spike'] = play & contains(description, 'spiked the ball')
+    passed = contains(description, ' pass ')
+    frame['pass_play'] = play & ~frame['two_pt_att'].to_numpy() & passed
+    frame['complete'] = frame['pass_play'].to_numpy() & contains(description, ' pass complete ')
+    frame['rush'] = play & ~passed & contains(description, ' for ') & ~frame[['extra_pt', 'two_pt_att', 'field_goal',
+                    'kickoff', 'punt', 'kneel', 'sack']].to_numpy().any(axis=1)
+    
+    # pass depth / direction and rush direction
+    frame['short'] = contains(description, r'short (?:left|middle|right)', regex=True)
+    frame['deep'] = contains(description, r'deep (?:left|middle|right)', regex=True)
+    frame['middle'] = contains(description, r'(?:short|deep) middle', regex=True)
+    frame['ends'] = contains(description, r'(?:left|right) end', regex=True)
+    
+    # penalties: the detail is the text after the last 'Penalty on ', the penalized team is read from its first
+    # word (team code), else from the penalized player's team, else from whether the foul is offensive or defensive
+    penalty_detail = description.str.rsplit('Penalty on ', n=1).str[-1]
+    penalized = penalty_detail.str.split(' ').str[0]
+    frame['penalty'] = penalty = contains(description, 'Penalty on ')\
+        & (~contains(penalty_detail, '(Declined)', '(declined)', '(Offsetting)', '(offsetting)')\
+           | contains(description, '(Accepted)', '(accepted)'))
+    pen_yards = get_int_tokens(penalty_detail.str.split(' yard', n=1).str[0].str.split(' ').str[-1], 0)
+    frame['pen_yards'] = np.where(penalty, pen_yards, 0).astype(int)
+    
+    home_named = contains(penalized, team_codes[0])
+    away_named = penalty & ~home_named & contains(penalized, team_codes[1])
+    pen_team = np.full(len(rows), -1)
+    pen_team[penalty & home_named] = 0
+    pen_team[away_named] = 1
+    offensive = contains(penalty_detail, 'Offensive', 'offensive')
+    defensive = contains(penalty_detail, 'Defensive', 'defensive')
+    for p in np.nonzero(penalty & ~home_named & ~away_named)[0]:
+        code = player_teams.get((rows[p], 'penalty'))
+        if(code is None):
+            if(offensive[p]):
+                pen_team[p] = off[rows[p]]
+            elif(defensive[p]):
+                pen_team[p] = 1 - off[rows[p]]
+        elif(code in team_codes):
+            pen_team[p] = team_codes.index(code)
+    frame['pen_team'] = pen_team
+    
+    # yards gained (less the offense's own penalty yards)
+    own_pen_yards = frame['pen_yards'].to_numpy() * (frame['off'].to_numpy() == pen_team)
+    gain = description.str.split(' yard', n=1).str[0]
+    yds = get_int_tokens(gain.str.split(' ').str[-1], np.nan)
+    yds = np.where(contains(gain, 'for no gain'), 0 - own_pen_yards, np.where(np.isnan(yds), 0, yds - own_pen_yards))
+    frame['yds'] = yds.astype(int)
+    
+    # field position: yards from the offense's own goal line (100 if unknown)
+    location = pd.Series(play_by_play[1:,4], index=rows, dtype=object).str.split(' ')
+    line = get_int_tokens(location.str[1], np.nan)
+    own_side = (location.str[0] == pd.Series(np.array(team_codes)[frame['off']], index=rows)).to_numpy()
+    frame['yd_line'] = np.where(np.isnan(line), 100, np.where(own_side, line, 100 - line)).astype(int)
+    
+    # kicking team of each kickoff (0 home, 1 away, -1 unknown)
+    kicking_team = np.full(len(rows), -1)
+    for p in np.nonzero(play & frame['kickoff'].to_numpy())[0]:
+        code = player_teams.get((rows[p], 'kickoff'))
+        if(code in team_codes):
+            kicking_team[p] = team_codes.index(code)
+    frame['kicking_team'] = kicking_team
+    return frame
+
+
+def get_team_sums(team, values):
+# return the sums of values (array) grouped by team index (0 home, 1 away, -1 neither) as a [home, away] list of ints
+    keep = team >= 0
+    return [int(x) for x in np.bincount(team[keep], weights=values[keep], minlength=2)[:2]]
+
+
+def get_play_counts(frame):
+# return a dict of stat name -> (team (int array, 0 home, 1 away, -1 not counted), value (array)) giving the team
+# each play of a play frame counts toward for a stat and by how much
+    f = {c: frame[c].to_numpy() for c in frame.columns if c not in ('description', 'down')}
+    off, yds, to_go, play = f['off'], f['yds'], f['to_go'], f['play']
+    early_down = frame['down'].isin(['1', '2']).to_numpy()
+    first_down = yds >= to_go
+    early_success = ((frame['down'] == '1').to_numpy() & (yds >= 0.4*to_go))\
+                    | ((frame['down'] == '2').to_numpy() & (yds >= 0.6*to_go))
+    field_goal = play & f['field_goal']
+    
+    plays = {
+        'qb_kneels': play & f['kneel'],
+        'qb_kneel_yds': (play & f['kneel']) * yds,
+        'rush_first_downs': f['rush'] & first_down,
+        'early_down_rush_att': f['rush'] & early_down,
+        'early_down_rush_successes': f['rush'] & early_success,
+        'rushes_ends': f['rush'] & f['ends'],
+        'qb_spikes': f['spike'],
+        'pass_first_downs': f['complete'] & first_down,
+        'early_down_pass_att': f['pass_play'] & early_down,
+        'early_down_pass_successes': f['complete'] & early_success,
+        'pass_att_middle': f['pass_play'] & f['middle'],
+        'completions_middle': f['complete'] & f['middle'],
+        'short_pass_att': f['pass_play'] & f['short'],
+        'short_completions': f['complete'] & f['short'],
+        'deep_pass_att': f['pass_play'] & f['deep'],
+        'deep_completions': f['complete'] & f['deep'],
+        'explosive_plays': (f['rush'] & (early_down | first_down) & (yds >= 12))\
+                           | (f['complete'] & (early_down | first_down) & (yds >= 16)),
+        'fourth_downs': play & (frame['down'] == '4').to_numpy(),
+        'fga_39': field_goal & (yds > 0) & (yds <= 39),
+        'fgm_39': field_goal & (yds > 0) & (yds <= 39) & f['fg_good'],
+        'fga_40_49': field_goal & (yds >= 40) & (yds <= 49),
+        'fgm_40_49': field_goal & (yds >= 40) & (yds <= 49) & f['fg_good'],
+        'fga_50': field_goal & (yds >= 50),
+        'fgm_50': field_goal & (yds >= 50) & f['fg_good'],
+        'punts_inside_20': play & f['punt'] & ((f['yd_line'] + yds) > 80) & ~f['touchback'],
+    }
+    counts = {name: (off, values) for name, values in plays.items()}
+    
+    # the receiving team of a kickoff is the team not kicking it
+    kicking_team = f['kicking_team']
+    counts['kickoffs_received'] = (np.where(kicking_team >= 0, 1 - kicking_team, -1), np.ones(len(off)))
+    
+    # penalties by the offense (or on kicks / punts) are offensive penalty yards, the others defensive ones
+    # (offensive penalties of an unknown team count toward the away team)
+    pen_team = f['pen_team']
+    offensive = f['penalty'] & ((off == pen_team) | (play & (f['kickoff'] | f['punt'])))
+    defensive = f['penalty'] & ~offensive & (pen_team >= 0)
+    counts['off_pen_yds'] = (np.where(offensive, pen_team % 2, -1), f['pen_yards'])
+    counts['def_pen_yds'] = (np.where(defensive, pen_team, -1), f['pen_yards'])
+    return counts
+
+
+def get_team_counts(frame):
+# return a dict of stat name -> [home, away] counts summed over the plays of a play frame
+    return {name: get_team_sums(team, values) for name, (team, values) in get_play_counts(frame).items()}
+
+
+def get_game_counts(frame, games):
+# return the counts of many games at once: a DataFrame (one row per game id, sorted) of 'home_<stat>' and
+# 'away_<stat>' counts summed over the plays of a play frame holding the plays of all the games (games: the game id
+# of each play)
+    ids, game = np.unique(np.asarray(games), return_inverse=True)
+    counts = {}
+    for name, (team, values) in get_play_counts(frame).items():
+        keep = team >= 0
+        sums = np.bincount(2*game[keep] + team[keep], weights=np.asarray(values)[keep], minlength=2*len(ids))
+        counts['home_' + name] = sums[0::2].astype(int)
+        counts['away_' + name] = sums[1::2].astype(int)
+    return pd.DataFrame(counts, index=pd.Index(ids, name='game_id'))
+
+
+def get_red_zone_drives(frame, n_home_drives, n_away_drives):
+# return arrays (one per team, one value per drive) marking the drives with a play run from inside the opponent's 20
+    rz = [np.zeros(n_home_drives), np.zeros(n_away_drives)]
+    entered = (frame['play'] & (frame['yd_line'] > 80) & (frame['yd_line'] < 100) & ~frame['extra_pt']\
+               & ~frame['kickoff'] & ~frame['two_pt_att']).to_numpy()
+    for t, column in enumerate(['home_drive', 'away_drive']):
+        drive = frame[column].to_numpy()
+        rz[t][drive[entered & (frame['off'].to_numpy() == t) & (drive > 0)] - 1] = 1
+    return rz[0], rz[1]
@@ -0,0 +1,189 @@
+# Offline re-parse of archived pages
+#
+# Runs a spider's callbacks over the pages in the page archive (see PFRscraper.archive) instead of the network:
+# start pages are parsed in this process, then every request they produce (one per game) is replayed with all of
+# its follow-up requests (player gamelogs, ...) in a pool of worker processes. Requests whose page was never
+# archived fail the same way a failed download does, and error pages (non-2xx) only reach the callbacks that take
+# them, as scrapy's HttpErrorMiddleware does in a crawl. Items get the canonical names a crawl's CanonicalPipeline
+# gives them (if CANONICAL_ENABLED), and the items of the spider's feed dataset are written in the order of the start
+# pages.
+#
+# usage: python -m PFRscraper.replay spider nfl-game-data.csv [--workers 8] [-a start_year=2006 -a end_year=2021]
+
+import argparse
+import asyncio
+import inspect
+import os
+import sys
+from multiprocessing import Pool
+
+from scrapy.crawler import Crawler
+from scrapy.exceptions import IgnoreRequest
+from scrapy.exporters import CsvItemExporter, JsonItemExporter, JsonLinesItemExporter
+from scrapy.http import HtmlResponse, Request, Response
+from scrapy.settings import Settings
+from scrapy.spidermiddlewares.httperror import HttpError
+from scrapy.spiderloader import SpiderLoader
+from scrapy.utils.misc import load_object
+from twisted.python.failure import Failure
+
+from PFRscraper.archive import PageArchive
+from PFRscraper.canonical import canonicalize_item
+
+
+exporters = {'.csv': CsvItemExporter, '.json': JsonItemExporter, '.jl': JsonLinesItemExporter,
+             '.jsonl': JsonLinesItemExporter}
+
+# per worker process state (set by init_worker)
+worker = {}
+
+
+def get_settings(archive_dir=None):
+# return the project settings for replaying (stores the spiders keep across crawls are replaced by in-memory ones
+# so a replay only depends on the archive)
+    settings = Settings()
+    settings.setmodule('PFRscraper.settings', priority='project')
+    settings.set('PLAYER_TEAM_STORE', ':memory:')
+    settings.set('GAME_INDEX_STORE', ':memory:')
+    settings.set('PARSE_WORKERS', 0)
+    if(archive_dir is not None):
+        settings.set('ARCHIVE_DIR', archive_dir)
+    return settings
+
+
+def create_spider(name, args, settings):
+    spidercls = SpiderLoader.from_settings(settings).load(name)
+    crawler = Crawler(spidercls, settings)
+    # the callbacks record their parse metrics in the stats (see PFRscraper.metrics), normally set when a crawl starts
+    crawler.stats = load_object(settings['STATS_CLASS'])(crawler)
+    return spidercls.from_crawler(crawler, **args)
+
+
+def get_response(archive, request):
+# return the archived response to a request, None if its page is not in the archive
+    page = archive.load(request.url)
+    if(page is None):
+        return None
+    status, encoding, body = page
+    if(encoding is None):
+        return Response(url=request.url, status=status, body=body, request=request)
+    return HtmlResponse(url=request.url, status=status, body=body, encoding=encoding, request=request)
+
+
+def is_handled(spider, request, response):
+# return whether a response reaches its request's callback (2xx, or a status the request or spider takes)
+    if(200 <= response.status < 300):
+        return True
+    meta = request.meta
+    if(meta.get('handle_httpstatus_all', getattr(spider, 'handle_httpstatus_all', False))):
+        return True
+    return response.status in meta.get('handle_httpstatus_list', getattr(spider, 'handle_httpstatus_list', []))
+
+
+def get_output(result):
+# return the output (list) of a callback; async callbacks are run to completion (pages are parsed in the replay
+# process, so they never wait on anything)
+    if(not inspect.isasyncgen(result)):
+        return list(result or [])
+    output = []
+    async def collect():
+        async for r in result:
+            output.append(r)
+    asyncio.run(collect())
+    return output
+
+
+def run_request(spider, archive, request, follow=True):
+# return the items (list) and, if not following them, the requests (list) produced by a request's callback chain
+    items, requests = [], []
+    queue = [request]
+    while(queue):
+        request = queue.pop(0)
+        response = get_response(archive, request)
+        if(response is not None and is_handled(spider, request, response)):
+            callback = request.callback or spider.parse
+            result = callback(response, **request.cb_kwargs)
+        else:
+            if(response is None):
+                error = IgnoreRequest('page not archived: ' + request.url)
+            else:
+                error = HttpError(response, 'status %d: %s' % (response.status, request.url))
+            if(request.errback is not None):
+                failure = Failure(error)
+                failure.request = request
+                result = request.errback(failure)
+            else:
+                spider.logger.warning(str(error))
+                result = None
+        for r in get_output(result):
+            if(not isinstance(r, Request)):
+                items.append(r)
+            elif(follow):
+                queue.append(r)
+            else:
+                requests.append(r)
+    return items, requests
+
+
+def init_worker(name, args, archive_dir):
+    settings = get_settings(archive_dir)
+    worker['spider'] = create_spider(name, args, settings)
+    worker['archive'] = PageArchive.from_settings(settings)
+
+
+def replay_request(request):
+# replay a request (url, callback name, errback name, cb_kwargs) with all its follow-up requests in a worker
+    spider = worker['spider']
+    url, callback, errback, cb_kwargs = request
+    request = Request(url=url, callback=getattr(spider, callback), cb_kwargs=cb_kwargs, dont_filter=True,
+                      errback=None if errback is None else getattr(spider, errback))
+    return run_request(spider, worker['archive'], request)[0]
+
+
+def replay(name, args, output, workers=None, archive_dir=None):
+# re-parse the archived pages of a spider crawl and export its items to output (.csv, .json or .jl)
+    settings = get_settings(archive_dir)
+    spider = create_spider(name, args, settings)
+    archive = PageArchive.from_settings(settings)
+
+    items = []
+    requests = []
+    for url in spider.start_urls:
+        start_items, start_requests = run_request(spider, archive, Request(url=url, dont_filter=True), follow=False)
+        items.extend(start_items)
+        for r in start_requests:
+            requests.append((r.url, r.callback.__name__, None if r.errback is None else r.errback.__name__, r.cb_kwargs))
+    archive.close()
+
+    with Pool(workers, initializer=init_worker, initargs=(name, args, archive_dir)) as pool:
+        for request_items in pool.imap(replay_request, requests, chunksize=8):
+            items.extend(request_items)
+
+    # as the crawl's item pipelines would (the others only store items): CanonicalPipeline then FeedFilterPipeline
+    if(settings.getbool('CANONICAL_ENABLED')):
+        items = [canonicalize_item(item) for item in items]
+    items = [item for item in items if getattr(item, 'dataset', spider.feed_dataset) == spider.feed_dataset]
+    with open(output, 'wb') as f:
+        exporter = exporters[os.path.splitext(output)[1]](f)
+        exporter.start_exporting()
+        for item in items:
+            exporter.export_item(item)
+        exporter.finish_exporting()
+    return len(items)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-parse archived pages offline.')
+    parser.add_argument('spider')
+    parser.add_argument('output')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--archive', default=None)
+    parser.add_argument('-a', dest='args', action='append', default=[], metavar='NAME=VALUE')
+    options = parser.parse_args(argv)
+    args = dict(a.split('=', 1) for a in options.args)
+    n = replay(options.spider, args, options.output, options.workers, options.archive)
+    print('%d items written to %s' % (n, options.output))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
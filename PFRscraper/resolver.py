@@ -0,0 +1,117 @@
+# Player-to-team resolver used by the spiders
+#
+# Teams are looked up on a player's season gamelog page. Results are keyed by
+# (player path, season) and kept in an in-memory LRU backed by an on-disk
+# sqlite store, so each player-season gamelog is only ever fetched once.
+
+import io
+import json
+import sqlite3
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def get_season(game_date):
+# return the season (int) a game date belongs to (Jan/Feb playoff games count toward the previous season)
+    if(game_date.month < 3):
+        return game_date.year - 1
+    return game_date.year
+
+
+def get_gamelog_teams(text):
+# return a dict of game date (str, YYYY-MM-DD) -> team code (str) parsed from a player gamelog page
+    try:
+        tables = pd.read_html(io.StringIO(text))
+    except ValueError:
+        return {}
+    teams = {}
+    for table in tables:
+        rows = table.to_numpy()
+        if(rows.ndim != 2 or rows.shape[1] < 6):
+            continue
+        seen = set()
+        for row in rows:
+            date = str(row[1])
+            # first row for a date wins within a table, later tables override earlier ones
+            if(date not in seen):
+                seen.add(date)
+                teams[date] = str(row[5])
+    return teams
+
+
+class PlayerTeamResolver:
+
+    def __init__(self, path, cache_size=4096):
+        self.path = path
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.failed = set()
+        self.waiting = {}
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE IF NOT EXISTS player_teams '
+                        '(player TEXT, season INTEGER, teams TEXT, PRIMARY KEY (player, season))')
+        self.db.commit()
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.get('PLAYER_TEAM_STORE', 'player-teams.sqlite'),
+                   settings.getint('PLAYER_TEAM_CACHE_SIZE', 4096))
+
+    def gamelog_url(self, domain, key):
+    # return the url of the gamelog page for a (player path, season) key
+        return domain + key[0].lstrip('/') + '/gamelog/' + str(key[1]) + '/'
+
+    def get(self, key):
+    # return the date -> team dict stored for a key, or None if the key has not been resolved yet
+        if(key in self.cache):
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        row = self.db.execute('SELECT teams FROM player_teams WHERE player = ? AND season = ?', key).fetchone()
+        if(row is None):
+            return None
+        teams = json.loads(row[0])
+        self.remember(key, teams)
+        return teams
+
+    def remember(self, key, teams):
+        self.cache[key] = teams
+        self.cache.move_to_end(key)
+        while(len(self.cache) > self.cache_size):
+            self.cache.popitem(last=False)
+
+    def has(self, key):
+        return (key in self.failed) or (self.get(key) is not None)
+
+    def put(self, key, teams):
+    # store the teams parsed from a key's gamelog page (in memory and on disk)
+        self.remember(key, teams)
+        self.db.execute('INSERT OR REPLACE INTO player_teams VALUES (?, ?, ?)', (key[0], key[1], json.dumps(teams)))
+        self.db.commit()
+
+    def fail(self, key):
+    # mark a key whose gamelog page could not be fetched (kept for this crawl only, so it is retried next run)
+        self.failed.add(key)
+
+    def team(self, key, date):
+    # return the team code (str) of a player on a game date (str), 'NO TEAM' if the player did not play that
+    # day, or None if the player's gamelog could not be fetched
+        if(key in self.failed):
+            return None
+        teams = self.get(key)
+        if(teams is None):
+            return None
+        return teams.get(date, 'NO TEAM')
+
+    def wait(self, key, game_id):
+    # register a game waiting on a key; return True if the key's gamelog still has to be requested
+        first = key not in self.waiting
+        self.waiting.setdefault(key, []).append(game_id)
+        return first
+
+    def release(self, key):
+    # return the ids of all games that were waiting on a key
+        return self.waiting.pop(key, [])
+
+    def close(self):
+        self.db.close()
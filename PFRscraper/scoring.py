@@ -0,0 +1,76 @@
+# Scoring table parsing
+#
+# The scoring table (not commented out on game pages) lists one row per score. Rows are read once into scoring
+# events, from which the conversion (PAT / two point) counts of a game are derived.
+
+
+def get_score_type(description):
+# return the kind of score (str) described by a scoring table description
+    if('field goal' in description):
+        return 'field goal'
+    if('safety' in description.lower()):
+        return 'safety'
+    return 'touchdown'
+
+
+def get_conversion(text):
+# return the conversion kind ('kick', '2pt' or None) and success (bool or None) of a score from the text of its
+# description outside of player links, e.g. ' 23 yard rush (' + ' kick failed)'
+    try:
+        conv = text.split('(')[1]
+    except IndexError:
+        return None, None
+    if('kick' in conv):
+        return 'kick', 'failed' not in conv
+    if(('pass' in conv) | ('run' in conv)):
+        return '2pt', 'failed' not in conv
+    return None, None
+
+
+def get_scoring_events(response):
+# return a list of scoring events (dict) read from the scoring table of a game page
+    events = []
+    quarter = None
+    for row in response.xpath('//table[@id="scoring"]/tbody[1]/tr'):
+        # the quarter is only given on the first score of each quarter
+        quarter = row.xpath('./th[@data-stat="quarter"]/text()').extract_first() or quarter
+        cells = row.xpath('./td')
+        if(len(cells) < 3):
+            continue
+        text = ''.join(cells[2].xpath('./text()').getall())
+        conversion, converted = get_conversion(text)
+        description = ''.join(cells[2].xpath('.//text()').getall())
+        events.append({
+            'quarter': quarter,
+            'time': cells[0].xpath('./text()').extract_first(),
+            'team': cells[1].xpath('./text()').extract_first(),
+            'description': description,
+            'type': get_score_type(description),
+            'conversion': conversion,
+            'converted': converted,
+            'away_score': row.xpath('./td[@data-stat="vis_team_score"]/text()').extract_first(),
+            'home_score': row.xpath('./td[@data-stat="home_team_score"]/text()').extract_first()
+        })
+    return events
+
+
+def get_conversion_counts(events, home_team, away_team):
+# return the PAT attempts / makes and two point attempts / successes of both teams ([home, away] lists) in a game
+    pat_a, pat_m = [0, 0], [0, 0]
+    two_pt_conv_att, two_pt_conv_suc = [0, 0], [0, 0]
+    for e in events:
+        if((e['team'] is None) or (e['conversion'] is None)):
+            continue
+        if(e['team'] in home_team):
+            t = 0
+        elif(e['team'] in away_team):
+            t = 1
+        else:
+            continue
+        if(e['conversion'] == 'kick'):
+            pat_a[t] += 1
+            pat_m[t] += e['converted']
+        else:
+            two_pt_conv_att[t] += 1
+            two_pt_conv_suc[t] += e['converted']
+    return pat_a, pat_m, two_pt_conv_att, two_pt_conv_suc
@@ -50,21 +50,29 @@ ROBOTSTXT_OBEY = False
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
+DOWNLOADER_MIDDLEWARES = {
 #    'PFRscraper.middlewares.PfrscraperDownloaderMiddleware': 543,
-#}
+    'scrapy.downloadermiddlewares.retry.RetryMiddleware': None,
+    'PFRscraper.middlewares.PageArchiveMiddleware': 580,
+    'PFRscraper.middlewares.ThrottleMiddleware': 585,
+}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
+EXTENSIONS = {
 #    'scrapy.extensions.telnet.TelnetConsole': None,
-#}
+    'PFRscraper.extensions.MetricsReport': 500,
+}
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
-#ITEM_PIPELINES = {
+ITEM_PIPELINES = {
 #    'PFRscraper.pipelines.PfrscraperPipeline': 300,
-#}
+    'PFRscraper.pipelines.CanonicalPipeline': 350,
+    'PFRscraper.pipelines.DatabasePipeline': 400,
+    'PFRscraper.pipelines.ColumnarExportPipeline': 500,
+    'PFRscraper.pipelines.FeedFilterPipeline': 900,
+}
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
@@ -86,3 +94,56 @@ ROBOTSTXT_OBEY = False
 #HTTPCACHE_DIR = 'httpcache'
 #HTTPCACHE_IGNORE_HTTP_CODES = []
 #HTTPCACHE_STORAGE = 'scrapy.extensions.httpcache.FilesystemCacheStorage'
+
+# Player team lookups (player gamelog pages) are cached on disk across crawls
+PLAYER_TEAM_STORE = 'player-teams.sqlite'
+PLAYER_TEAM_CACHE_SIZE = 4096
+
+# Index of the games already scraped (per spider), used by incremental crawls (-a incremental=1)
+GAME_INDEX_STORE = 'game-index.sqlite'
+
+# Raw page archive (compressed, content addressed) of every downloaded page, re-parsed offline with
+# python -m PFRscraper.replay
+ARCHIVE_ENABLED = True
+ARCHIVE_DIR = 'archive'
+
+# Parse game pages in worker processes (0: parse in the crawl process) with at most PARSE_MAX_IN_FLIGHT pages
+# parsing or waiting for a worker at a time
+PARSE_WORKERS = 4
+PARSE_MAX_IN_FLIGHT = 16
+
+# Per host rate limit and retries (see PFRscraper.middlewares.ThrottleMiddleware); pro-football-reference blocks
+# clients going over 20 requests per minute for an hour, so the rate (requests per second) stays just under that
+THROTTLE_ENABLED = True
+THROTTLE_START_RATE = 0.25
+THROTTLE_MIN_RATE = 0.02
+THROTTLE_MAX_RATE = 0.3
+THROTTLE_BURST = 1
+THROTTLE_TARGET_LATENCY = 2.0
+THROTTLE_MAX_RETRIES = 5
+# exponential backoff (seconds) after a failed request, unless the host sent a Retry-After (THROTTLE_CODES)
+THROTTLE_BACKOFF_BASE = 15
+THROTTLE_BACKOFF_MAX = 900
+THROTTLE_RETRY_CODES = [408, 429, 500, 502, 503, 504, 522, 524]
+THROTTLE_CODES = [429, 503]
+
+# Canonical team codes, stadium, referee and coach names in the scraped items (see PFRscraper.canonical)
+CANONICAL_ENABLED = True
+
+# Season partitioned, typed columnar (parquet) datasets of the scraped items, read with
+# PFRscraper.columnar.read_dataset
+COLUMNAR_ENABLED = True
+COLUMNAR_DIR = 'data'
+COLUMNAR_BATCH_SIZES = {'games': 256, 'matchups': 256, 'plays': 50000}
+COLUMNAR_COMPRESSION = 'zstd'
+
+# Game database (sqlite) shared by both spiders and the transform step, see PFRscraper.database
+DATABASE_ENABLED = True
+DATABASE_PATH = 'nfl.sqlite'
+DATABASE_BATCH_SIZE = 1000
+
+# Crawl and parse metrics (stage timings, latencies, queue depths; see PFRscraper.metrics) written when the spider
+# closes as a JSON report and a Prometheus text file
+METRICS_ENABLED = True
+METRICS_REPORT = 'metrics.json'
+METRICS_PROMETHEUS_FILE = 'metrics.prom'
@@ -0,0 +1,95 @@
+# Crawl state: index of the games already scraped
+#
+# Games are identified by their pro-football-reference boxscore id (e.g. '202109120crd': game date, '0', home team
+# abbreviation), read from game links or rebuilt from the date and home team code of a row of an existing data
+# file. Ids are kept per dataset (spider) in an on-disk sqlite store so incremental crawls only fetch new games.
+
+import os
+import sqlite3
+
+import pandas as pd
+
+from PFRscraper.columnar import get_dates
+
+
+# dict of team codes and their pro-football-reference boxscore abbreviation (when it is not the lowercase code)
+boxscore_codes = {'ARI': 'crd',
+                  'BAL': 'rav',
+                  'HOU': 'htx',
+                  'IND': 'clt',
+                  'LAC': 'sdg',
+                  'LAR': 'ram',
+                  'LVR': 'rai',
+                  'OAK': 'rai',
+                  'STL': 'ram',
+                  'TEN': 'oti'
+}
+
+
+def get_game_id(url):
+# return the boxscore id (str) of a game page url or link
+    return url.rstrip('/').split('/')[-1].split('.htm')[0]
+
+
+def make_game_id(game_date, home_team_code):
+# return the boxscore id (str) of a game from its date (datetime) and home team code (str)
+    return game_date.strftime('%Y%m%d') + '0' + boxscore_codes.get(home_team_code, home_team_code.lower())
+
+
+def get_csv_game_ids(path):
+# return the boxscore ids (list of str) of the games in a scraped data csv (game_date in one of
+# PFRscraper.columnar.DATE_FORMATS, home_team_code)
+    frame = pd.read_csv(path, encoding='unicode_escape', usecols=['game_date', 'home_team_code'], dtype=str)
+    return [make_game_id(game_date, home_team_code)
+            for game_date, home_team_code in zip(get_dates(frame['game_date']), frame['home_team_code'])]
+
+
+def get_week_urls(domain, start_year, end_year, end_week):
+# return the week page urls (list of str) of all seasons from start_year to end_year, up to week end_week of the
+# last season (2001 & 2002 have 20 weeks including postseason, other seasons 21)
+    urls = []
+    for year in range(start_year, end_year + 1):
+        weeks = 20 if year in (2001, 2002) else 21
+        if(year == end_year):
+            weeks = min(weeks, end_week)
+        for week in range(1, weeks + 1):
+            urls.append(domain + 'years/' + str(year) + '/week_' + str(week) + '.htm')
+    return urls
+
+
+def get_week_season(url):
+# return the season (int) of a week page url
+    return int(url.split('/years/')[1].split('/')[0])
+
+
+class GameIndex:
+
+    def __init__(self, path, dataset, seed=None):
+        self.dataset = dataset
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE IF NOT EXISTS games (dataset TEXT, game_id TEXT, PRIMARY KEY (dataset, game_id))')
+        self.db.commit()
+        # a new index starts from the games already in the dataset's csv
+        if((seed is not None) and (len(self) == 0) and os.path.exists(seed)):
+            self.add_all(get_csv_game_ids(seed))
+
+    @classmethod
+    def from_settings(cls, settings, dataset, seed=None):
+        return cls(settings.get('GAME_INDEX_STORE', 'game-index.sqlite'), dataset, seed)
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM games WHERE dataset = ?', (self.dataset,)).fetchone()[0]
+
+    def has(self, game_id):
+        return self.db.execute('SELECT 1 FROM games WHERE dataset = ? AND game_id = ?',
+                               (self.dataset, game_id)).fetchone() is not None
+
+    def add(self, game_id):
+        self.add_all([game_id])
+
+    def add_all(self, game_ids):
+        self.db.executemany('INSERT OR IGNORE INTO games VALUES (?, ?)', [(self.dataset, i) for i in game_ids])
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
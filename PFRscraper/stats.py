@@ -0,0 +1,105 @@
+# Team stat extraction specs
+#
+# Each spec line maps an output field to where its value is read from, so a new stat is a one-line addition. Fields
+# are output once per team as 'home_<field>' and 'away_<field>'.
+
+import numpy as np
+import pandas as pd
+
+
+# team stats table (one row per stat, away team column 1, home team column 2):
+# (output field, stat row label, position in the '-' separated cell (None: whole cell, 'time': mm:ss in minutes))
+TEAM_STATS = [
+    ('rush_yds', 'Rush-Yds-TDs', 1),
+    ('rush_plays', 'Rush-Yds-TDs', 0),
+    ('rush_tds', 'Rush-Yds-TDs', 2),
+    ('sacks_taken', 'Sacked-Yards', 0),
+    ('sack_yds_taken', 'Sacked-Yards', 1),
+    ('gross_pass_yds', 'Cmp-Att-Yd-TD-INT', 2),
+    ('pass_att', 'Cmp-Att-Yd-TD-INT', 1),
+    ('pass_compl', 'Cmp-Att-Yd-TD-INT', 0),
+    ('pass_tds', 'Cmp-Att-Yd-TD-INT', 3),
+    ('ints_thrown', 'Cmp-Att-Yd-TD-INT', 4),
+    ('third_down_att', 'Third Down Conv.', 1),
+    ('third_down_suc', 'Third Down Conv.', 0),
+    ('fourth_down_att', 'Fourth Down Conv.', 1),
+    ('fourth_down_suc', 'Fourth Down Conv.', 0),
+    ('fumbles_lost', 'Fumbles-Lost', 1),
+    ('turnovers', 'Turnovers', None),
+    ('total_pos_time', 'Time of Possession', 'time'),  # possession time including OT
+]
+
+# kicking/punting table (one row per player, column sums per team): (output field, column)
+PUNTING_STATS = [
+    ('punts', 6),
+    ('punt_yds', 7),
+]
+
+# kick/punt returns table (one row per player, column sums per team): (output field, column)
+RETURN_STATS = [
+    ('kickoff_returns', 2),
+    ('kickoff_return_yds', 3),
+    ('punt_returns', 7),
+    ('punt_return_yds', 8),
+]
+
+SIDES = (('home', 2), ('away', 1))
+
+
+def get_team_stats(team_stats, spec=TEAM_STATS):
+# return a dict of 'home_<field>' / 'away_<field>' -> value for each field of a team stats spec; the row label
+# index is built once and each compound cell is split once
+    rows = {}
+    for r in range(len(team_stats) - 1, -1, -1):
+        rows[team_stats[r, 0]] = r
+
+    cells = {}
+    stats = {}
+    for field, label, position in spec:
+        for side, column in SIDES:
+            key = (label, column)
+            if(key not in cells):
+                cell = team_stats[rows[label], column]
+                if(position is None):
+                    cells[key] = cell
+                elif(position == 'time'):
+                    cells[key] = cell.split(':')
+                else:
+                    cells[key] = cell.split('-')
+            if(position is None):
+                stats[side + '_' + field] = int(cells[key])
+            elif(position == 'time'):
+                stats[side + '_' + field] = int(cells[key][0]) + (int(cells[key][1]) / 60)
+            else:
+                stats[side + '_' + field] = int(cells[key][position])
+    return stats
+
+
+def split_player_table(table, team_codes, width):
+# return the home and away rows of a per-player table listing one team, a 'Player' header row, then the other team
+# (a team with no rows gets a single row of zeros)
+    try:
+        sep = np.where(table[:,0] == 'Player')[0][0]
+        if(table[0,1] == team_codes[1]):
+            return table[sep+1:], table[:sep-1]
+        return table[:sep-1], table[sep+1:]
+    except IndexError:
+        if(table[0,1] == team_codes[1]):
+            return np.zeros((1, width)), table
+        return table, np.zeros((1, width))
+
+
+def get_whole_numbers(cells):
+# return the values (int array) of table cells holding whole numbers, 0 for any other cell (blank, text, ...)
+    numbers = pd.to_numeric(pd.Series(cells, dtype=object), errors='coerce').to_numpy(dtype=float)
+    return np.where(numbers == np.trunc(numbers), numbers, 0).astype(int)
+
+
+def get_player_table_stats(table, team_codes, spec, width):
+# return a dict of 'home_<field>' / 'away_<field>' -> column sum (int) over each team's rows of a per-player table
+    home_rows, away_rows = split_player_table(table, team_codes, width)
+    stats = {}
+    for side, rows in (('home', home_rows), ('away', away_rows)):
+        for field, column in spec:
+            stats[side + '_' + field] = int(get_whole_numbers(rows[:,column]).sum())
+    return stats
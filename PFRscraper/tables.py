@@ -0,0 +1,132 @@
+# Game page table extraction
+#
+# Most tables on a game page are shipped inside html comments (they are only rendered by javascript). The page is
+# parsed once by scrapy; here the comments holding the wanted tables are found by table id and each table is
+# converted to a 2d array the same way pd.read_html(...)[0].to_numpy() would (<thead> or leading <th>-only rows
+# as header, colspan/rowspan expansion, ragged rows padded, numeric columns converted).
+
+import re
+
+import numpy as np
+from lxml import etree, html
+from pandas.io.parsers import TextParser
+
+
+# ids of the commented tables used from a game page
+GAME_TABLES = ('game_info', 'officials', 'team_stats', 'kicking', 'returns', 'home_drives', 'vis_drives', 'pbp')
+
+WHITESPACE = re.compile(r'[\r\n]+|\s{2,}')
+
+
+def get_commented_tables(root, ids=GAME_TABLES):
+# return a dict of table id (str) -> lxml table element for each wanted table found in the comments of a page
+# (root: lxml root of the page, e.g. response.selector.root)
+    tables = {}
+    for comment in root.iter(etree.Comment):
+        text = comment.text or ''
+        if('<table' not in text):
+            continue
+        wanted = [i for i in ids if (i not in tables) and (('id="%s"' % i) in text)]
+        if(not wanted):
+            continue
+        fragment = html.fragment_fromstring(text, create_parent='div')
+        for i in wanted:
+            found = fragment.xpath('.//table[@id=$i]', i=i)
+            if(found):
+                tables[i] = found[0]
+        if(len(tables) == len(ids)):
+            break
+    return tables
+
+
+def get_cell_text(cell):
+    return WHITESPACE.sub(' ', cell.text_content().strip())
+
+
+def expand_rows(rows, remainder=None, overflow=True):
+# return a list of text rows (list of str) for a list of <tr>s, copying rowspan/colspan cells into the cells they
+# cover, and the cells still to be copied into following rows
+    texts = []
+    remainder = remainder if remainder is not None else []
+    for tr in rows:
+        row = []
+        next_remainder = []
+        index = 0
+        for cell in tr.xpath('./td|./th'):
+            while(remainder and remainder[0][0] <= index):
+                prev_i, prev_text, prev_rowspan = remainder.pop(0)
+                row.append(prev_text)
+                if(prev_rowspan > 1):
+                    next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+                index += 1
+            text = get_cell_text(cell)
+            rowspan = int(cell.get('rowspan') or 1)
+            colspan = int(cell.get('colspan') or 1)
+            for _ in range(colspan):
+                row.append(text)
+                if(rowspan > 1):
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+        for prev_i, prev_text, prev_rowspan in remainder:
+            row.append(prev_text)
+            if(prev_rowspan > 1):
+                next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+        texts.append(row)
+        remainder = next_remainder
+
+    if(not overflow):
+        while(remainder):
+            next_remainder = []
+            row = []
+            for prev_i, prev_text, prev_rowspan in remainder:
+                row.append(prev_text)
+                if(prev_rowspan > 1):
+                    next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+            texts.append(row)
+            remainder = next_remainder
+    return texts, remainder
+
+
+def get_header_body_rows(table):
+# return the header <tr>s (<thead>, else leading <th>-only rows) and the data <tr>s of a table
+    header_rows = []
+    for thead in table.xpath('.//thead'):
+        header_rows.extend(thead.xpath('./tr'))
+        if(thead.xpath('./td|./th')):
+            header_rows.append(thead)
+    body_rows = table.xpath('.//tbody//tr') + table.xpath('./tr')
+    if(not header_rows):
+        while(body_rows and all(cell.tag == 'th' for cell in body_rows[0].xpath('./td|./th'))):
+            header_rows.append(body_rows.pop(0))
+    return header_rows, body_rows
+
+
+def get_table_array(table):
+# return a 2d array (values typed per column: int, float or str, nan for empty cells) of the rows of a table
+    for elem in table.xpath('.//style'):
+        elem.drop_tree()
+    for elem in table.xpath('.//*[@style]'):
+        if('display:none' in elem.get('style', '').replace(' ', '')):
+            elem.drop_tree()
+    for br in table.xpath('.//br'):
+        br.tail = '\n' + (br.tail or '')
+
+    header_rows, body_rows = get_header_body_rows(table)
+    footer_rows = table.xpath('.//tfoot//tr')
+
+    header, remainder = expand_rows(header_rows)
+    body, remainder = expand_rows(body_rows, remainder, overflow=len(footer_rows) > 0)
+    footer, _ = expand_rows(footer_rows, remainder, overflow=False)
+
+    rows = body + footer
+    width = max([len(row) for row in header + rows] or [0])
+    if(not rows):
+        return np.empty((0, width), dtype=object)
+    rows = [row + [''] * (width - len(row)) for row in rows]
+    with TextParser(rows, header=None, thousands=',') as parser:
+        return parser.read().to_numpy()
+
+
+def get_column_links(table, column):
+# return the link hrefs (list of str) in a column (1-based index among the <td> cells) of each data row of a table
+    return [[str(href) for href in row.xpath('./td[%d]//a/@href' % column)] for row in get_header_body_rows(table)[1]]
@@ -0,0 +1,411 @@
+# Game features
+#
+# The features of the transform notebook as a library. FeatureBuilder holds the normalized game and matchup data of a
+# run (read_data) with their team and matchup indexes, and builds the feature rows (one per game) of any games of the
+# game data at once: game fields, head-to-head counts (PFRtransform.matchups), rolling team stats weighted over the
+# teams' previous games (PFRtransform.rolling, ROLLING_STATS and RATIO_STATS), last game stats and season-to-date
+# margins (PFRtransform.season).
+#
+# The features of a game only depend on the games before it, so games can be built in any split: with workers,
+# build_features builds chunks of the games in a pool of worker processes and joins them in game order. Where the
+# platform can fork, the workers are forked from the process holding the builder and share its game data (copy on
+# write) instead of each receiving a copy.
+#
+# The game and matchup data are read from the scraped data csvs, the spiders' columnar datasets (a directory, see
+# PFRscraper.columnar) or their game database (.sqlite, see PFRscraper.database), only the columns the features are
+# built from (get_columns). The whole history is read even when only some seasons are asked for: the features of a
+# game are built from the previous games of its teams, so the seasons only select the games built and written.
+#
+# usage: python -m PFRtransform.features nfl-game-data.csv nfl-team-matchup-data.csv nfl-transformed-game-data.csv
+#                                        [--store nfl-feature-store] [--workers 8] [--seasons 2019 2020 2021]
+#        python -m PFRtransform.features data data nfl-transformed-game-data.csv   (columnar datasets)
+#        python -m PFRtransform.features nfl.sqlite nfl.sqlite nfl-transformed-game-data.csv   (game database)
+
+import argparse
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from PFRscraper import canonical
+from PFRscraper.items import GameItem, MatchupItem
+from PFRtransform.index import MatchupIndex, TeamGameIndex
+from PFRtransform.matchups import get_head_to_head
+from PFRtransform.normalize import normalize_games, normalize_matchups
+from PFRtransform.rolling import get_columns as get_stat_columns
+from PFRtransform.rolling import get_last_stats, get_rolling_ratios, get_rolling_stats
+from PFRtransform.schema import read_source
+from PFRtransform.season import SEASON_STATS, get_season_to_date, get_seasons
+from PFRtransform.store import FeatureStore, get_game_ids, get_version
+
+
+# version of the feature code, part of the feature store version (bump when a feature changes)
+# 2: away_turnover_margin from the away team's own stats, season-to-date margins of a season's first game from the
+#    game's own row
+FEATURE_VERSION = 2
+
+# weights of a team's past games (most recent first) in its rolling stats
+PAST_GAME_COEF = [1/9, 1/9, 1/9, 1/9, 1/9, 1/9, 1/18, 1/18, 1/18, 1/18, 1/18, 1/18]
+# additional weights of past games where the team played at the same / the other venue (home or away) as in the game
+MATCH_VISIT_STAT_COEF = 0.6
+NON_MATCH_VISIT_STAT_COEF = 0.4
+
+# games of a week: the games with team stats start after the first len(past_game_coef) weeks of the game data
+GAMES_PER_WEEK = 16
+
+# team stats of a game: name -> expression of game_data stats of one team (without home_ / away_ prefix, opp_ for its
+# opponent's, see PFRtransform.rolling)
+ROLLING_STATS = {
+    'pos_time': 'pos_time',
+    'pts_per_game': 'pts',
+    'pts_per_sec_half': 'q3_pts + q4_pts',
+    'pts_per_play': '(6*rush_tds + 6*pass_tds + pat_m + 2*`2pt_conv_suc` + 3*fgm_39 + 3*fgm_40_49 + 3*fgm_50) '
+                    '/ (rush_plays + pass_att + sacks_taken)',
+    'yds_per_play': '(rush_yds + gross_pass_yds - sack_yds_taken) / (rush_plays + pass_att + sacks_taken)',
+    'time_per_play': 'total_pos_time / (rush_plays + pass_att + sacks_taken + punt_returns + kickoff_returns)',
+    'perc_rush': 'rush_plays / (rush_plays + pass_att + sacks_taken)',
+    'perc_fstdown_rush': 'rush_first_downs / (rush_first_downs + pass_first_downs)',
+    'epr': 'explosive_plays / (rush_plays + pass_att + sacks_taken)',
+    'fumble_rate': 'fumbles_lost / (rush_plays + pass_att + sacks_taken + punt_returns + kickoff_returns)',
+    'int_rate': 'ints_thrown / pass_att',
+    'sack_rate': 'sacks_taken / (pass_att + sacks_taken)',
+    'turnover_margin': 'opp_turnovers - turnovers',
+    'thrdown_conv': 'third_down_suc / third_down_att',
+    'pts_100': 'pts / ((rush_yds + gross_pass_yds - sack_yds_taken) / 100)',
+    'avg_starting_field_pos': 'avg_sfp',
+    'off_pen_yds': 'off_pen_yds',
+    'def_pen_yds': 'def_pen_yds',
+    'rush_ypc': 'rush_yds / rush_plays',
+    'perc_rush_ends': 'rushes_ends / rush_plays',
+    'early_down_rush_suc': 'early_down_rush_successes / early_down_rush_att',
+    'early_down_pass_suc': 'early_down_pass_successes / early_down_pass_att',
+    'perc_pass_middle': 'pass_att_middle / pass_att',
+    'pass_compl_rate': 'pass_compl / pass_att',
+    'adj_net_yds_per_att': '(gross_pass_yds + 20*pass_tds - 45*ints_thrown - sack_yds_taken) / (pass_att + sacks_taken)'
+}
+
+# ratio team stats, past games with a 0 denominator left out: name -> (numerator, denominator) expressions
+RATIO_STATS = {
+    'perc_frthdown_att': ('fourth_down_att', 'fourth_downs'),
+    'frthdown_conv': ('fourth_down_suc', 'fourth_down_att'),
+    'rze': ('rz_tds', 'rz_trips'),
+    'pat': ('pat_m', 'pat_a'),
+    'FG_39': ('fgm_39', 'fga_39'),
+    'FG_49': ('fgm_40_49', 'fga_40_49'),
+    'FG_50': ('fgm_50', 'fga_50'),
+    'yds_per_punt': ('punt_yds', 'punts'),
+    'punts_in_20': ('punts_inside_20', 'punts'),
+    '2pt_conv': ('`2pt_conv_suc`', '`2pt_att`'),
+    'perc_2pt_att': ('`2pt_att`', 'pat_a + `2pt_att`'),
+    'yds_per_punt_return': ('punt_return_yds', 'punt_returns'),
+    'perc_kickoffs_returned': ('kickoff_returns', 'kickoffs_received'),
+    'yds_per_kickoff_return': ('kickoff_return_yds', 'kickoff_returns'),
+    'short_pass_compl_rate': ('short_completions', 'short_pass_att'),
+    'deep_pass_compl_rate': ('deep_completions', 'deep_pass_att'),
+    'pass_compl_rate_middle': ('completions_middle', 'pass_att_middle')
+}
+
+# game features: name -> game data column
+GAME_FEATURES = {
+    'indoor_stadium': 'indoor_stadium',
+    'divisional': 'divisional_game',
+    'stadium': 'stadium',
+    'game_time': 'game_time',
+    'referee': 'referee',
+    'temp': 'temp',
+    'humidity': 'humidity',
+    'wind_speed': 'wind',
+    'vegas_o_u': 'vegas_o_u',
+    'o_u_result': 'o_u_result',
+    'vegas_home_spread': 'vegas_home_spread',
+    'home_covered_spread': 'home_covered_spread'
+}
+
+# head-to-head features (see PFRtransform.matchups.get_head_to_head)
+HEAD_TO_HEAD_FEATURES = ['team_matchups_over', 'team_matchups_under', 'team_matchups_h_covered',
+                         'team_matchups_a_covered']
+
+# team features, one for the home team and one for the away team of a game (home_<name>, away_<name>): name ->
+# (source, stat), a game data column of the team ('game', without its home_ / away_ prefix), the days since its last
+# game ('schedule'), a weighted offensive / defensive stat ('off' / 'def', ROLLING_STATS and RATIO_STATS), a stat in
+# its last game ('last', ROLLING_STATS) or a season-to-date sum ('season', SEASON_STATS)
+TEAM_FEATURES = {
+    'coach': ('game', 'coach'),
+    'rest_days': ('schedule', 'rest_days'),
+    'pos_time': ('off', 'pos_time'),
+    'off_pts_per_game': ('off', 'pts_per_game'),
+    'def_pts_per_game': ('def', 'pts_per_game'),
+    'off_pts_per_sec_half': ('off', 'pts_per_sec_half'),
+    'def_pts_per_sec_half': ('def', 'pts_per_sec_half'),
+    'off_pts_per_play': ('off', 'pts_per_play'),
+    'def_pts_per_play': ('def', 'pts_per_play'),
+    'off_yds_per_play': ('off', 'yds_per_play'),
+    'def_yds_per_play': ('def', 'yds_per_play'),
+    'off_time_per_play': ('off', 'time_per_play'),
+    'def_time_per_play': ('def', 'time_per_play'),
+    'off_perc_rush': ('off', 'perc_rush'),
+    'def_perc_rush': ('def', 'perc_rush'),
+    'off_perc_fstdown_rush': ('off', 'perc_fstdown_rush'),
+    'def_perc_fstdown_rush': ('def', 'perc_fstdown_rush'),
+    'off_epr': ('off', 'epr'),
+    'def_epr': ('def', 'epr'),
+    'off_fumble_rate': ('off', 'fumble_rate'),
+    'def_fumble_rate': ('def', 'fumble_rate'),
+    'off_int_rate': ('off', 'int_rate'),
+    'def_int_rate': ('def', 'int_rate'),
+    'off_sack_rate': ('off', 'sack_rate'),
+    'def_sack_rate': ('def', 'sack_rate'),
+    'turnover_margin': ('off', 'turnover_margin'),
+    'lw_turnover_margin': ('last', 'turnover_margin'),
+    'off_thrdown_conv': ('off', 'thrdown_conv'),
+    'def_thrdown_conv': ('def', 'thrdown_conv'),
+    'off_perc_frthdown_att': ('off', 'perc_frthdown_att'),
+    'def_perc_frthdown_att': ('def', 'perc_frthdown_att'),
+    'off_frthdown_conv': ('off', 'frthdown_conv'),
+    'def_frthdown_conv': ('def', 'frthdown_conv'),
+    'off_rze': ('off', 'rze'),
+    'def_rze': ('def', 'rze'),
+    'pat': ('off', 'pat'),
+    'FG_39': ('off', 'FG_39'),
+    'FG_49': ('off', 'FG_49'),
+    'FG_50': ('off', 'FG_50'),
+    'yds_per_punt': ('off', 'yds_per_punt'),
+    'punts_in_20': ('off', 'punts_in_20'),
+    'def_pts_100': ('def', 'pts_100'),
+    'off_2pt_conv': ('off', '2pt_conv'),
+    'def_2pt_conv': ('def', '2pt_conv'),
+    'off_perc_2pt_att': ('off', 'perc_2pt_att'),
+    'def_perc_2pt_att': ('def', 'perc_2pt_att'),
+    'off_yds_per_punt_return': ('off', 'yds_per_punt_return'),
+    'def_yds_per_punt_return': ('def', 'yds_per_punt_return'),
+    'off_perc_kickoffs_returned': ('off', 'perc_kickoffs_returned'),
+    'def_perc_kickoffs_returned': ('def', 'perc_kickoffs_returned'),
+    'off_yds_per_kickoff_return': ('off', 'yds_per_kickoff_return'),
+    'def_yds_per_kickoff_return': ('def', 'yds_per_kickoff_return'),
+    'off_short_pass_compl_rate': ('off', 'short_pass_compl_rate'),
+    'def_short_pass_compl_rate': ('def', 'short_pass_compl_rate'),
+    'off_deep_pass_compl_rate': ('off', 'deep_pass_compl_rate'),
+    'def_deep_pass_compl_rate': ('def', 'deep_pass_compl_rate'),
+    'off_pass_compl_rate_middle': ('off', 'pass_compl_rate_middle'),
+    'def_pass_compl_rate_middle': ('def', 'pass_compl_rate_middle'),
+    'off_avg_starting_field_pos': ('off', 'avg_starting_field_pos'),
+    'def_avg_starting_field_pos': ('def', 'avg_starting_field_pos'),
+    'off_pen_yds': ('off', 'off_pen_yds'),
+    'def_pen_yds': ('off', 'def_pen_yds'),
+    'opp_off_pen_yds': ('def', 'off_pen_yds'),
+    'opp_def_pen_yds': ('def', 'def_pen_yds'),
+    'off_rush_ypc': ('off', 'rush_ypc'),
+    'def_rush_ypc': ('def', 'rush_ypc'),
+    'off_perc_rush_ends': ('off', 'perc_rush_ends'),
+    'def_perc_rush_ends': ('def', 'perc_rush_ends'),
+    'off_early_down_rush_suc': ('off', 'early_down_rush_suc'),
+    'def_early_down_rush_suc': ('def', 'early_down_rush_suc'),
+    'off_early_down_pass_suc': ('off', 'early_down_pass_suc'),
+    'def_early_down_pass_suc': ('def', 'early_down_pass_suc'),
+    'off_perc_pass_middle': ('off', 'perc_pass_middle'),
+    'def_perc_pass_middle': ('def', 'perc_pass_middle'),
+    'off_pass_compl_rate': ('off', 'pass_compl_rate'),
+    'def_pass_compl_rate': ('def', 'pass_compl_rate'),
+    'off_adj_net_yds_per_att': ('off', 'adj_net_yds_per_att'),
+    'def_adj_net_yds_per_att': ('def', 'adj_net_yds_per_att'),
+    'margin_o_u': ('season', 'margin_o_u'),
+    'margin_ats': ('season', 'margin_ats'),
+    'record_margin': ('season', 'record_margin'),
+    'pt_margin_o_u': ('season', 'pt_margin_o_u'),
+    'pt_margin_ats': ('season', 'pt_margin_ats'),
+    'pt_margin': ('season', 'pt_margin')
+}
+
+# game data columns of the game fields (read by PFRtransform.normalize) and of the game features
+GAME_COLUMNS = ['game_date', 'game_time', 'stadium', 'weather', 'referee', 'vegas_o_u', 'vegas_spread', 'home_team',
+                'away_team', 'home_team_code', 'away_team_code', 'home_pts', 'away_pts']
+
+# matchup data columns of the head-to-head features
+MATCHUP_COLUMNS = ['game_date', 'home_team', 'away_team', 'home_team_code', 'away_team_code', 'home_pts', 'away_pts',
+                   'vegas_o_u', 'vegas_spread']
+
+# per worker process state (the builder of the run, see build_features)
+worker = {}
+
+
+def get_columns(rolling_stats=ROLLING_STATS, ratio_stats=RATIO_STATS):
+# return the game data columns (list of str) the features are built from: GAME_COLUMNS, the game data columns of the
+# team features and both sides' columns of the team stats
+    names = get_stat_columns(list(rolling_stats.values()) + [e for stat in ratio_stats.values() for e in stat])
+    names += [stat for source, stat in TEAM_FEATURES.values() if source == 'game']
+    return list(dict.fromkeys(GAME_COLUMNS + [side + name for name in names for side in ('home_', 'away_')]))
+
+
+def read_data(game_path, matchup_path, columns=None):
+# return the normalized game and matchup data (DataFrames, in game date order) of scraped data csvs, columnar
+# datasets or a game database (see PFRtransform.schema.read_source), only the columns the features are built from
+# (columns of the game data if given, get_columns otherwise), with the canonical team codes, stadium, referee and
+# coach names (see PFRscraper.canonical) and their raw fields parsed (see PFRtransform.normalize)
+    game_data = read_source(game_path, GameItem.dataset, get_columns() if columns is None else columns)
+    matchup_data = read_source(matchup_path, MatchupItem.dataset, MATCHUP_COLUMNS)
+    game_data = normalize_games(canonical.canonicalize(game_data))
+    matchup_data = normalize_matchups(canonical.canonicalize(matchup_data))
+    return (game_data.sort_values('game_date', ascending=True).reset_index(drop=True),
+            matchup_data.sort_values('game_date', ascending=True).reset_index(drop=True))
+
+
+def get_feature_names():
+# return the names of the features (list of str, in feature row order)
+    names = list(GAME_FEATURES) + HEAD_TO_HEAD_FEATURES
+    for name in TEAM_FEATURES:
+        names.extend(['home_' + name, 'away_' + name])
+    return names
+
+
+class FeatureBuilder:
+
+    def __init__(self, game_data, matchup_data, past_game_coef=PAST_GAME_COEF,
+                 match_visit_stat_coef=MATCH_VISIT_STAT_COEF, non_match_visit_stat_coef=NON_MATCH_VISIT_STAT_COEF,
+                 rolling_stats=ROLLING_STATS, ratio_stats=RATIO_STATS):
+        self.game_data = game_data
+        self.matchup_data = matchup_data
+        self.past_game_coef = past_game_coef
+        self.match_visit_stat_coef = match_visit_stat_coef
+        self.non_match_visit_stat_coef = non_match_visit_stat_coef
+        self.rolling_stats = rolling_stats
+        self.ratio_stats = ratio_stats
+        self.team_index = TeamGameIndex(game_data)
+        self.matchup_index = MatchupIndex(matchup_data)
+
+    def get_version(self):
+    # return the feature store version (str, see PFRtransform.store) of the builder's weights and stat tables and the
+    # canonical name tables
+        return get_version(FEATURE_VERSION, canonical.VERSION, self.past_game_coef, self.match_visit_stat_coef,
+                           self.non_match_visit_stat_coef, self.rolling_stats, self.ratio_stats)
+
+    def get_rows(self, seasons=None):
+    # return the rows of the games with team stats available (int array): every game after the first
+    # len(past_game_coef) weeks, only of the given seasons if any
+        rows = np.arange(len(self.past_game_coef) * GAMES_PER_WEEK, len(self.game_data))
+        if(seasons is not None):
+            rows = rows[np.isin(get_seasons(self.game_data['game_date'].iloc[rows]), [int(s) for s in seasons])]
+        return rows
+
+    def get_team_stats(self, teams, dates, home):
+    # return the offensive and defensive stats (dicts of stat name -> float array) of teams (home: whether each is the
+    # home team of its game) weighted over their previous games before the game dates
+        rows = self.team_index.get_previous_games(teams, dates, len(self.past_game_coef))
+        weights = (self.past_game_coef, self.match_visit_stat_coef, self.non_match_visit_stat_coef)
+        off_stats, def_stats = get_rolling_stats(self.game_data, rows, teams, home, list(self.rolling_stats.values()),
+                                                 *weights)
+        numerators = [numerator for numerator, denominator in self.ratio_stats.values()]
+        denominators = [denominator for numerator, denominator in self.ratio_stats.values()]
+        off_ratios, def_ratios = get_rolling_ratios(self.game_data, rows, teams, home, numerators, denominators,
+                                                    *weights)
+        names = list(self.rolling_stats) + list(self.ratio_stats)
+        off_stats, def_stats = np.hstack([off_stats, off_ratios]), np.hstack([def_stats, def_ratios])
+        return ({name: off_stats[:, k] for k, name in enumerate(names)},
+                {name: def_stats[:, k] for k, name in enumerate(names)})
+
+    def get_last_stats(self, teams, dates):
+    # return the stats (dict of stat name -> float array) of teams in their last game before the game dates
+        rows = self.team_index.get_previous_games(teams, dates, 1)[:, 0]
+        stats = get_last_stats(self.game_data, rows, teams, list(self.rolling_stats.values()))
+        return {name: stats[:, k] for k, name in enumerate(self.rolling_stats)}
+
+    def get_features(self, rows):
+    # return the features (DataFrame, one row per game of rows of the game data, in order, get_feature_names columns)
+        games = self.game_data.iloc[rows].reset_index(drop=True)
+        dates = games['game_date']
+        features = {name: games[column].to_numpy() for name, column in GAME_FEATURES.items()}
+        features.update(zip(HEAD_TO_HEAD_FEATURES, get_head_to_head(
+            self.matchup_data, games['home_team_code'], games['away_team_code'], dates, index=self.matchup_index)))
+
+        # the team stats of the home teams then of the away teams of the games, built at once
+        n = len(games)
+        teams = np.concatenate([games['home_team_code'].to_numpy(), games['away_team_code'].to_numpy()])
+        team_dates = np.tile(dates.to_numpy(), 2)
+        off_stats, def_stats = self.get_team_stats(teams, team_dates, np.repeat([True, False], n))
+        season_stats = np.vstack(get_season_to_date(self.game_data, rows))
+        team_stats = {
+            'schedule': {'rest_days': self.team_index.rest_days(teams, team_dates)},
+            'off': off_stats,
+            'def': def_stats,
+            'last': self.get_last_stats(teams, team_dates),
+            'season': {name: season_stats[:, k] for k, name in enumerate(SEASON_STATS)}
+        }
+
+        for name, (source, stat) in TEAM_FEATURES.items():
+            for side, part in (('home_', slice(0, n)), ('away_', slice(n, 2 * n))):
+                if(source == 'game'):
+                    features[side + name] = games[side + stat].to_numpy()
+                else:
+                    features[side + name] = team_stats[source][stat][part]
+        return pd.DataFrame(features)
+
+
+def init_worker(builder):
+    worker['builder'] = builder
+
+
+def build_chunk(rows):
+# return the features of games (rows of the game data) built by the worker's builder
+    return worker['builder'].get_features(rows)
+
+
+def build_features(builder, rows, workers=1):
+# return the features (DataFrame, one row per game of rows of the game data, in order) of games built by a builder,
+# in one chunk per worker by a pool of worker processes if there is more than one worker
+    if(workers <= 1 or len(rows) == 0):
+        return builder.get_features(rows)
+    chunks = [chunk for chunk in np.array_split(rows, workers) if len(chunk) > 0]
+    if('fork' in multiprocessing.get_all_start_methods()):
+        # set before the fork, so the workers share the builder instead of unpickling a copy
+        worker['builder'] = builder
+        pool = multiprocessing.get_context('fork').Pool(workers)
+    else:
+        pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=(builder,))
+    try:
+        with pool:
+            features = pool.map(build_chunk, chunks)
+    finally:
+        worker.pop('builder', None)
+    return pd.concat(features, ignore_index=True)
+
+
+def transform(game_path, matchup_path, output, store_path=None, workers=1, seasons=None):
+# build the features of the games of scraped data csvs, columnar datasets or a game database and write the features
+# of every game, only of the given seasons if any, to a csv; with a feature store, every game missing from it or stale
+# in it is built (whatever the seasons, so the store stays up to date with the game data); return the number of games
+# built
+    game_data, matchup_data = read_data(game_path, matchup_path)
+    builder = FeatureBuilder(game_data, matchup_data)
+    store = None if store_path is None else FeatureStore(store_path, builder.get_version())
+    if(store is None):
+        rows = builder.get_rows(seasons)
+        features = build_features(builder, rows, workers)
+    else:
+        rows = builder.get_rows()
+        rows = rows[store.get_outdated(game_data)[rows]]
+        store.add(game_data, rows, build_features(builder, rows, workers))
+        store.save()
+        game_ids = None if seasons is None else get_game_ids(game_data.iloc[builder.get_rows(seasons)])
+        features = store.get_features(game_ids)
+    features.to_csv(output, index=False, header=True)
+    return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the game features of scraped data.')
+    parser.add_argument('game_data')
+    parser.add_argument('matchup_data')
+    parser.add_argument('output')
+    parser.add_argument('--store', default=None, help='feature store directory (only new games are built)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seasons', type=int, nargs='+', default=None,
+                        help='seasons of the games written (built from the whole history)')
+    options = parser.parse_args(argv)
+    n = transform(options.game_data, options.matchup_data, options.output, options.store, options.workers,
+                  options.seasons)
+    print('%d games built, features written to %s' % (n, options.output))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+# Per-team and team-pair game indexes
+#
+# The rows of a game frame sorted by date (normalized game or matchup data, see PFRtransform.normalize) that each
+# team played, home or away (TeamGameIndex), or that each pair of teams played against each other in either home /
+# away orientation (MatchupIndex), kept in date order, so the previous games of a team (or meetings of two teams)
+# before a date are a binary search and a slice instead of a scan of every earlier game. Lookups take arrays of teams
+# and dates, so the previous games (and rest days) of every game are found at once.
+
+import numpy as np
+import pandas as pd
+
+
+class TeamGameIndex:
+
+    def __init__(self, game_data):
+        self.dates = game_data['game_date'].to_numpy()
+        self.home_teams = game_data['home_team_code'].to_numpy()
+        self.away_teams = game_data['away_team_code'].to_numpy()
+        teams = np.concatenate([self.home_teams, self.away_teams])
+        rows = np.tile(np.arange(len(game_data)), 2)
+        order = np.lexsort((rows, teams))
+        teams, rows = teams[order], rows[order]
+        starts = np.flatnonzero(np.r_[True, teams[1:] != teams[:-1]])
+        # team code -> rows of its games (int array, date order)
+        self.rows = dict(zip(teams[starts], np.split(rows, starts[1:])))
+
+    def get_rows(self, team):
+        return self.rows.get(team, np.zeros(0, dtype=int))
+
+    def get_previous_games(self, teams, dates, n, fill=0):
+    # return the rows (int array, one row of n per team and date, most recent first) of the last n games each team
+    # played before each date, fill where a team has played fewer
+        teams = np.asarray(teams)
+        first = np.searchsorted(self.dates, np.asarray(dates, dtype=self.dates.dtype), side='left')
+        previous = np.full((len(teams), n), fill, dtype=int)
+        for team in np.unique(teams):
+            rows = self.get_rows(team)
+            if(len(rows) == 0):
+                continue
+            m = teams == team
+            k = np.searchsorted(rows, first[m])[:, None] - 1 - np.arange(n)
+            previous[m] = np.where(k >= 0, rows[np.maximum(k, 0)], fill)
+        return previous
+
+    def previous_games(self, team, date, n, fill=0):
+    # return the rows (int array, most recent first) of the last n games a team played before a date (first row
+    # of the frame where the team has played fewer)
+        return self.get_previous_games([team], [date], n, fill)[0]
+
+    def is_home(self, teams, rows):
+    # return whether each team (bool array) was the home team of the game at its row
+        return self.home_teams[rows] == np.asarray(teams)
+
+    def rest_days(self, teams, dates, max_days=21):
+    # return the days since each team's previous game before each date (float array, at most max_days)
+        dates = np.asarray(dates, dtype=self.dates.dtype)
+        last = self.get_previous_games(teams, dates, 1, fill=-1)[:, 0]
+        days = (dates - self.dates[last]) / np.timedelta64(1, 'D')
+        return np.minimum(max_days, np.where(last >= 0, days, max_days))
+
+
+class MatchupIndex:
+
+    def __init__(self, game_data):
+        self.dates = game_data['game_date'].to_numpy()
+        self.home_teams = game_data['home_team_code'].to_numpy()
+        self.away_teams = game_data['away_team_code'].to_numpy()
+        pairs = self.get_pairs(self.home_teams, self.away_teams)
+        rows = np.arange(len(game_data))
+        order = np.lexsort((rows, pairs))
+        pairs, rows = pairs[order], rows[order]
+        starts = np.flatnonzero(np.r_[True, pairs[1:] != pairs[:-1]])
+        # 'team 1:team 2' (codes sorted) -> rows of their games (int array, date order)
+        self.rows = dict(zip(pairs[starts], np.split(rows, starts[1:])))
+
+    def get_pairs(self, teams_1, teams_2):
+    # return the key (str array) of each unordered pair of teams
+        teams_1, teams_2 = np.asarray(teams_1, dtype=str), np.asarray(teams_2, dtype=str)
+        first = teams_1 < teams_2
+        return np.char.add(np.char.add(np.where(first, teams_1, teams_2), ':'), np.where(first, teams_2, teams_1))
+
+    def get_rows(self, team_1, team_2):
+        return self.rows.get(self.get_pairs([team_1], [team_2])[0], np.zeros(0, dtype=int))
+
+    def get_previous_meetings(self, teams_1, teams_2, dates, n=5, years=5, fill=-1):
+    # return the rows (int array, one row of n per pair of teams and date, most recent first) of the last n games
+    # each pair of teams played against each other before each date and at most years before it, fill where they met
+    # fewer times
+        pairs = self.get_pairs(teams_1, teams_2)
+        dates = pd.DatetimeIndex(dates)
+        first = np.searchsorted(self.dates, dates.to_numpy(dtype=self.dates.dtype), side='left')
+        since = (dates - pd.DateOffset(years=years)).to_numpy(dtype=self.dates.dtype)
+        oldest = np.searchsorted(self.dates, since, side='left')
+        previous = np.full((len(pairs), n), fill, dtype=int)
+        for pair in np.unique(pairs):
+            rows = self.rows.get(pair)
+            if(rows is None):
+                continue
+            m = pairs == pair
+            k = np.searchsorted(rows, first[m])[:, None] - 1 - np.arange(n)
+            previous[m] = np.where(k >= np.searchsorted(rows, oldest[m])[:, None], rows[np.maximum(k, 0)], fill)
+        return previous
+
+    def previous_meetings(self, team_1, team_2, date, n=5, years=5):
+    # return the rows (int array, most recent first) of the last n games (at most) two teams played against each
+    # other before a date and at most years before it
+        meetings = self.get_previous_meetings([team_1], [team_2], [date], n, years)[0]
+        return meetings[meetings >= 0]
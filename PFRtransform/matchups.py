@@ -0,0 +1,29 @@
+# Head-to-head features
+#
+# Counts over the last meetings of the two teams of each game (found for every game at once with a MatchupIndex of
+# the normalized matchup data, see PFRtransform.index): games that hit the vegas over / under, and games the current
+# home / away team covered the vegas spread (whichever of them was home in the meeting). Pushes (0.5) count for
+# neither side.
+
+import numpy as np
+
+from PFRtransform.index import MatchupIndex
+
+
+def get_head_to_head(matchup_data, home_teams, away_teams, dates, n=5, years=5, index=None):
+# return the number of overs, unders, home team covers and away team covers (float arrays) in the last n meetings
+# (at most years before) of the home and away team of each game, before its date
+    if(index is None):
+        index = MatchupIndex(matchup_data)
+    meetings = index.get_previous_meetings(home_teams, away_teams, dates, n, years)
+    valid = meetings >= 0
+    rows = np.maximum(meetings, 0)
+    o_u = matchup_data['o_u_result'].to_numpy()[rows]
+    covered = matchup_data['home_covered_spread'].to_numpy()[rows]
+    same_home = index.home_teams[rows] == np.asarray(home_teams)[:, None]
+    covered = np.where(same_home, covered, 1 - covered)
+
+    def count(hits):
+        return (hits & valid).sum(axis=1).astype(float)
+
+    return count(o_u == 1), count(o_u == 0), count(covered == 1), count(covered == 0)
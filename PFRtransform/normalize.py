@@ -0,0 +1,117 @@
+# Raw field normalization
+#
+# The scraped game and matchup data keep some fields as the text shown on the game pages (game date, kickoff time,
+# weather, vegas line). They are parsed here a whole column at a time (vectorized datetime parsing and regex
+# extraction) into the numeric columns the features are built from, with the outcome columns against the vegas
+# lines, and each normalized frame is built in one pass.
+#
+# Games that land exactly on the spread or the over/under count as a random outcome in the game data (0.5 in the
+# matchup data); the random draws are made in the same order as the original row by row parsing (each game's spread
+# then its over/under), so a seeded run gives the same outcomes.
+
+import random
+
+import numpy as np
+import pandas as pd
+
+from PFRtransform.teams import divisions, indoor_stadiums
+
+
+# humidity (%) of games whose weather doesn't give one
+DEFAULT_HUMIDITY = 60
+
+
+def get_game_dates(values):
+# return the game dates (datetime Series) of m/d/Y strings
+    return pd.to_datetime(values, format='%m/%d/%Y')
+
+
+def get_kickoff_times(values):
+# return the kickoff times (float Series, hours) of h:mm[am|pm] strings (pm adds 12 hours)
+    parts = values.str.extract(r'^(\d+):(\d\d)')
+    return parts[0].astype(int) + parts[1].astype(int) / 60 + 12 * values.str.contains('pm', regex=False)
+
+
+def get_int(values, default=None):
+# return the int Series of integer strings (anything else: default, an error without one)
+    if(default is None):
+        return values.astype(int)
+    valid = values.str.fullmatch(r'[+-]?\d+').fillna(False)
+    return values.where(valid, str(default)).astype(int)
+
+
+def get_weather(values):
+# return the temperature (degrees), humidity (%) and wind speed (mph) (int Series) of weather strings
+# ('67 degrees, relative humidity 87%, wind 5 mph'): the humidity is the last word before the first '%'
+# (DEFAULT_HUMIDITY if it isn't a number) and the wind is 0 if the weather says 'no wind'
+    temp = get_int(values.str.split(' degrees', n=1).str[0])
+    humidity = get_int(values.str.split('%', n=1).str[0].str.rsplit(' ', n=1).str[-1], DEFAULT_HUMIDITY)
+    wind = values.str.split(' mph', n=1).str[0].str.rsplit(' ', n=1).str[-1]
+    return temp, humidity, get_int(wind.where(~values.str.contains('no wind', regex=False), '0'))
+
+
+def get_home_spreads(spreads, home_teams):
+# return the vegas spreads (float Series) in terms of the home team of vegas line strings ('Pittsburgh Steelers
+# -1.5', 'Pick')
+    pick = spreads.str.contains('Pick', regex=False)
+    lines = spreads.where(~pick, '0').str.rsplit('-', n=1).str[-1].astype(float)
+    home = np.array([h in s for h, s in zip(home_teams, spreads)], dtype=bool)
+    return lines.where(~home | pick, -lines)
+
+
+def get_outcomes(wins, losses, tie):
+# return the outcome (Series) of each game: 1 for a win, 0 for a loss, tie (array) otherwise
+    return pd.Series(np.where(wins, 1, np.where(losses, 0, tie)), index=wins.index)
+
+
+def get_ties(ties, randint=random.randint):
+# return a random outcome (0 or 1, int array of the shape of ties) for each True of a boolean array, drawn in the
+# array's (row major) order; 0 elsewhere
+    draws = np.zeros(ties.size, dtype=int)
+    for i in np.flatnonzero(ties):
+        draws[i] = randint(0, 1)
+    return draws.reshape(ties.shape)
+
+
+def normalize_games(game_data, randint=random.randint):
+# return the normalized game data (DataFrame): parsed game date and kickoff time, weather and vegas line replaced by
+# temp / humidity / wind and vegas_home_spread, and the outcome columns (home_covered_spread, o_u_result) and
+# divisional_game / indoor_stadium flags added
+    temp, humidity, wind = get_weather(game_data['weather'])
+    spread = get_home_spreads(game_data['vegas_spread'], game_data['home_team'])
+    away_pts, home_pts = game_data['away_pts'].astype(int), game_data['home_pts'].astype(int)
+    margin = away_pts - home_pts
+    total = away_pts + home_pts
+    covered = [margin < spread, margin > spread]
+    over = [total > game_data['vegas_o_u'], total < game_data['vegas_o_u']]
+    ties = get_ties(np.column_stack([~(covered[0] | covered[1]), ~(over[0] | over[1])]), randint)
+    home_divisions = game_data['home_team_code'].map(divisions)
+    away_divisions = game_data['away_team_code'].map(divisions)
+
+    return pd.concat([game_data.drop(columns=['weather', 'vegas_spread']).assign(
+        game_date=get_game_dates(game_data['game_date']),
+        game_time=get_kickoff_times(game_data['game_time'])
+    ), pd.DataFrame({
+        'temp': temp,
+        'humidity': humidity,
+        'wind': wind,
+        'vegas_home_spread': spread,
+        'home_covered_spread': get_outcomes(covered[0], covered[1], ties[:, 0]),
+        'o_u_result': get_outcomes(over[0], over[1], ties[:, 1]),
+        'divisional_game': (home_divisions == away_divisions).astype(int),
+        'indoor_stadium': game_data['stadium'].isin(indoor_stadiums).astype(int)
+    })], axis=1)
+
+
+def normalize_matchups(matchup_data):
+# return the normalized matchup data (DataFrame): parsed game date and the outcome columns (home_covered_spread,
+# o_u_result; 0.5 for a push) added
+    spread = get_home_spreads(matchup_data['vegas_spread'], matchup_data['home_team'])
+    away_pts, home_pts = matchup_data['away_pts'].astype(int), matchup_data['home_pts'].astype(int)
+    margin = away_pts - home_pts
+    total = away_pts + home_pts
+    return matchup_data.assign(
+        game_date=get_game_dates(matchup_data['game_date']),
+        home_covered_spread=get_outcomes(margin < spread, margin > spread, 0.5),
+        o_u_result=get_outcomes(total > matchup_data['vegas_o_u'], total < matchup_data['vegas_o_u'], 0.5)
+    )
@@ -0,0 +1,128 @@
+# Weighted rolling team stats
+#
+# A team feature is a weighted average of a stat over the team's last n games before a game (rows of the game frame,
+# most recent first, see TeamGameIndex.get_previous_games): each past game weighs its recency weight (past_game_coef
+# in the transform notebook) times a venue weight, the match weight if the team played at the same venue (home or
+# away) as in the game the feature is for, the non match weight otherwise. The offensive feature averages the team's
+# own stat in its past games, the defensive feature its opponents'.
+#
+# Stats are expressions of one side's columns without their home_ / away_ prefix (opp_ prefixed for the other side's:
+# 'opp_turnovers - turnovers'), evaluated once for the home side and once for the away side of
+# every game. Ratio stats (numerator / denominator expressions) leave out the past games where the denominator is 0,
+# the weights of the other games renormalized. The stats of every past game of every team are gathered into one
+# (games x n x stats) array, so each feature of every game comes from a few array operations.
+
+import re
+
+import numpy as np
+
+
+class SideColumns(dict):
+    # The columns (float arrays, so narrow typed columns can't overflow) of
+    # one side of a game frame by name without their side prefix (opp_
+    # prefixed for the other side's), read from the frame the first time an
+    # expression uses them.
+
+    def __init__(self, game_data, side, other):
+        self.game_data = game_data
+        self.side = side
+        self.other = other
+
+    def __missing__(self, key):
+        name = key[1:] if key.startswith('_') else key
+        if(name.startswith('opp_')):
+            column = self.game_data[self.other + name[len('opp_'):]]
+        else:
+            column = self.game_data[self.side + name]
+        self[key] = column = column.to_numpy(dtype=float)
+        return column
+
+
+def compile_expression(expression):
+# return the code of a stat expression (python, with names that aren't identifiers in backticks like DataFrame.eval:
+# `2pt_att` is read as _2pt_att)
+    return compile(re.sub(r'`(\w+)`', r'_\1', expression), expression, 'eval')
+
+
+def get_columns(expressions):
+# return the names (list of str, without side prefix) of the columns stat expressions read
+    names = []
+    for expression in expressions:
+        for key in compile_expression(expression).co_names:
+            name = key[1:] if key.startswith('_') else key
+            names.append(name[len('opp_'):] if name.startswith('opp_') else name)
+    return list(dict.fromkeys(names))
+
+
+def get_side_stats(game_data, expressions):
+# return the home side and away side stats (float arrays, rows x expressions) of each game (inf / nan where an
+# expression divides by 0)
+    codes = [compile_expression(expression) for expression in expressions]
+    sides = []
+    for side, other in (('home_', 'away_'), ('away_', 'home_')):
+        columns = SideColumns(game_data, side, other)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stats = [eval(code, {'__builtins__': {}}, columns) for code in codes]
+        sides.append(np.column_stack(stats).astype(float))
+    return sides
+
+
+def get_weighted_average(stats, weights, valid=True):
+# return the weighted averages (float array, games x stats) of stats (games x n x stats) with weights (games x n)
+# over the valid stats (bool array like stats), 0 where there are none
+    weights = np.broadcast_to(weights[:, :, None] * valid, stats.shape)
+    total = weights.sum(axis=1)
+    return np.divide((weights * stats).sum(axis=1), total, out=np.zeros(total.shape), where=total != 0)
+
+
+def get_past_game_weights(game_data, rows, teams, home, weights, match_weight, non_match_weight):
+# return whether each team was the home team (bool array, games x n) and the weight (float array, games x n) of each
+# of its previous games (rows)
+    was_home = game_data['home_team_code'].to_numpy()[rows] == np.asarray(teams)[:, None]
+    venue = np.where(was_home == np.asarray(home, dtype=bool).reshape(-1, 1), match_weight, non_match_weight)
+    return was_home, np.asarray(weights, dtype=float) * venue
+
+
+def get_rolling_stats(game_data, rows, teams, home, expressions, weights, match_weight, non_match_weight):
+# return the offensive and defensive stats (float arrays, games x expressions) weighted over each team's previous
+# games: rows (int array, games x n) are the previous games of each team, home whether the team is the home team of
+# each game. A previous game the team didn't play (a row filled in for a team with fewer than n games) counts with
+# its away side as the team's
+    home_stats, away_stats = get_side_stats(game_data, expressions)
+    was_home, weights = get_past_game_weights(game_data, rows, teams, home, weights, match_weight, non_match_weight)
+    was_home = was_home[:, :, None]
+    offense = np.where(was_home, home_stats[rows], away_stats[rows])
+    defense = np.where(was_home, away_stats[rows], home_stats[rows])
+    return get_weighted_average(offense, weights), get_weighted_average(defense, weights)
+
+
+def get_rolling_ratios(game_data, rows, teams, home, numerators, denominators, weights, match_weight, non_match_weight):
+# return the offensive and defensive ratio stats (float arrays, games x stats) of numerators / denominators
+# (expressions) weighted over each team's previous games (see get_rolling_stats). Previous games the team didn't
+# play count as 0 for the offensive stat, and as the away side's stat (if both sides' are valid) for the defensive
+# stat
+    teams = np.asarray(teams)[:, None]
+    home_num, away_num = get_side_stats(game_data, numerators)
+    home_den, away_den = get_side_stats(game_data, denominators)
+    home_den, away_den = home_den[rows], away_den[rows]
+    home_valid, away_valid = home_den != 0, away_den != 0
+    home_ratio = np.divide(home_num[rows], home_den, out=np.zeros(home_den.shape), where=home_valid)
+    away_ratio = np.divide(away_num[rows], away_den, out=np.zeros(away_den.shape), where=away_valid)
+
+    was_home, weights = get_past_game_weights(game_data, rows, teams[:, 0], home, weights, match_weight,
+                                              non_match_weight)
+    was_home = was_home[:, :, None]
+    was_away = (game_data['away_team_code'].to_numpy()[rows] == teams)[:, :, None]
+    offense = np.where(was_home, home_ratio, np.where(was_away, away_ratio, 0))
+    offense_valid = np.where(was_home, home_valid, np.where(was_away, away_valid, True))
+    defense = np.where(was_home, away_ratio, np.where(was_away, home_ratio, away_ratio))
+    defense_valid = np.where(was_home, away_valid, np.where(was_away, home_valid, home_valid & away_valid))
+    return get_weighted_average(offense, weights, offense_valid), get_weighted_average(defense, weights, defense_valid)
+
+
+def get_last_stats(game_data, rows, teams, expressions):
+# return each team's own stats (float array, teams x expressions) in a game (rows: int array, one per team), the away
+# side's if the team didn't play it
+    home_stats, away_stats = get_side_stats(game_data, expressions)
+    was_home = game_data['home_team_code'].to_numpy()[rows] == np.asarray(teams)
+    return np.where(was_home[:, None], home_stats[rows], away_stats[rows])
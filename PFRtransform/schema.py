@@ -0,0 +1,155 @@
+# Typed schema of the scraped data
+#
+# The dtype of every column of the scraped game and matchup data csvs (the fields of GameItem / MatchupItem, see
+# PFRscraper.items), applied when a csv is read: categories for the names repeated across games (teams, team codes,
+# stadiums, referees, coaches), Int16 for yards, Int8 for the other counts (all well under 128 in a game) and float32
+# for the vegas over / under (halves, exact in float32). Possession minutes and average starting field position stay
+# float64, the rolling stats being built from them, and the text parsed by PFRtransform.normalize (kickoff time,
+# weather, vegas line) stays str. Game dates are parsed as dates (PFRscraper.columnar.get_dates), written by the
+# spiders' feeds (ISO, 2021-09-12) or by the older notebooks (9/12/2021).
+#
+# The integer columns are narrow and nullable (stats missing from the pages of older games are empty in the csvs):
+# arithmetic that could leave their range (sums of points, ...) widens them first.
+#
+# read_typed keeps the typed frame of a csv in a parquet file next to it (<name>.parquet) and reads it instead of the
+# csv as long as neither the csv nor the schema changed since it was written (their hash is kept in the file's
+# metadata). read_source reads the same frame, only some columns and seasons, from a scraped data csv, from the
+# season partitioned columnar dataset of the spiders (PFRscraper.columnar) or from their game database
+# (PFRscraper.database); the last two only load those columns and seasons.
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from PFRscraper.columnar import get_dates, get_seasons, read_dataset
+from PFRscraper.database import GameDatabase
+from PFRscraper.items import DATE, FLOAT, INT, GameItem, MatchupItem
+
+
+CATEGORY = 'category'
+
+# fields read as categories
+CATEGORY_FIELDS = ['home_team', 'away_team', 'home_team_code', 'away_team_code', 'stadium', 'referee', 'home_coach',
+                   'away_coach']
+
+# float fields read as float32
+FLOAT32_FIELDS = ['vegas_o_u']
+
+# parquet metadata key of the hash of the csv and schema a typed frame was read from
+SOURCE_KEY = b'pfr_source'
+
+# file extensions of game databases (read_source)
+DATABASE_EXTENSIONS = ['.sqlite', '.sqlite3', '.db']
+
+
+def get_dtype(name, field):
+# return the read dtype (str) of an item field
+    if(name in CATEGORY_FIELDS):
+        return CATEGORY
+    if(field['dtype'] == INT):
+        return 'Int16' if 'yds' in name else 'Int8'
+    if(field['dtype'] == FLOAT):
+        return 'float32' if name in FLOAT32_FIELDS else 'float64'
+    if(field['dtype'] == DATE):
+        return DATE
+    return 'str'
+
+
+def get_schema(item_class):
+# return the schema (dict of column name -> dtype) of the csv of an item class
+    return {name: get_dtype(name, field) for name, field in item_class.fields.items()}
+
+
+# schema of each dataset's csv
+schemas = {GameItem.dataset: get_schema(GameItem), MatchupItem.dataset: get_schema(MatchupItem)}
+
+
+def read_csv(path, schema):
+# return the typed frame (DataFrame) of a scraped data csv
+    dtypes = {name: str if dtype in ('str', DATE) else dtype for name, dtype in schema.items()}
+    frame = pd.read_csv(path, sep=',', encoding='unicode_escape', dtype=dtypes)
+    for name, dtype in schema.items():
+        if(dtype == DATE and name in frame):
+            frame[name] = get_dates(frame[name]).astype(DATE)
+    return frame
+
+
+def get_source(path, schema):
+# return the hash (bytes) of a csv (size and modification time) and the schema it's read with
+    stat = os.stat(path)
+    text = json.dumps([stat.st_size, stat.st_mtime_ns, schema], sort_keys=True)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest().encode('ascii')
+
+
+def read_typed(path, dataset, cache=True):
+# return the typed frame (DataFrame) of a scraped data csv of a dataset (GameItem.dataset or MatchupItem.dataset),
+# read from its parquet file if it's up to date, (re)written from the csv otherwise
+    schema = schemas[dataset]
+    source = get_source(path, schema)
+    cache_path = os.path.splitext(path)[0] + '.parquet'
+    if(cache and os.path.exists(cache_path)):
+        metadata = pq.read_schema(cache_path).metadata or {}
+        if(metadata.get(SOURCE_KEY) == source):
+            return pd.read_parquet(cache_path)
+    frame = read_csv(path, schema)
+    if(cache):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), SOURCE_KEY: source})
+        # written next to the cache file then renamed, so a reader never sees a partial file
+        pq.write_table(table, cache_path + '.tmp')
+        os.replace(cache_path + '.tmp', cache_path)
+    return frame
+
+
+def get_typed(frame, dataset):
+# return a frame of a dataset's records (columns of any dtype: item dtypes, text, ...) with the dtypes of the schema
+    schema = schemas[dataset]
+    frame = frame.copy()
+    for name in frame.columns:
+        dtype = schema.get(name)
+        if(dtype is None):
+            continue
+        if(dtype == DATE):
+            values = frame[name]
+            frame[name] = (values if pd.api.types.is_datetime64_any_dtype(values) else get_dates(values)).astype(DATE)
+        else:
+            frame[name] = frame[name].astype(dtype)
+    return frame
+
+
+def read_database(path, dataset, columns=None, seasons=None):
+# return the records (DataFrame, in date order) of a dataset's table of a game database, only the given columns and
+# the dates from the first to the last of the given seasons if any (seasons start in March, see
+# PFRscraper.columnar.get_seasons)
+    if(not os.path.exists(path)):
+        # opening a database creates it, a mistyped path would read as an empty one
+        raise FileNotFoundError('game database not found: %s' % path)
+    db = GameDatabase(path)
+    try:
+        if(seasons is None):
+            return db.read_table(dataset, columns)
+        start, end = min(seasons), max(seasons) + 1
+        return db.read_table(dataset, columns, '%d-03-01' % start, '%d-03-01' % end)
+    finally:
+        db.close()
+
+
+def read_source(source, dataset, columns=None, seasons=None):
+# return the typed frame (DataFrame) of a dataset's records, only the given columns and seasons (see
+# PFRscraper.columnar.get_seasons) if any, from a scraped data csv, a columnar dataset directory or a game database
+    if(os.path.isdir(source)):
+        return get_typed(read_dataset(source, dataset, columns, seasons), dataset)
+    if(os.path.splitext(source)[1] in DATABASE_EXTENSIONS):
+        frame = get_typed(read_database(source, dataset, columns, seasons), dataset)
+    else:
+        frame = read_typed(source, dataset)
+    if(seasons is not None):
+        frame = frame[np.isin(get_seasons(frame['game_date']), [int(s) for s in seasons])]
+    if(columns is not None):
+        frame = frame[list(columns)]
+    return frame.reset_index(drop=True)
@@ -0,0 +1,67 @@
+# Season-to-date team features
+#
+# Sums over the games a team played earlier in the season of a game (seasons start in July, a January game belongs to
+# the season of the previous year), from the team's point of view: its record, over / under and against the spread
+# margins (games won / over / covered minus games lost / under / not covered) and point margins. They are built for
+# every game at once from a long table of the game data with one row per team per game (get_team_games): the sum over
+# a team's earlier games of a season is its cumulative sum within the team-season, shifted by one game. A new
+# season-to-date feature is a new column of the team games.
+
+import numpy as np
+import pandas as pd
+
+
+# season stats of the team games summed by get_season_to_date
+SEASON_STATS = ['margin_o_u', 'margin_ats', 'record_margin', 'pt_margin_o_u', 'pt_margin_ats', 'pt_margin']
+
+
+def get_seasons(dates):
+# return the season (int array, the year it starts in) of game dates
+    dates = pd.DatetimeIndex(dates)
+    return dates.year.to_numpy() - (dates.month < 7)
+
+
+def get_signs(values):
+# return 1 where values are positive, -1 where they are negative, 0 elsewhere (int Series)
+    return (values > 0).astype(int) - (values < 0).astype(int)
+
+
+def get_team_games(game_data):
+# return the team games (DataFrame, one row per team per game: the home team's then the away team's of each game, in
+# game order): row, team, season, home, pts, opp_pts, spread (the vegas spread in terms of the team), vegas_o_u and
+# the season stats of the game from the team's point of view (SEASON_STATS)
+    def interleave(home, away):
+        return np.column_stack([np.asarray(home), np.asarray(away)]).ravel()
+
+    home_pts, away_pts = game_data['home_pts'].to_numpy(dtype=int), game_data['away_pts'].to_numpy(dtype=int)
+    spread = game_data['vegas_home_spread'].to_numpy(dtype=float)
+    games = pd.DataFrame({
+        'row': np.repeat(np.arange(len(game_data)), 2),
+        'team': interleave(game_data['home_team_code'], game_data['away_team_code']),
+        'season': np.repeat(get_seasons(game_data['game_date']), 2),
+        'home': np.tile([True, False], len(game_data)),
+        'pts': interleave(home_pts, away_pts),
+        'opp_pts': interleave(away_pts, home_pts),
+        'spread': interleave(spread, -spread),
+        'vegas_o_u': np.repeat(game_data['vegas_o_u'].to_numpy(dtype=float), 2)
+    })
+    margin = games['pts'] - games['opp_pts']
+    total = games['pts'] + games['opp_pts']
+    return games.assign(
+        margin_o_u=get_signs(total - games['vegas_o_u']),
+        margin_ats=get_signs(margin + games['spread']),
+        record_margin=get_signs(margin),
+        pt_margin_o_u=total - games['vegas_o_u'],
+        pt_margin_ats=margin + games['spread'],
+        pt_margin=margin
+    )
+
+
+def get_season_to_date(game_data, rows, columns=SEASON_STATS):
+# return the home team's and the away team's sums (float arrays, games x columns) of team game columns (see
+# get_team_games) over their games earlier in the season of each game (rows of the game frame)
+    games = get_team_games(game_data)
+    groups = [games['team'], games['season']]
+    sums = games[columns].groupby(groups).cumsum().groupby(groups).shift(fill_value=0)
+    sums = sums.to_numpy(dtype=float).reshape(len(game_data), 2, len(columns))[rows]
+    return sums[:, 0], sums[:, 1]
@@ -0,0 +1,120 @@
+# Feature store
+#
+# The transformed rows (features) of the games already built, kept on disk by game (boxscore id, see
+# PFRscraper.state.make_game_id) with the version of the feature definitions they were built with: a hash of the
+# weights and feature tables (get_version). The features of a game only depend on the games of its teams before it,
+# read through the team and matchup indexes of the whole game data (PFRtransform.index, rebuilt in milliseconds on
+# every run), so a refresh only builds the rows of the games added since the last one, plus the stored rows a new game
+# makes stale: a game backfilled (or whose data changed, see get_digests) before stored games of its teams changes
+# their features, so every stored game of its teams on or after its date is rebuilt (get_outdated). A store built
+# with another version is ignored (and replaced when saved), so every game is rebuilt when a weight or a feature
+# changes. Changes to the matchup data alone (the head-to-head features) aren't detected.
+#
+# <path>/features.parquet holds the rows in game id (date, then home team) order, <path>/digests.parquet the digest of
+# every game of the game data the rows were built from, <path>/manifest.json the version and the number of games.
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from PFRscraper.state import make_game_id
+
+
+FEATURES = 'features.parquet'
+DIGESTS = 'digests.parquet'
+MANIFEST = 'manifest.json'
+
+# columns of the normalized game data drawn at random for pushes (see PFRtransform.normalize), left out of the digests
+RANDOM_COLUMNS = ['home_covered_spread', 'o_u_result']
+
+
+def get_version(*definitions):
+# return the version (str) of feature definitions (json-like values: weights, feature tables, ...)
+    text = json.dumps(definitions, sort_keys=True, default=repr)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def get_game_ids(game_data):
+# return the boxscore ids (Index of str) of the games of a normalized game frame
+    return pd.Index([make_game_id(date, team) for date, team in zip(game_data['game_date'],
+                                                                    game_data['home_team_code'])], name='game_id')
+
+
+def get_digests(game_data):
+# return the digest of the data of each game of a normalized game frame (uint64 Series indexed by game id)
+    digests = pd.util.hash_pandas_object(game_data.drop(columns=RANDOM_COLUMNS, errors='ignore'), index=False)
+    return digests.set_axis(get_game_ids(game_data)).rename('digest')
+
+
+class FeatureStore:
+
+    def __init__(self, path, version):
+        self.path = path
+        self.version = version
+        self.features, self.digests = self.load()
+
+    def load(self):
+    # return the stored features (DataFrame indexed by game id) and game digests (Series indexed by game id), None if
+    # the store doesn't exist, was built with another version or before the digests were kept
+        try:
+            with open(os.path.join(self.path, MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None, None
+        if(manifest['version'] != self.version or not os.path.exists(os.path.join(self.path, DIGESTS))):
+            return None, None
+        return (pd.read_parquet(os.path.join(self.path, FEATURES)),
+                pd.read_parquet(os.path.join(self.path, DIGESTS))['digest'])
+
+    def get_outdated(self, game_data):
+    # return whether each game of a normalized game frame (bool array) has no features in the store or stale ones:
+    # games of a team with a new or changed game on the same or an earlier date
+        if(self.features is None):
+            return np.ones(len(game_data), dtype=bool)
+        digests = get_digests(game_data)
+        stored = self.digests.reindex(digests.index, fill_value=0)
+        changed = ~digests.index.isin(self.digests.index) | (digests.to_numpy() != stored.to_numpy())
+        dates = game_data['game_date'].to_numpy()
+        home_teams = game_data['home_team_code'].to_numpy()
+        away_teams = game_data['away_team_code'].to_numpy()
+        # each team's earliest new or changed game
+        earliest = pd.Series(np.concatenate([dates[changed], dates[changed]])).groupby(
+            np.concatenate([home_teams[changed], away_teams[changed]])).min()
+        stale = (dates >= earliest.reindex(home_teams).to_numpy()) | (dates >= earliest.reindex(away_teams).to_numpy())
+        return ~digests.index.isin(self.features.index) | stale
+
+    def add(self, game_data, rows, features):
+    # add the features (DataFrame, one row per game) of games (rows) of a normalized game frame, replacing stored ones,
+    # and keep the digests of every game of the frame
+        features = features.infer_objects().set_axis(get_game_ids(game_data.iloc[rows]))
+        digests = get_digests(game_data)
+        if(self.features is not None):
+            features = pd.concat([self.features[~self.features.index.isin(features.index)], features])
+            digests = pd.concat([self.digests[~self.digests.index.isin(digests.index)], digests])
+        # in game date order (the date starts the id), whatever order the games were built in
+        self.features = features.sort_index()
+        self.digests = digests
+
+    def get_features(self, game_ids=None):
+    # return the features (DataFrame, one row per game) of every stored game, only of the given games (game ids) if any
+        if(self.features is None):
+            return pd.DataFrame()
+        features = self.features if game_ids is None else self.features[self.features.index.isin(game_ids)]
+        return features.reset_index(drop=True)
+
+    def save(self):
+        # written next to the targets then renamed, the manifest last, so a reader never sees a partial store
+        os.makedirs(self.path, exist_ok=True)
+        path = os.path.join(self.path, FEATURES)
+        self.features.to_parquet(path + '.tmp')
+        os.replace(path + '.tmp', path)
+        path = os.path.join(self.path, DIGESTS)
+        self.digests.to_frame().to_parquet(path + '.tmp')
+        os.replace(path + '.tmp', path)
+        path = os.path.join(self.path, MANIFEST)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'version': self.version, 'games': len(self.features)}, f, indent=1)
+        os.replace(path + '.tmp', path)
@@ -0,0 +1,59 @@
+# Team reference data
+#
+# Divisions of the team codes (current and former codes) and the stadiums with a roof, used to flag divisional and
+# indoor games. The current team codes and stadium names of the former ones are in PFRscraper.canonical.
+
+# dict of team code and its division
+divisions = {'ARI': 'NFC West',
+         'ATL': 'NFC South',
+         'BAL': 'AFC North',
+         'BUF': 'AFC East',
+         'CAR': 'NFC South',
+         'CHI': 'NFC North',
+         'CIN': 'AFC North',
+         'CLE': 'AFC North',
+         'DAL': 'NFC East',
+         'DEN': 'AFC West',
+         'DET': 'NFC North',
+         'GNB': 'NFC North',
+         'HOU': 'AFC South',
+         'IND': 'AFC South',
+         'JAX': 'AFC South',
+         'KAN': 'AFC West',
+         'LVR': 'AFC West',
+         'LAC': 'AFC West',
+         'LAR': 'NFC West',
+         'MIA': 'AFC East',
+         'MIN': 'NFC North',
+         'NWE': 'AFC East',
+         'NOR': 'NFC South',
+         'NYG': 'NFC East',
+         'NYJ': 'AFC East',
+         'OAK': 'AFC West',
+         'PHI': 'NFC East',
+         'PIT': 'AFC North',
+         'SDG': 'AFC West',
+         'SFO': 'NFC West',
+         'SEA': 'NFC West',
+         'STL': 'NFC West',
+         'TAM': 'NFC South',
+         'TEN': 'AFC South',
+         'WAS': 'NFC East'
+}
+
+# stadiums with a roof (current names)
+indoor_stadiums = ['State Farm Stadium',
+                   'Ford Field',
+                   'Edward Jones Dome',
+                   'NRG Stadium',
+                   'AT&T Stadium',
+                   'Georgia Dome',
+                   'RCA Dome',
+                   'Hubert H. Humphrey Metrodome',
+                   'Caesars Superdome',
+                   'Lucas Oil Stadium',
+                   'Rogers Centre',
+                   'U.S. Bank Stadium',
+                   'Mercedes-Benz Stadium',
+                   'SoFi Stadium',
+                   'Allegiant Stadium']
@@ -0,0 +1,320 @@
+# Offline benchmarks
+#
+# Times the scraper's parsing and the feature building (PFRtransform) over fixed inputs, without the network: saved
+# week, game (normal, overtime, no punts, no weather) and player gamelog pages in benchmarks/fixtures (served to the
+# spider callbacks the way PFRscraper.replay serves archived pages), and the scraped data csvs for the features.
+# Every benchmark checks its output against a golden output in benchmarks/golden and its throughput (best round)
+# against benchmarks/baselines.json, and the run fails if an output changed or a benchmark got slower than its
+# baseline by more than the tolerance.
+#
+# usage: python -m benchmarks.run [--rounds 3] [--tolerance 0.25] [--only parse_game,features]
+#        python -m benchmarks.run --update-baselines   (after a speedup, or on a new machine)
+#        python -m benchmarks.run --update-golden      (after an intended output change)
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from scrapy.http import HtmlResponse, Request
+
+from PFRscraper.game import read_game_page, read_matchup_item
+from PFRscraper.items import GameItem, MatchupItem
+from PFRscraper.plays import get_play_clocks
+from PFRscraper.replay import create_spider, get_settings, run_request
+from PFRtransform.features import FeatureBuilder, read_data, transform
+from PFRtransform.normalize import normalize_games, normalize_matchups
+from PFRtransform.schema import read_typed
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.join(ROOT, 'benchmarks')
+GOLDEN = os.path.join(BENCHMARKS, 'golden')
+BASELINES = os.path.join(BENCHMARKS, 'baselines.json')
+
+# scraped data
+GAME_DATA = os.path.join(ROOT, 'nfl-game-data.csv')
+MATCHUP_DATA = os.path.join(ROOT, 'nfl-team-matchup-data.csv')
+
+# number of games (after the first with team stats) features are built for
+FEATURE_GAMES = 32
+
+# other games features are built for: case name -> (first date, last date, teams: only their games if not None); the
+# turn of the 2007 season (last regular season week, playoffs, Super Bowl, week 1 of 2008: season-to-date margins
+# start over) and the first games of the relocated teams under their new code (history under their former code, see
+# PFRscraper.canonical)
+FEATURE_CASES = {'season_boundary': ('2007-12-29', '2008-09-08', None),
+                 'relocated_lar': ('2016-09-08', '2016-09-19', ['LAR']),
+                 'relocated_lac': ('2017-09-07', '2017-09-18', ['LAC']),
+                 'relocated_lvr': ('2020-09-10', '2020-09-21', ['LVR'])}
+
+# season of the games written by a run of PFRtransform.features for that season only (built from the whole history),
+# and the number of them kept: its first week
+FEATURE_SEASON = 2021
+FEATURE_SEASON_GAMES = 16
+
+
+class FixturePages:
+    # Saved pages by url, served like PFRscraper.archive.PageArchive.load
+    # (url -> (status, encoding, body)).
+
+    def __init__(self, path=os.path.join(BENCHMARKS, 'fixtures')):
+        with open(os.path.join(path, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        self.pages = {}
+        for kind in self.manifest.values():
+            for page in kind.values():
+                with gzip.open(os.path.join(path, 'pages', page['file']), 'rb') as f:
+                    self.pages[self.get_key(page['url'])] = f.read()
+
+    def get_key(self, url):
+        return re.sub(r'(?<!:)//+', '/', url)
+
+    def load(self, url):
+        body = self.pages.get(self.get_key(url))
+        return None if body is None else (200, 'utf-8', body)
+
+    def games(self):
+    # return a list of (case name, url) of the game pages
+        return [(name, page['url']) for name, page in self.manifest['games'].items()]
+
+    def responses(self, kind):
+        return [HtmlResponse(url=page['url'], body=self.load(page['url'])[2], encoding='utf-8')
+                for page in self.manifest[kind].values()]
+
+
+def get_normal(value):
+# return a value as plain json data (numpy values, dates, ... as their python / str equivalents)
+    return json.loads(json.dumps(value, sort_keys=True, default=lambda x: x.item() if hasattr(x, 'item') else str(x)))
+
+
+def get_digest(value):
+    return hashlib.sha1(json.dumps(get_normal(value), sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def bench_week(pages, repeat=20):
+# spider.parse over the week pages: game requests
+    spider = create_spider('spider', {}, get_settings())
+    responses = [pages.responses('weeks') for i in range(repeat)]
+    start = time.perf_counter()
+    for i in range(repeat):
+        urls = [r.url for response in responses[i] for r in spider.parse(response)]
+    return time.perf_counter() - start, repeat * len(urls), 'games', urls
+
+
+def bench_parse_game(pages):
+# spider.parse_game over the game pages, player gamelog lookups included: game, matchup and play items
+    spider = create_spider('spider', {}, get_settings())
+    output = {}
+    start = time.perf_counter()
+    for name, url in pages.games():
+        output[name] = run_request(spider, pages, Request(url=url, callback=spider.parse_game, dont_filter=True))[0]
+    elapsed = time.perf_counter() - start
+    for name, items in output.items():
+        game = [dict(item) for item in items if item.dataset == 'games']
+        matchup = [dict(item) for item in items if item.dataset == 'matchups']
+        plays = [dict(item) for item in items if item.dataset == 'plays']
+        output[name] = {'game': game, 'matchup': matchup, 'plays': len(plays), 'plays_digest': get_digest(plays)}
+    return elapsed, len(output), 'games', output
+
+
+def bench_matchups(pages):
+# read_matchup_item over the game pages (spider2, and games before the first season with details)
+    responses = pages.responses('games')
+    start = time.perf_counter()
+    items = [dict(read_matchup_item(response)) for response in responses]
+    return time.perf_counter() - start, len(items), 'games', items
+
+
+def bench_clocks(pages, repeat=20):
+# get_seconds over every play-by-play row of the game pages (get_play_clocks)
+    tables = [read_game_page(response)['play_by_play'] for response in pages.responses('games')]
+    start = time.perf_counter()
+    for i in range(repeat):
+        clocks = [get_play_clocks(table) for table in tables]
+    elapsed = time.perf_counter() - start
+    return elapsed, repeat * sum(len(table) for table in tables), 'plays', [c.tolist() for c in clocks]
+
+
+def bench_normalize(pages, repeat=10):
+# normalize_games / normalize_matchups over the scraped data (raw field parsing)
+    game_data = pd.read_csv(GAME_DATA, encoding='unicode_escape')
+    matchup_data = pd.read_csv(MATCHUP_DATA, encoding='unicode_escape')
+    start = time.perf_counter()
+    for i in range(repeat):
+        random.seed(0)
+        games = normalize_games(game_data)
+        matchups = normalize_matchups(matchup_data)
+    elapsed = time.perf_counter() - start
+    output = {name: {column: get_digest(frame[column].tolist()) for column in frame.columns}
+              for name, frame in (('games', games), ('matchups', matchups))}
+    return elapsed, repeat * (len(games) + len(matchups)), 'games', output
+
+
+def bench_load(pages, repeat=10):
+# read_typed over the scraped data csvs from their up to date typed parquet files (written by a first read, not timed)
+    with tempfile.TemporaryDirectory() as path:
+        paths = {}
+        for dataset, data in ((GameItem.dataset, GAME_DATA), (MatchupItem.dataset, MATCHUP_DATA)):
+            paths[dataset] = shutil.copy(data, path)
+            read_typed(paths[dataset], dataset)
+        start = time.perf_counter()
+        for i in range(repeat):
+            frames = {dataset: read_typed(csv_path, dataset) for dataset, csv_path in paths.items()}
+        elapsed = time.perf_counter() - start
+    output = {dataset: {column: [str(frame[column].dtype), get_digest(frame[column].tolist())]
+                        for column in frame.columns}
+              for dataset, frame in frames.items()}
+    return elapsed, repeat * sum(len(frame) for frame in frames.values()), 'games', output
+
+
+def get_case_rows(game_data, rows, first, last, teams=None):
+# return the rows (int array) of rows of the game data played from first to last (dates, YYYY-MM-DD), only the games
+# of the given teams if any
+    games = game_data.iloc[rows]
+    selected = (games['game_date'] >= first) & (games['game_date'] <= last)
+    if(teams is not None):
+        selected &= games['home_team_code'].isin(teams) | games['away_team_code'].isin(teams)
+    return rows[selected.to_numpy()]
+
+
+def bench_features(pages, n=FEATURE_GAMES):
+# PFRtransform.features: raw field parsing of every game (setup, not timed) then the feature builder (team and
+# head-to-head indexes) and the features (rolling stats, season margins, ...) of its first n games with team stats
+# and of the games of FEATURE_CASES, run on the scraped data csvs; then (not timed) the first games written by a run
+# of the feature CLI for FEATURE_SEASON
+    random.seed(0)
+    game_data, matchup_data = read_data(GAME_DATA, MATCHUP_DATA)
+    start = time.perf_counter()
+    builder = FeatureBuilder(game_data, matchup_data)
+    rows = builder.get_rows()
+    cases = {'first_games': rows[:n]}
+    cases.update((name, get_case_rows(game_data, rows, *case)) for name, case in FEATURE_CASES.items())
+    features = builder.get_features(np.concatenate(list(cases.values())))
+    elapsed = time.perf_counter() - start
+
+    output = {'columns': list(features.columns), 'cases': {}}
+    end = 0
+    for name, case_rows in cases.items():
+        output['cases'][name] = features[end:end + len(case_rows)].to_numpy().tolist()
+        end += len(case_rows)
+    with tempfile.TemporaryDirectory() as path:
+        transform(GAME_DATA, MATCHUP_DATA, os.path.join(path, 'features.csv'), seasons=[FEATURE_SEASON])
+        season = pd.read_csv(os.path.join(path, 'features.csv'))
+    output['cases']['season_%d' % FEATURE_SEASON] = season[:FEATURE_SEASON_GAMES].to_numpy().tolist()
+    return elapsed, features.shape[0] * features.shape[1], 'features', output
+
+
+benchmarks = {
+    'week': bench_week,
+    'parse_game': bench_parse_game,
+    'matchups': bench_matchups,
+    'clocks': bench_clocks,
+    'normalize': bench_normalize,
+    'load': bench_load,
+    'features': bench_features
+}
+
+
+def get_differences(golden, output, path=''):
+# return the differences (list of str) between a golden output and an output (floats compared with a relative
+# tolerance of 1e-9)
+    if(isinstance(golden, dict) and isinstance(output, dict)):
+        differences = []
+        for key in sorted(set(golden) | set(output)):
+            if(key not in output or key not in golden):
+                differences.append('%s/%s: %s' % (path, key, 'missing' if key not in output else 'unexpected'))
+            else:
+                differences.extend(get_differences(golden[key], output[key], '%s/%s' % (path, key)))
+        return differences
+    if(isinstance(golden, list) and isinstance(output, list)):
+        if(len(golden) != len(output)):
+            return ['%s: %d values, %d expected' % (path, len(output), len(golden))]
+        differences = []
+        for i, (g, o) in enumerate(zip(golden, output)):
+            differences.extend(get_differences(g, o, '%s/%d' % (path, i)))
+        return differences
+    if(isinstance(golden, float) and isinstance(output, (int, float)) and not isinstance(output, bool)):
+        if(np.isclose(golden, output, rtol=1e-9, atol=0, equal_nan=True)):
+            return []
+    elif(golden == output and type(golden) == type(output)):
+        return []
+    return ['%s: %r, %r expected' % (path, output, golden)]
+
+
+def load_json(path, default):
+    if(not os.path.exists(path)):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_json(path, value):
+    with open(path, 'w') as f:
+        json.dump(value, f, indent=1, sort_keys=True)
+        f.write('\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the offline benchmarks.')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown (fraction of baseline rate)')
+    parser.add_argument('--only', default=None, help='comma separated benchmark names')
+    parser.add_argument('--update-golden', action='store_true')
+    parser.add_argument('--update-baselines', action='store_true')
+    options = parser.parse_args(argv)
+    names = list(benchmarks) if options.only is None else options.only.split(',')
+
+    pages = FixturePages()
+    baselines = load_json(BASELINES, {})
+    failed = []
+    print('%-12s %14s %14s %8s  %s' % ('benchmark', 'rate', 'baseline', 'ratio', 'output'))
+    for name in names:
+        best = None
+        for i in range(options.rounds):
+            elapsed, n, unit, output = benchmarks[name](pages)
+            best = elapsed if best is None else min(best, elapsed)
+        rate = n / best
+        output = get_normal(output)
+
+        golden_path = os.path.join(GOLDEN, name + '.json')
+        if(options.update_golden):
+            save_json(golden_path, output)
+        golden = load_json(golden_path, None)
+        differences = ['no golden output'] if golden is None else get_differences(golden, output)
+        if(differences):
+            failed.append(name)
+
+        baseline = baselines.get(name)
+        if(options.update_baselines):
+            baselines[name] = baseline = {'rate': round(rate, 3), 'unit': unit + '/s'}
+        ratio = None if baseline is None else rate / baseline['rate']
+        if(ratio is not None and ratio < 1 - options.tolerance):
+            failed.append(name)
+
+        print('%-12s %14s %14s %8s  %s' % (name, '%.1f %s/s' % (rate, unit),
+                                           '-' if baseline is None else '%.1f %s' % (baseline['rate'], baseline['unit']),
+                                           '-' if ratio is None else '%.2f' % ratio,
+                                           'ok' if not differences else '%d differences' % len(differences)))
+        for difference in differences[:10]:
+            print('    ' + difference)
+
+    if(options.update_baselines):
+        save_json(BASELINES, baselines)
+    if(failed):
+        print('FAILED: ' + ', '.join(sorted(set(failed))))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+# Canonical names
+#
+# Former team codes (STL, SDG, OAK), former stadium names and misspelled officials are replaced by their canonical
+# form in the items of both spiders (canonicalize_item) and, category by category, in frames read from older data files
+# (canonicalize).
+
+import numpy as np
+import pandas as pd
+
+from PFRscraper.canonical import canonicalize, canonicalize_item
+from PFRscraper.items import GameItem, MatchupItem
+
+
+def test_game_item():
+    item = GameItem(home_team_code='STL', away_team_code='SDG', stadium='Edward Jones Dome', referee='Al Riveron',
+                    home_coach='Jeff Fisher', away_coach='Mike McCoy')
+    assert canonicalize_item(item) is item
+    assert dict(item) == {'home_team_code': 'LAR', 'away_team_code': 'LAC', 'stadium': 'Edward Jones Dome',
+                          'referee': 'Alberto Riveron', 'home_coach': 'Jeff Fisher', 'away_coach': 'Mike McCoy'}
+
+
+def test_matchup_item():
+    item = canonicalize_item(MatchupItem(home_team_code='OAK', away_team_code='KAN'))
+    assert dict(item) == {'home_team_code': 'LVR', 'away_team_code': 'KAN'}
+    # canonical names and missing fields are left as they are
+    item = canonicalize_item(MatchupItem(home_team_code='LVR'))
+    assert dict(item) == {'home_team_code': 'LVR'}
+
+
+def test_categorical_remap():
+    frame = pd.DataFrame({'home_team_code': pd.Categorical(['STL', 'LAR', 'KAN', None, 'SDG', 'OAK']),
+                          'stadium': ['Qwest Field', 'CenturyLink Field', 'Lumen Field', 'Arrowhead Stadium', None,
+                                      'O.co Coliseum'],
+                          'home_pts': [10, 20, 30, 40, 50, 60]})
+    canonical = canonicalize(frame)
+    # categories mapped to the same name merged, missing values kept
+    assert canonical['home_team_code'].tolist()[:3] == ['LAR', 'LAR', 'KAN']
+    assert pd.isna(canonical['home_team_code'][3])
+    assert canonical['home_team_code'].tolist()[4:] == ['LAC', 'LVR']
+    assert sorted(canonical['home_team_code'].cat.categories) == ['KAN', 'LAC', 'LAR', 'LVR']
+    # columns that aren't categorical keep their dtype
+    assert canonical['stadium'].dtype == frame['stadium'].dtype
+    assert canonical['stadium'].tolist()[:3] == ['Lumen Field'] * 3
+    assert canonical['stadium'].tolist()[5] == 'Ring Central Coliseum'
+    assert canonical['home_pts'].tolist() == frame['home_pts'].tolist()
+    # the frame read is left as it is
+    assert frame['home_team_code'].tolist()[0] == 'STL'
+
+
+def test_remap_codes():
+    # the codes of the remapped column point at the canonical name of each original category
+    column = pd.Series(pd.Categorical(['SDG', 'LAC', 'SDG', 'DEN'], categories=['DEN', 'LAC', 'SDG']))
+    canonical = canonicalize(pd.DataFrame({'away_team_code': column}))['away_team_code']
+    assert canonical.tolist() == ['LAC', 'LAC', 'LAC', 'DEN']
+    assert np.unique(canonical.cat.codes).size == 2
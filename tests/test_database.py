@@ -0,0 +1,66 @@
+# Game database lookups
+#
+# The previous games of a team and of a pair of teams are read from the game database with seeks on its (team, date)
+# and (home team, away team, date) indexes; the transform step refuses to read a database that doesn't exist (opening
+# one creates it).
+
+import pandas as pd
+import pytest
+
+from PFRscraper.columnar import get_frame
+from PFRscraper.database import GameDatabase
+from PFRscraper.items import GameItem, MatchupItem
+from PFRtransform.schema import read_database
+
+
+GAMES = [('2021-09-12', 'KAN', 'CLE'),
+         ('2021-09-19', 'BAL', 'KAN'),
+         ('2021-09-26', 'KAN', 'LAC'),
+         ('2021-10-03', 'PHI', 'KAN'),
+         ('2021-12-16', 'LAC', 'KAN'),
+         ('2022-01-08', 'CLE', 'CIN')]
+
+
+def make_database(path):
+    db = GameDatabase(path)
+    rows = [{'game_date': pd.Timestamp(date), 'home_team_code': home, 'away_team_code': away}
+            for date, home, away in GAMES]
+    db.upsert(GameItem, get_frame(rows, GameItem))
+    db.upsert(MatchupItem, get_frame(rows, MatchupItem))
+    return db
+
+
+def test_previous_games(tmp_path):
+    db = make_database(str(tmp_path / 'nfl.sqlite'))
+    games = db.previous_games('KAN', '2021-12-16', 3)
+    assert games['game_date'].tolist() == ['2021-10-03', '2021-09-26', '2021-09-19']
+    assert db.previous_games('CLE', '2021-09-12', 3).empty
+    db.close()
+
+
+def test_previous_matchups(tmp_path):
+    db = make_database(str(tmp_path / 'nfl.sqlite'))
+    # both venues, most recent first
+    games = db.previous_matchups('KAN', 'LAC', '2022-01-01', 5)
+    assert games['game_date'].tolist() == ['2021-12-16', '2021-09-26']
+    games = db.previous_matchups('KAN', 'LAC', '2022-01-01', 5, start_date='2021-10-01')
+    assert games['game_date'].tolist() == ['2021-12-16']
+    db.close()
+
+
+def test_lookups_use_indexes(tmp_path):
+    db = make_database(str(tmp_path / 'nfl.sqlite'))
+    plan = db.query('EXPLAIN QUERY PLAN SELECT * FROM games WHERE away_team_code = ? AND game_date < ?',
+                    ('KAN', '2022-01-01'))
+    assert plan['detail'].str.contains('games_away').any()
+    plan = db.query('EXPLAIN QUERY PLAN SELECT * FROM matchups WHERE home_team_code = ? AND away_team_code = ? '
+                    'AND game_date < ?', ('KAN', 'LAC', '2022-01-01'))
+    assert plan['detail'].str.contains('matchups_pair').any()
+    db.close()
+
+
+def test_read_missing_database(tmp_path):
+    path = tmp_path / 'mistyped.sqlite'
+    with pytest.raises(FileNotFoundError):
+        read_database(str(path), GameItem.dataset)
+    assert not path.exists()
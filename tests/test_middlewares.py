@@ -0,0 +1,139 @@
+# Per-host throttling and retries
+#
+# HostLimiter is a token bucket per host whose rate adapts to the host; ThrottleMiddleware re-queues the requests a
+# host throttled (429, 503: after its Retry-After, in seconds or as an HTTP date) or failed (5xx, ...: after an
+# exponential backoff) and drops them after THROTTLE_MAX_RETRIES.
+
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+from scrapy import Spider
+from scrapy.crawler import Crawler
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import Request, Response
+from scrapy.settings import Settings
+from scrapy.utils.misc import load_object
+
+from PFRscraper.middlewares import HostLimiter, ThrottleMiddleware
+
+
+URL = 'https://pro-football-reference.com/boxscores/202109120crd.htm'
+
+
+def make_middleware(**settings):
+    values = Settings()
+    values.setmodule('PFRscraper.settings', priority='project')
+    values.update(settings)
+    crawler = Crawler(Spider, values)
+    crawler.stats = load_object(values['STATS_CLASS'])(crawler)
+    # the downloader slots the middleware resizes, normally set when a crawl starts
+    crawler.engine = SimpleNamespace(downloader=SimpleNamespace(slots={}, active=set()))
+    return ThrottleMiddleware.from_crawler(crawler), Spider('spider')
+
+
+def get_pause(middleware):
+# return the seconds (float) before the host takes another request
+    return middleware.get_host(Request(URL)).reserve(time.monotonic())
+
+
+def test_token_bucket():
+    host = HostLimiter(2.0, 0.1, 4.0, 1, 1.0)
+    assert host.reserve(0.0) == 0.0
+    assert host.reserve(0.0) == 0.5
+    assert host.reserve(0.0) == 1.0
+    # refilled while idle, at most burst tokens
+    assert host.reserve(10.0) == 0.0
+    assert host.reserve(10.0) == 0.5
+
+    host = HostLimiter(2.0, 0.1, 4.0, 3, 1.0)
+    assert [host.reserve(10.0) for k in range(4)] == [0.0, 0.0, 0.0, 0.5]
+
+
+def test_rate_adapts():
+    host = HostLimiter(1.0, 0.25, 2.0, 1, 1.0)
+    host.observe(0.5)
+    assert host.rate == 1.1
+    host.observe(5.0)
+    assert host.rate == pytest.approx(0.99)
+    host.throttled(0.0, 30.0)
+    assert host.rate == pytest.approx(0.495)
+    assert host.reserve(1.0) == 29.0
+    for k in range(10):
+        host.throttled(0.0, 0.0)
+    assert host.rate == 0.25
+
+
+def test_disabled():
+    with pytest.raises(NotConfigured):
+        make_middleware(THROTTLE_ENABLED=False)
+
+
+def test_success_passes():
+    middleware, spider = make_middleware()
+    request = Request(URL)
+    for status in (200, 404):
+        response = Response(URL, status=status, request=request)
+        assert middleware.process_response(request, response, spider) is response
+
+
+def test_retry_after_seconds():
+    middleware, spider = make_middleware()
+    request = Request(URL)
+    response = Response(URL, status=429, headers={'Retry-After': '120'}, request=request)
+    retry = middleware.process_response(request, response, spider)
+    assert isinstance(retry, Request)
+    assert retry.meta['throttle_retries'] == 1
+    assert retry.dont_filter
+    assert get_pause(middleware) == pytest.approx(120, abs=1)
+    assert middleware.crawler.stats.get_value('throttle/retry/status 429') == 1
+
+
+def test_retry_after_date():
+    middleware, spider = make_middleware()
+    request = Request(URL)
+    response = Response(URL, status=503, headers={'Retry-After': formatdate(time.time() + 60, usegmt=True)},
+                        request=request)
+    assert isinstance(middleware.process_response(request, response, spider), Request)
+    assert get_pause(middleware) == pytest.approx(60, abs=2)
+
+
+def test_retry_after_parsing():
+    middleware, spider = make_middleware()
+    assert middleware.get_retry_after(Response(URL, headers={'Retry-After': '30'})) == 30.0
+    assert middleware.get_retry_after(Response(URL, headers={'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})) == 0.0
+    assert middleware.get_retry_after(Response(URL, headers={'Retry-After': 'soon'})) is None
+    assert middleware.get_retry_after(Response(URL)) is None
+
+
+def test_backoff():
+    middleware, spider = make_middleware(THROTTLE_BACKOFF_BASE=10, THROTTLE_BACKOFF_MAX=50)
+    # 429 / 503 without a Retry-After, and other failures, back off exponentially up to the maximum
+    for retries, status, delay in ((0, 503, 10), (1, 500, 20), (2, 502, 40), (4, 429, 50)):
+        request = Request(URL, meta={'throttle_retries': retries})
+        response = Response(URL, status=status, headers={'Retry-After': '1'} if status == 500 else {},
+                            request=request)
+        middleware.hosts.clear()
+        retry = middleware.process_response(request, response, spider)
+        assert retry.meta['throttle_retries'] == retries + 1
+        assert get_pause(middleware) == pytest.approx(delay, abs=1)
+
+
+def test_exception_retried():
+    middleware, spider = make_middleware()
+    request = Request(URL)
+    retry = middleware.process_exception(request, TimeoutError(), spider)
+    assert retry.meta['throttle_retries'] == 1
+    assert middleware.process_exception(request, IgnoreRequest(), spider) is None
+
+
+def test_retry_cap():
+    middleware, spider = make_middleware(THROTTLE_MAX_RETRIES=2)
+    request = Request(URL)
+    for k in range(2):
+        request = middleware.process_response(request, Response(URL, status=503, request=request), spider)
+    with pytest.raises(IgnoreRequest):
+        middleware.process_response(request, Response(URL, status=503, request=request), spider)
+    assert middleware.crawler.stats.get_value('throttle/max_reached') == 1
+    assert middleware.crawler.stats.get_value('throttle/retry_count') == 2
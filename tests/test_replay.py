@@ -0,0 +1,128 @@
+# Replay against the crawl
+#
+# A crawl's feed gets its items through the item pipelines (CanonicalPipeline, FeedFilterPipeline); a replay of the
+# archived pages has to write the same feed. The pages are the benchmark fixtures (benchmarks/fixtures) behind a
+# week page linking to the St. Louis Rams home game, whose former team code (STL) the pipeline renames. A page
+# missing from the archive fails like a failed download: its request's errback gets it (a player gamelog: the player's
+# team is unknown), or it's dropped.
+
+import io
+import json
+
+from scrapy.exceptions import DropItem
+from scrapy.exporters import JsonLinesItemExporter
+from scrapy.http import Request
+from scrapy.spidermiddlewares.httperror import HttpError
+
+from benchmarks.run import FixturePages
+from PFRscraper.archive import PageArchive
+from PFRscraper.pipelines import CanonicalPipeline, FeedFilterPipeline
+from PFRscraper.items import GameItem
+from PFRscraper.replay import create_spider, get_settings, replay, run_request
+
+
+DOMAIN = 'https://pro-football-reference.com/'
+WEEK_URL = DOMAIN + 'years/2006/week_1.htm'
+GAME_URL = DOMAIN + 'boxscores/200612030ram.htm'
+ARGS = {'start_year': '2006', 'end_year': '2006', 'week': '1'}
+
+WEEK_PAGE = ('<html><body><div class="game_summaries"><div class="game_summary expanded nohover">'
+             '<table class="teams"><tbody><tr><td class="right gamelink"><a href="boxscores/200612030ram.htm">Final</a>'
+             '</td></tr></tbody></table></div></div></body></html>')
+
+
+def make_archive(path, kinds=('games', 'gamelogs')):
+# archive the fixture pages of some kinds (game and gamelog pages) and a week page of the Rams game
+    pages = FixturePages()
+    archive = PageArchive(path)
+    for kind in kinds:
+        for page in pages.manifest[kind].values():
+            archive.store(page['url'], 200, 'utf-8', pages.load(page['url'])[2])
+    archive.store(WEEK_URL, 200, 'utf-8', WEEK_PAGE.encode('utf-8'))
+    archive.close()
+
+
+def export(items):
+    f = io.BytesIO()
+    exporter = JsonLinesItemExporter(f)
+    exporter.start_exporting()
+    for item in items:
+        exporter.export_item(item)
+    exporter.finish_exporting()
+    return f.getvalue()
+
+
+def crawl(archive_dir):
+# return the feed (bytes, json lines) a crawl of the archived pages writes: the spider's items through its pipelines
+    settings = get_settings(archive_dir)
+    spider = create_spider('spider', ARGS, settings)
+    archive = PageArchive.from_settings(settings)
+    items = run_request(spider, archive, Request(url=WEEK_URL, dont_filter=True))[0]
+    archive.close()
+    pipelines = [CanonicalPipeline.from_crawler(spider.crawler), FeedFilterPipeline()]
+    feed = []
+    for item in items:
+        try:
+            for pipeline in pipelines:
+                item = pipeline.process_item(item, spider)
+        except DropItem:
+            continue
+        feed.append(item)
+    return export(feed)
+
+
+def test_replay_matches_crawl(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    make_archive(archive_dir)
+    output = tmp_path / 'games.jl'
+    assert replay('spider', ARGS, str(output), workers=1, archive_dir=archive_dir) == 1
+
+    replayed = output.read_bytes()
+    assert replayed == crawl(archive_dir)
+    game = json.loads(replayed)
+    assert game['home_team_code'] == 'LAR'
+
+
+def test_missing_gamelogs(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    make_archive(archive_dir, kinds=('games',))
+    spider = create_spider('spider', ARGS, get_settings(archive_dir))
+    archive = PageArchive.from_settings(spider.settings)
+    items, requests = run_request(spider, archive, Request(url=GAME_URL, callback=spider.parse_game), follow=False)
+    assert requests and spider.resolver.failed == set()
+    for request in requests:
+        items += run_request(spider, archive, request)[0]
+    archive.close()
+
+    # every gamelog went to the errback (gamelog_failed), and the game was finished without the players' teams
+    keys = [request.cb_kwargs['key'] for request in requests]
+    assert spider.resolver.failed == set(keys)
+    assert all(spider.resolver.team(key, '2006-12-03') is None for key in keys)
+    assert spider.pending_games == {}
+    assert sum(isinstance(item, GameItem) for item in items) == 1
+
+
+def test_error_page(tmp_path):
+    # an archived error page goes to the errback like a failed download, as scrapy's HttpErrorMiddleware does
+    archive_dir = str(tmp_path / 'archive')
+    make_archive(archive_dir, kinds=())
+    archive = PageArchive(archive_dir)
+    archive.store(GAME_URL, 500, 'utf-8', b'<html></html>')
+    spider = create_spider('spider', ARGS, get_settings(archive_dir))
+    errors = []
+    request = Request(url=GAME_URL, callback=spider.parse_game, errback=errors.append)
+    assert run_request(spider, archive, request) == ([], [])
+    archive.close()
+    assert len(errors) == 1 and errors[0].check(HttpError)
+
+
+def test_replay_partial_archive(tmp_path):
+    # the game is written without its gamelogs, and not at all without its page
+    archive_dir = str(tmp_path / 'archive')
+    make_archive(archive_dir, kinds=('games',))
+    assert replay('spider', ARGS, str(tmp_path / 'games.jl'), workers=1, archive_dir=archive_dir) == 1
+    assert json.loads((tmp_path / 'games.jl').read_bytes())['home_team_code'] == 'LAR'
+
+    archive_dir = str(tmp_path / 'weeks')
+    make_archive(archive_dir, kinds=())
+    assert replay('spider', ARGS, str(tmp_path / 'weeks.jl'), workers=1, archive_dir=archive_dir) == 0
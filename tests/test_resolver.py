@@ -0,0 +1,114 @@
+# Player team lookups
+#
+# PlayerTeamResolver keeps the teams of each (player, season) gamelog in an LRU in front of its sqlite store, and the
+# games waiting on each gamelog. The spider parks a game page whose players aren't resolved yet (pending_games),
+# requests each missing gamelog once, and finishes the game (finish_game: game and play items, game recorded as
+# scraped) when its last gamelog comes back. Pages are the benchmark fixtures (benchmarks/fixtures), served as an
+# archive.
+
+from scrapy.http import Request
+
+from benchmarks.run import FixturePages
+from PFRscraper.items import GameItem, MatchupItem
+from PFRscraper.replay import create_spider, get_settings, run_request
+from PFRscraper.resolver import PlayerTeamResolver
+from PFRscraper.state import get_game_id
+
+
+KEY = ('/players/S/SmitKe11', 2006)
+OTHER_KEY = ('/players/R/RunyMa12', 2006)
+
+
+def test_cache_hit_and_miss(tmp_path):
+    path = str(tmp_path / 'player-teams.sqlite')
+    resolver = PlayerTeamResolver(path, cache_size=1)
+    assert resolver.get(KEY) is None
+    assert not resolver.has(KEY)
+    resolver.put(KEY, {'2006-09-10': 'DET'})
+    resolver.put(OTHER_KEY, {'2006-09-10': 'PHI'})
+    # evicted from the LRU, read back from the store
+    assert KEY not in resolver.cache
+    assert resolver.get(KEY) == {'2006-09-10': 'DET'}
+    assert list(resolver.cache) == [KEY]
+    assert resolver.team(KEY, '2006-09-10') == 'DET'
+    assert resolver.team(KEY, '2006-09-17') == 'NO TEAM'
+    resolver.close()
+
+    # kept across crawls
+    resolver = PlayerTeamResolver(path)
+    assert resolver.has(OTHER_KEY)
+    resolver.close()
+
+
+def test_failed_gamelog(tmp_path):
+    resolver = PlayerTeamResolver(str(tmp_path / 'player-teams.sqlite'))
+    resolver.fail(KEY)
+    assert resolver.has(KEY)
+    assert resolver.team(KEY, '2006-09-10') is None
+    resolver.close()
+    # retried by the next crawl
+    resolver = PlayerTeamResolver(str(tmp_path / 'player-teams.sqlite'))
+    assert not resolver.has(KEY)
+    resolver.close()
+
+
+def test_waiting_games(tmp_path):
+    resolver = PlayerTeamResolver(str(tmp_path / 'player-teams.sqlite'))
+    # only the first game waiting on a gamelog requests it
+    assert resolver.wait(KEY, 'game_1')
+    assert not resolver.wait(KEY, 'game_2')
+    assert resolver.wait(OTHER_KEY, 'game_2')
+    assert resolver.release(KEY) == ['game_1', 'game_2']
+    assert resolver.release(KEY) == []
+    resolver.close()
+
+
+def test_pending_game(tmp_path, monkeypatch):
+    # away from the scraped data csvs, so the index of scraped games starts empty
+    monkeypatch.chdir(tmp_path)
+    pages = FixturePages()
+    spider = create_spider('spider', {}, get_settings())
+    name, url = pages.games()[0]
+    game_id = get_game_id(url)
+
+    items, gamelogs = run_request(spider, pages, Request(url, callback=spider.parse_game), follow=False)
+    assert [type(item) for item in items] == [MatchupItem]
+    assert len(gamelogs) > 1
+    assert len(set(r.url for r in gamelogs)) == len(gamelogs)
+    assert url in spider.pending_games
+    assert not spider.games.has(game_id)
+
+    # the game waits until its last gamelog is back
+    for request in gamelogs[:-1]:
+        assert run_request(spider, pages, request) == ([], [])
+        assert url in spider.pending_games
+    items = run_request(spider, pages, gamelogs[-1])[0]
+    assert url not in spider.pending_games
+    assert spider.games.has(game_id)
+    assert sum(isinstance(item, GameItem) for item in items) == 1
+
+    # every player is resolved now: a second parse finishes the game at once
+    items, requests = run_request(spider, pages, Request(url, callback=spider.parse_game), follow=False)
+    assert requests == []
+    assert sum(isinstance(item, GameItem) for item in items) == 1
+
+
+def test_pending_games(tmp_path, monkeypatch):
+    # several games in flight, their gamelogs back in any order: each game finishes with its own last gamelog
+    monkeypatch.chdir(tmp_path)
+    pages = FixturePages()
+    spider = create_spider('spider', {}, get_settings())
+    requested = []
+    for name, url in pages.games():
+        requests = run_request(spider, pages, Request(url, callback=spider.parse_game), follow=False)[1]
+        requested += [(k, url, request) for k, request in enumerate(requests)]
+    assert len(spider.pending_games) == len(pages.games())
+    # one gamelog of each game in turn
+    requested = [(url, request) for k, url, request in sorted(requested, key=lambda r: r[0])]
+    for k, (url, request) in enumerate(requested):
+        items = run_request(spider, pages, request)[0]
+        last = all(other != url for other, r in requested[k + 1:])
+        assert (url in spider.pending_games) != last
+        assert sum(isinstance(item, GameItem) for item in items) == int(last)
+    assert spider.pending_games == {}
+    assert all(spider.games.has(get_game_id(url)) for name, url in pages.games())
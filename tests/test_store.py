@@ -0,0 +1,89 @@
+# Feature store staleness
+#
+# A refresh rebuilds the games missing from the store and the stored games a new or changed game makes stale: every
+# game of its teams on or after its date (get_outdated); a store built with another version is ignored.
+
+import numpy as np
+import pandas as pd
+
+from PFRtransform.store import FeatureStore
+
+
+# a small season: (date, home team, away team, home pts, away pts)
+GAMES = [('2021-09-12', 'KAN', 'CLE', 33, 29),
+         ('2021-09-12', 'BUF', 'PIT', 16, 23),
+         ('2021-09-19', 'BAL', 'KAN', 36, 35),
+         ('2021-09-19', 'MIA', 'BUF', 0, 35),
+         ('2021-09-26', 'KAN', 'LAC', 24, 30),
+         ('2021-09-26', 'CLE', 'CHI', 26, 6),
+         ('2021-10-03', 'PHI', 'KAN', 30, 42),
+         ('2021-10-03', 'PIT', 'GNB', 17, 27)]
+
+
+def make_games(games=GAMES):
+    game_data = pd.DataFrame(games, columns=['game_date', 'home_team_code', 'away_team_code', 'home_pts', 'away_pts'])
+    game_data['game_date'] = pd.to_datetime(game_data['game_date'])
+    game_data['o_u_result'] = 1
+    return game_data.sort_values('game_date', kind='stable').reset_index(drop=True)
+
+
+def make_store(path, game_data, version='1'):
+# return a saved store of features of every game (its points total), reloaded from disk
+    store = FeatureStore(path, version)
+    rows = np.arange(len(game_data))
+    store.add(game_data, rows, pd.DataFrame({'total': game_data['home_pts'] + game_data['away_pts']}))
+    store.save()
+    return FeatureStore(path, version)
+
+
+def get_outdated_games(store, game_data):
+    outdated = game_data[store.get_outdated(game_data)]
+    return list(zip(outdated['game_date'].dt.strftime('%Y-%m-%d'), outdated['home_team_code']))
+
+
+def test_new_store(tmp_path):
+    game_data = make_games()
+    assert FeatureStore(str(tmp_path), '1').get_outdated(game_data).all()
+
+
+def test_up_to_date(tmp_path):
+    game_data = make_games()
+    store = make_store(str(tmp_path), game_data)
+    assert not store.get_outdated(game_data).any()
+    # a draw for a push doesn't make a game stale
+    game_data['o_u_result'] = 0
+    assert not store.get_outdated(game_data).any()
+
+
+def test_new_game(tmp_path):
+    store = make_store(str(tmp_path), make_games(GAMES[:-2]))
+    assert get_outdated_games(store, make_games()) == [('2021-10-03', 'PHI'), ('2021-10-03', 'PIT')]
+
+
+def test_backfilled_game(tmp_path):
+    # a game scraped late, before stored games of its teams: their later games are rebuilt, not the other teams'
+    store = make_store(str(tmp_path), make_games(GAMES[:2] + GAMES[3:]))
+    assert get_outdated_games(store, make_games()) == [('2021-09-19', 'BAL'), ('2021-09-26', 'KAN'),
+                                                       ('2021-10-03', 'PHI')]
+
+
+def test_changed_score(tmp_path):
+    game_data = make_games()
+    store = make_store(str(tmp_path), game_data)
+    game_data.loc[game_data['home_team_code'] == 'CLE', 'home_pts'] = 27
+    # CLE and CHI have no later game, only the changed game is rebuilt
+    assert get_outdated_games(store, game_data) == [('2021-09-26', 'CLE')]
+    game_data.loc[game_data['home_team_code'] == 'BUF', 'away_pts'] = 24
+    # BUF's and PIT's later games too
+    assert get_outdated_games(store, game_data) == [('2021-09-12', 'BUF'), ('2021-09-19', 'MIA'),
+                                                    ('2021-09-26', 'CLE'), ('2021-10-03', 'PIT')]
+
+
+def test_other_version(tmp_path):
+    game_data = make_games()
+    make_store(str(tmp_path), game_data, version='1')
+    assert FeatureStore(str(tmp_path), '2').get_outdated(game_data).all()
+    # the store is replaced when saved with the other version
+    make_store(str(tmp_path), game_data, version='2')
+    assert FeatureStore(str(tmp_path), '1').get_outdated(game_data).all()
+    assert not FeatureStore(str(tmp_path), '2').get_outdated(game_data).any()